@@ -8,6 +8,7 @@ def create_database():
     
     # 1. Buka Koneksi ke Database
     conn = sqlite3.connect(DB_NAME)
+    conn.execute("PRAGMA journal_mode=WAL") # Pembaca riwayat tidak terblokir saat scanner menulis
     cursor = conn.cursor()
     
     # --- MEMBUAT TABEL 1: MASTER SAHAM (KTP) ---
@@ -23,10 +24,12 @@ def create_database():
     ''')
     
     # --- MEMBUAT TABEL 2: HASIL SCAN (ANALISIS) ---
+    # scan_date disimpan dalam WIB (Asia/Jakarta, UTC+7, tanpa DST) format 'YYYY-MM-DD HH:MM:SS',
+    # sama dengan server.simpan_riwayat_scan, supaya substr(scan_date, 1, 10) = tanggal sesi bursa
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS scan_results (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        scan_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        scan_date DATETIME DEFAULT (datetime('now', '+7 hours')),
         ticker TEXT,
         scanner_type TEXT,
         accuracy_score INTEGER,
@@ -39,6 +42,12 @@ def create_database():
     )
     ''')
 
+    # Index untuk query riwayat (/api/scan-history): per tanggal, per ticker, per strategi
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_date ON scan_results (scan_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_ticker ON scan_results (ticker, scan_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_type ON scan_results (scanner_type, scan_date, accuracy_score)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_hari ON scan_results (substr(scan_date, 1, 10))") # Daftar N sesi terakhir
+
     # --- MEMBUAT TABEL 3: BERITA & SENTIMEN ---
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS news_sentiment (
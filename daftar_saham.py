@@ -0,0 +1,94 @@
+"""
+Daftar saham statis (bucket sektor, syariah, bank, LQ45, watchlist).
+
+Modul data murni tanpa efek samping: server.py dan kalibrasi_skor.py sama-sama
+mengimpor dari sini, jadi skrip offline tidak perlu ikut memuat server
+(DB, security master, thread pool) hanya untuk membaca daftar ticker.
+"""
+
+# --- DATABASE SAHAM SYARIAH (JII 70 + ISSI PILIHAN) ---
+# Total: 100+ Saham Syariah Terbaik & Terlikuid
+# Dikelompokkan per sektor (dipakai juga oleh mesin breadth & sektor)
+SEKTOR_SYARIAH = {
+    # 1. ENERGI, MINYAK & GAS (High Volatility)
+    "ENERGI": ["ADRO", "PTBA", "ITMG", "HRUM", "INDY", "DOID", "KKGI", "BUMI", 
+               "PGAS", "ELSA", "MEDC", "AKRA", "ADMR", "PGEO", "MBMA", "RAJA", "ENRG"],
+    
+    # 2. TAMBANG LOGAM & MINERAL
+    "TAMBANG": ["ANTM", "INCO", "MDKA", "TINS", "NCKL", "AMMN", "BRMS", "PSAB", "ZINC", "DKFT"],
+    
+    # 3. KESEHATAN & FARMASI (Defensive & Trending) -> [NEW]
+    "KESEHATAN": ["KLBF", "SIDO", "MIKA", "HEAL", "SILO", "SAME", "KAEF", "TSPC", "PRDA"],
+    
+    # 4. KONSUMER & RITEL (Bluechip Syariah)
+    "KONSUMER": ["ICBP", "INDF", "MYOR", "UNVR", "CMRY", "GOOD", "ROTI", "STTP",
+                 "AMRT", "MIDI", "ACES", "MAPI", "MAPA", "ERAA", "RALS", "LPPF"],
+    
+    # 5. TELEKOMUNIKASI, MENARA & MEDIA
+    "TELEKOMUNIKASI": ["TLKM", "ISAT", "EXCL", "TOWR", "TBIG", "MTEL", "MNCN", "SCMA", "EMTK"],
+    
+    # 6. PROPERTY, KONSTRUKSI & SEMEN
+    "PROPERTY": ["CTRA", "BSDE", "PWON", "SMRA", "ASRI", "DMAS", "DILD"],
+    "KONSTRUKSI": ["PTPP", "WIKA", "ADHI", "WEGE", "TOTL"],
+    "SEMEN & TOL": ["SMGR", "INTP", "JSMR"],
+    
+    # 7. TEKNOLOGI & DIGITAL BANKING
+    "TEKNOLOGI": ["GOTO", "BUKA", "WIRG", "ARTO", "BELI", "MLPT"],
+    
+    # 8. BAHAN BAKU & KERTAS (Basic Materials)
+    "BAHAN BAKU": ["INKP", "TKIM", "BRPT", "TPIA", "ESSA", "AVIA", "ARNA", "WOOD"],
+    
+    # 9. AGRIKULTUR & POULTRY (CPO & Ayam)
+    "AGRIKULTUR": ["CPIN", "JPFA", "MAIN", 
+                   "AALI", "LSIP", "DSNG", "TAPG", "STAA", "SSMS", "SMAR"],
+    
+    # 10. TRANSPORTASI & LOGISTIK -> [NEW]
+    "TRANSPORTASI": ["SMDR", "TMAS", "ASSA", "BIRD", "GIAA"],
+    
+    # 11. OTOMOTIF & KOMPONEN
+    "OTOMOTIF": ["ASII", "AUTO", "DRMA", "SMSM"],
+    
+    # 12. HOLDING & LAINNYA
+    "HOLDING": ["UNTR", "SRTG", "BNBR", "VKTR"]
+}
+DATABASE_SYARIAH = [kode for daftar in SEKTOR_SYARIAH.values() for kode in daftar]
+
+# --- BANK KONVENSIONAL ---
+DATABASE_BANK = [
+    "BBCA", "BBRI", "BMRI", "BBNI", # The Big 4
+    "BBTN", "BDMN", "BNGA", "NISP", "PNBN", "BJBR" # Mid-Cap Banks
+]
+
+# Peta ticker -> sektor (bucket di atas)
+SEKTOR_SAHAM = {kode: sektor for sektor, daftar in SEKTOR_SYARIAH.items() for kode in daftar}
+SEKTOR_SAHAM.update({kode: "BANK" for kode in DATABASE_BANK})
+SET_SYARIAH = set(DATABASE_SYARIAH)
+
+# Bucket ENERGI mencampur batubara dengan minyak & gas; berita batubara butuh query sendiri
+SET_BATUBARA = {"ADRO", "PTBA", "ITMG", "HRUM", "INDY", "DOID", "KKGI", "BUMI", "ADMR"}
+
+# --- KONSTITUEN LQ45 (fallback kalau stocks_master.is_lq45 belum diisi) ---
+DATABASE_LQ45 = [
+    "ACES", "ADRO", "AKRA", "AMMN", "AMRT", "ANTM", "ARTO", "ASII", "BBCA", "BBNI",
+    "BBRI", "BBTN", "BMRI", "BRIS", "BRPT", "BUKA", "CPIN", "EMTK", "ESSA", "EXCL",
+    "GOTO", "HRUM", "ICBP", "INCO", "INDF", "INKP", "INTP", "ISAT", "ITMG", "KLBF",
+    "MAPI", "MBMA", "MDKA", "MEDC", "PGAS", "PGEO", "PTBA", "SIDO", "SMGR", "SRTG",
+    "TLKM", "TOWR", "UNTR", "UNVR"
+]
+SET_LQ45 = set(DATABASE_LQ45)
+
+# --- WATCHLIST (FAVORIT TRADER HARIAN) ---
+# Top 40 Saham Paling Sering Di-Tradingkan
+WATCHLIST = [
+    # Big Caps / Movers
+    "BBRI", "BBCA", "BMRI", "BBNI", "TLKM", "ASII", "GOTO", "AMMN", "BREN",
+    # Energy & Commodities (Sering Rally)
+    "ADRO", "PTBA", "PGAS", "MEDC", "AKRA", "ANTM", "MDKA", "INCO", "TINS",
+    # Gorengan Mewah & Second Liner (High Cuan)
+    "BRMS", "BUMI", "DOID", "ENRG", "PSAB", "RAJA", "BRIS",
+    # Consumer & Health (Defensive)
+    "ICBP", "AMRT", "KLBF", "MIKA",
+    # Property & Tech
+    "CTRA", "BSDE", "ARTO", "EMTK"
+]
+WATCHLIST_SET = set(WATCHLIST)
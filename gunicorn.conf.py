@@ -0,0 +1,43 @@
+import os
+
+# ==========================================
+# KONFIGURASI GUNICORN (PRODUKSI)
+# ==========================================
+# Jalankan: gunicorn -c gunicorn.conf.py server:app
+#
+# Beban kita campuran dua jenis request:
+#   - /api/scan-results, /api/screen, /api/alerts ... -> baca cache di memori, ~ms
+#   - /api/stock-detail -> Yahoo + berita + rantai failover AI, bisa puluhan detik
+# Keduanya I/O-bound, jadi worker THREAD (gthread): satu request AI yang lama hanya
+# memegang satu thread, scan tetap dilayani thread lain. Cache, snapshot, limiter Yahoo
+# dan tabel alert ada per-PROSES, jadi worker sengaja sedikit dan thread yang banyak.
+
+bind = f"0.0.0.0:{os.getenv('PORT', 7860)}"
+worker_class = "gthread"
+# 1 proses = 1 salinan cache + 1 keran Yahoo. Tambah worker hanya kalau CPU jadi leher botol
+# (tiap worker memanaskan cache sendiri & ikut antre di kuota Yahoo yang sama).
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+# Thread >= jumlah request AI yang mungkin menggantung bersamaan + cadangan untuk baca scan
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+# Rantai DeepSeek -> Groq -> Gemini + pencarian berita bisa > 60 detik di kasus terburuk
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5 # Aplikasi mobile polling scan; koneksi dipakai ulang
+backlog = 256
+# Jangan recycle worker: setiap restart = cache dingin + warm-up ulang ke Yahoo
+max_requests = 0
+# Tanpa preload: thread latar (warm-up, SWR refresh, intraday) tidak ikut fork dengan aman,
+# jadi app diimport di tiap worker lalu dipanaskan di post_worker_init.
+preload_app = False
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+access_log_format = '%(h)s "%(r)s" %(s)s %(b)s %(L)ss'
+
+def post_worker_init(worker):
+    import server
+    # Snapshot indikator di-mmap dulu (milidetik), baru warm-up Yahoo di thread latar
+    server.mulai_warmup()
+    if not server.WARMUP_AKTIF and server.INTRADAY_MODE: server.mulai_intraday()
+    worker.log.info("Worker %s siap (threads=%s, warm-up=%s)", worker.pid, threads, server.WARMUP_AKTIF)
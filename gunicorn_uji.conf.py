@@ -0,0 +1,18 @@
+import os
+import runpy
+
+# ==========================================
+# KONFIGURASI GUNICORN (UJI BEBAN)
+# ==========================================
+# Jalankan: DB_PATH=/tmp/uji.db gunicorn -c gunicorn_uji.conf.py server:app
+#
+# Sama persis dengan gunicorn.conf.py, ditambah stub upstream (Yahoo / berita / AI) dari
+# uji_beban.py yang dipasang di tiap worker sebelum warm-up. Konfigurasi produksi tidak
+# pernah mengimpor modul uji.
+_produksi = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py"))
+globals().update({k: v for k, v in _produksi.items() if not k.startswith("__")})
+
+def post_worker_init(worker):
+    import uji_beban
+    uji_beban.pasang_stub_dari_env()
+    _produksi["post_worker_init"](worker)
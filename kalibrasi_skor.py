@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from rumus_saham import (
+    hitung_sinyal_skor, resample_mingguan, klasifikasi_regime, gabung_param,
+    rampingkan_bar, PARAM_SKOR_DEFAULT, TIPE_SKOR
+)
+from pembatas_yahoo import panggil_yahoo
+from daftar_saham import DATABASE_SYARIAH, DATABASE_BANK
+
+# ==========================================
+# KALIBRASI PARAMETER SCORING (PARAMETER SWEEP PARALEL)
+# ==========================================
+# Tahap 1 (mahal, sekali): tiap ticker x tiap tanggal historis -> sinyal boolean
+#   lewat hitung_sinyal_skor (fungsi yang SAMA dengan scanner live), dibagi ke banyak proses.
+#   Hasilnya di-cache ke sinyal.npz, jadi sweep berikutnya langsung mulai dari tahap 2.
+# Tahap 2 (murah, ribuan kali): skor = matriks sinyal @ bobot. Satu konfigurasi cuma
+#   perkalian matriks kecil + filter threshold, jadi ribuan konfigurasi selesai dalam menit.
+#
+# Contoh:
+#   python kalibrasi_skor.py --tickers BBRI,BBCA,ANTM --grid grid.json --output param_skor.json
+# File grid: {"verdict.buy": [60, 65, 70], "bobot.rvol_naik.*": [10, 15, 20], ...}
+# Catatan: PE/PBV historis (point-in-time) tidak tersedia, jadi sinyal pe_murah/pbv_murah
+# selalu mati di data kalibrasi dan bobotnya tidak ikut terkalibrasi.
+
+KALIBRASI_DIR = os.getenv("KALIBRASI_DIR", "cache_kalibrasi")
+JENDELA_HARIAN = 245   # Scanner live pakai history(period="1y")
+JENDELA_MINGGUAN = 104 # ... dan history(period="2y", interval="1wk")
+HORIZON = [1, 5, 20]   # Hari bursa ke depan
+HORIZON_TIPE = {"BSJP": 1, "BPJS": 1, "SCALPING": 1, "ARA": 1, "SWING": 5, "INVEST": 20}
+REGIME = ["STRONG", "NORMAL", "WEAK", "CRASH"]
+NAMA_SINYAL = list(PARAM_SKOR_DEFAULT['bobot'])
+
+GRID_DEFAULT = {
+    "verdict.strong_buy": [80, 88, 95],
+    "verdict.buy": [55, 60, 65, 70, 75],
+    "min_score.WEAK": [60, 70, 80],
+    "min_score.CRASH": [70, 80, 90],
+    "bobot.rvol_naik.*": [10, 15, 20],
+    "bobot.trend_adx.SWING": [25, 35, 45],
+    "bobot.di_bawah_vwap.SCALPING": [-30, -20, -10]
+}
+
+# ==========================================
+# 1. DATA HISTORIS (DOWNLOAD SEKALI, SIMPAN LOKAL)
+# ==========================================
+def muat_bar(tickers, period="3y"):
+    """
+    Bar harian per ticker dari cache lokal; yang belum ada di-download batch sekali jalan.
+    auto_adjust=True (split/dividen) seperti ambil_data_batch & stock.history di scanner live,
+    supaya bobot dikalibrasi pada deret harga yang sama dengan yang nanti di-skor.
+    """
+    os.makedirs(KALIBRASI_DIR, exist_ok=True)
+    bars = {}; kurang = []
+    for t in tickers:
+        path = os.path.join(KALIBRASI_DIR, f"{t}_adj.pkl") # Akhiran _adj: cache lama (belum di-adjust) tidak dipakai
+        if os.path.exists(path): bars[t] = pd.read_pickle(path)
+        else: kurang.append(t)
+
+    for i in range(0, len(kurang), 50):
+        batch = kurang[i:i + 50]
+        print(f"📥 Download {len(batch)} ticker ({i + len(batch)}/{len(kurang)})...")
+        data = panggil_yahoo(yf.download, [f"{t}.JK" for t in batch], period=period, interval="1d",
+                             group_by="ticker", auto_adjust=True, progress=False, threads=False)
+        for t in batch:
+            try:
+                df = rampingkan_bar(data[f"{t}.JK"].dropna(subset=['Close']))
+                if df.empty: continue
+                df.to_pickle(os.path.join(KALIBRASI_DIR, f"{t}_adj.pkl"))
+                bars[t] = df
+            except Exception as e: print(f"⚠️ {t}: {e}")
+    return bars
+
+def hitung_regime_harian(bars):
+    """Regime breadth (sama dengan hitung_breadth) untuk setiap tanggal historis."""
+    mat = pd.concat({t: df['Close'] for t, df in bars.items()}, axis=1).sort_index()
+    ret = mat.pct_change(fill_method=None)
+    pct_naik = (ret > 0).sum(axis=1) / ret.notna().sum(axis=1).clip(lower=1) * 100
+    median_1d = ret.median(axis=1).fillna(0)
+    ma50 = mat.rolling(50).mean()
+    valid = ma50.notna() & mat.notna()
+    pct_ma50 = ((mat > ma50) & valid).sum(axis=1) / valid.sum(axis=1).clip(lower=1) * 100
+    return pd.Series([REGIME.index(klasifikasi_regime(a, b, c)) for a, b, c in zip(pct_naik, median_1d, pct_ma50)],
+                     index=mat.index)
+
+# ==========================================
+# 2. TAHAP 1: EKSTRAKSI SINYAL (PARALEL PER TICKER)
+# ==========================================
+def ekstrak_sinyal_ticker(tugas):
+    """Worker: satu ticker -> (matriks sinyal, flag weekly bearish, forward return, tanggal)."""
+    ticker, df = tugas
+    close = df['Close'].to_numpy(dtype=np.float64)
+    baris_s = []; baris_b = []; baris_r = []; tanggal = []
+    for t in range(JENDELA_HARIAN - 1, len(df) - 1):
+        try:
+            jendela = df.iloc[t - JENDELA_HARIAN + 1:t + 1]
+            mingguan = resample_mingguan(df.iloc[:t + 1]).tail(JENDELA_MINGGUAN)
+            sinyal = hitung_sinyal_skor(jendela, mingguan, {})
+        except Exception: continue
+        baris_s.append([sinyal[k] for k in NAMA_SINYAL])
+        baris_b.append(sinyal['weekly_trend'] == "BEARISH")
+        baris_r.append([close[t + h] / close[t] - 1 if t + h < len(close) else np.nan for h in HORIZON])
+        tanggal.append(df.index[t])
+    return (ticker, np.array(baris_s, dtype=np.uint8).reshape(-1, len(NAMA_SINYAL)),
+            np.array(baris_b, dtype=bool), np.array(baris_r, dtype=np.float32).reshape(-1, len(HORIZON)), tanggal)
+
+def siapkan_sinyal(bars, proses, paksa=False):
+    path = os.path.join(KALIBRASI_DIR, "sinyal.npz")
+    if os.path.exists(path) and not paksa:
+        data = np.load(path, allow_pickle=True)
+        if set(data['tickers']) == set(bars) and list(data['nama_sinyal']) == NAMA_SINYAL and 'adjusted' in data.files:
+            print(f"♻️ Sinyal dari cache: {len(data['S'])} sampel")
+            return data['S'], data['bearish'], data['R'], data['regime'], data['ticker_idx']
+
+    regime_harian = hitung_regime_harian(bars)
+    t0 = time.time()
+    S = []; B = []; R = []; G = []; T = []
+    urutan = sorted(bars)
+    with ProcessPoolExecutor(max_workers=proses) as pool:
+        for i, (ticker, s, b, r, tgl) in enumerate(pool.map(ekstrak_sinyal_ticker, ((t, bars[t]) for t in urutan))):
+            S.append(s); B.append(b); R.append(r); T.append(np.full(len(s), urutan.index(ticker)))
+            G.append(regime_harian.reindex(tgl).fillna(REGIME.index("NORMAL")).to_numpy(dtype=np.int8))
+            print(f"   ⚙️ {ticker}: {len(s)} sampel ({i + 1}/{len(urutan)}, {time.time() - t0:.0f}s)")
+
+    S, B, R, G, T = (np.concatenate(x) for x in (S, B, R, G, T))
+    np.savez_compressed(path, S=S, bearish=B, R=R, regime=G, ticker_idx=T,
+                        tickers=np.array(urutan), nama_sinyal=np.array(NAMA_SINYAL), adjusted=True)
+    return S, B, R, G, T
+
+# ==========================================
+# 3. TAHAP 2: SWEEP KONFIGURASI (VEKTOR, PARALEL PER CHUNK)
+# ==========================================
+def set_param(param, path, nilai):
+    """'bobot.rvol_naik.SCALPING' / 'bobot.rvol_naik.*' / 'verdict.buy' -> set di dict param."""
+    *induk, kunci = path.split(".")
+    d = param
+    for k in induk: d = d[k]
+    if kunci == "*":
+        for k in d: d[k] = nilai
+    else: d[kunci] = nilai
+
+def daftar_konfigurasi(grid):
+    kunci = list(grid)
+    for kombinasi in itertools.product(*(grid[k] for k in kunci)):
+        param = json.loads(json.dumps(PARAM_SKOR_DEFAULT))
+        for k, v in zip(kunci, kombinasi): set_param(param, k, v)
+        yield dict(zip(kunci, kombinasi)), param
+
+def matriks_bobot(param):
+    W = np.zeros((len(NAMA_SINYAL), len(TIPE_SKOR)), dtype=np.float32)
+    for i, nama in enumerate(NAMA_SINYAL):
+        for tipe, nilai in param['bobot'].get(nama, {}).items(): W[i, TIPE_SKOR.index(tipe)] = nilai
+    return W
+
+DATA_WORKER = {}
+
+def init_worker(S, bearish, R, regime):
+    DATA_WORKER.update({"S": S.astype(np.float32), "bearish": bearish, "R": R, "regime": regime})
+
+def statistik_ret(r):
+    return {
+        "hit_rate": round(float((r > 0).mean() * 100), 2) if len(r) else 0.0,
+        "avg_ret_pct": round(float(r.mean() * 100), 3) if len(r) else 0.0,
+        "median_ret_pct": round(float(np.median(r) * 100), 3) if len(r) else 0.0,
+    }
+
+def evaluasi_konfigurasi(param, S, bearish, R, regime):
+    """
+    Replika keputusan hitung_skor_multistrategy + filter MIN_SCORE scanner, untuk semua sampel sekaligus.
+    Statistik utama (objektif) = seleksi yang SAMA dengan process_single_stock (hanya skor >= MIN_SCORE);
+    subset verdict BUY ke atas dan STRONG BUY dilaporkan terpisah.
+    """
+    scores = S @ matriks_bobot(param)
+    tipe = scores.argmax(axis=1)  # argmax = tipe pertama yang maksimal, sama dengan max(dict)
+    best = scores[np.arange(len(scores)), tipe]
+    best = best - param['penalti_swing_bearish'] * (bearish & (tipe == TIPE_SKOR.index("SWING")))
+
+    min_score = np.array([param['min_score'][r] for r in REGIME], dtype=np.float32)[regime]
+    kolom_h = np.array([HORIZON.index(HORIZON_TIPE[t]) for t in TIPE_SKOR])[tipe]
+    ret = R[np.arange(len(R)), kolom_h]
+    pilih = (best >= min_score) & ~np.isnan(ret)
+    buy = pilih & (best >= param['verdict']['buy'])
+    strong = pilih & (best >= param['verdict']['strong_buy'])
+    stat_buy = statistik_ret(ret[buy])
+    return {
+        "n_sinyal": int(pilih.sum()),
+        **statistik_ret(ret[pilih]),
+        "n_buy": int(buy.sum()),
+        "buy_hit_rate": stat_buy['hit_rate'], "buy_avg_ret_pct": stat_buy['avg_ret_pct'],
+        "n_strong": int(strong.sum()),
+        "strong_avg_ret_pct": round(float(ret[strong].mean() * 100), 3) if strong.any() else 0.0,
+        "per_tipe": {t: int((tipe[pilih] == i).sum()) for i, t in enumerate(TIPE_SKOR) if (tipe[pilih] == i).any()}
+    }
+
+def evaluasi_chunk(chunk):
+    d = DATA_WORKER
+    return [(nilai, evaluasi_konfigurasi(param, d['S'], d['bearish'], d['R'], d['regime'])) for nilai, param in chunk]
+
+def nilai_objektif(stat, objektif, min_sinyal):
+    if stat['n_sinyal'] < min_sinyal: return -np.inf
+    if objektif == "hit_rate": return stat['hit_rate']
+    if objektif == "expectancy": return stat['avg_ret_pct'] * np.sqrt(stat['n_sinyal'])
+    return stat['avg_ret_pct']
+
+def jalankan_sweep(grid, S, bearish, R, regime, proses, objektif, min_sinyal, chunk=200):
+    konfigurasi = list(daftar_konfigurasi(grid))
+    print(f"🎛️ Sweep {len(konfigurasi)} konfigurasi x {len(S)} sampel ({proses} proses)...")
+    t0 = time.time(); hasil = []
+    chunks = [konfigurasi[i:i + chunk] for i in range(0, len(konfigurasi), chunk)]
+    with ProcessPoolExecutor(max_workers=proses, initializer=init_worker, initargs=(S, bearish, R, regime)) as pool:
+        for bagian in pool.map(evaluasi_chunk, chunks): hasil.extend(bagian)
+    print(f"⏱️ Sweep selesai dalam {time.time() - t0:.1f}s")
+    hasil.sort(key=lambda x: nilai_objektif(x[1], objektif, min_sinyal), reverse=True)
+    return hasil
+
+# ==========================================
+# 4. MAIN
+# ==========================================
+def daftar_ticker_default():
+    # Universe yang sama dengan scanner (syariah + bank), tanpa mengimpor server
+    return sorted(set(DATABASE_SYARIAH + DATABASE_BANK))
+
+def main():
+    ap = argparse.ArgumentParser(description="Kalibrasi bobot & threshold scoring multi-strategy")
+    ap.add_argument("--tickers", help="Daftar ticker dipisah koma (default: universe syariah + bank scanner)")
+    ap.add_argument("--period", default="3y")
+    ap.add_argument("--grid", help="File JSON {path_param: [nilai, ...]} (default: GRID_DEFAULT)")
+    ap.add_argument("--objective", default="avg_ret", choices=["avg_ret", "hit_rate", "expectancy"])
+    ap.add_argument("--min-sinyal", type=int, default=50)
+    ap.add_argument("--proses", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--output", default="param_skor.json")
+    ap.add_argument("--ulang", action="store_true", help="Hitung ulang sinyal (abaikan sinyal.npz)")
+    args = ap.parse_args()
+
+    tickers = [t.strip().upper().replace(".JK", "") for t in args.tickers.split(",")] if args.tickers else daftar_ticker_default()
+    grid = GRID_DEFAULT
+    if args.grid:
+        with open(args.grid) as f: grid = json.load(f)
+
+    bars = {t: df for t, df in muat_bar(tickers, args.period).items() if len(df) > JENDELA_HARIAN + 20}
+    if not bars: sys.exit("❌ Tidak ada data historis yang cukup panjang.")
+    S, bearish, R, regime, _ = siapkan_sinyal(bars, args.proses, paksa=args.ulang)
+
+    baseline = evaluasi_konfigurasi(PARAM_SKOR_DEFAULT, S.astype(np.float32), bearish, R, regime)
+    hasil = jalankan_sweep(grid, S, bearish, R, regime, args.proses, args.objective, args.min_sinyal)
+
+    print(f"\n📊 Baseline (V9 hand-tuned): {baseline}")
+    print(f"🏆 Top {args.top} ({args.objective}, min {args.min_sinyal} sinyal):")
+    for nilai, stat in hasil[:args.top]:
+        print(f"   {stat['avg_ret_pct']:+.3f}% | hit {stat['hit_rate']:.1f}% | n={stat['n_sinyal']} "
+              f"| BUY+ {stat['buy_avg_ret_pct']:+.3f}% n={stat['n_buy']} | {nilai}")
+
+    nilai_terbaik, stat_terbaik = hasil[0]
+    if nilai_objektif(stat_terbaik, args.objective, args.min_sinyal) == -np.inf:
+        sys.exit("❌ Tidak ada konfigurasi dengan sinyal cukup. Turunkan --min-sinyal.")
+    param = json.loads(json.dumps(PARAM_SKOR_DEFAULT))
+    for k, v in nilai_terbaik.items(): set_param(param, k, v)
+    with open(args.output, "w") as f:
+        json.dump({
+            "param": gabung_param(PARAM_SKOR_DEFAULT, param),
+            "grid_value": nilai_terbaik, "stats": stat_terbaik, "baseline": baseline,
+            "objective": args.objective, "tickers": len(bars), "samples": int(len(S)),
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }, f, indent=2)
+    print(f"✅ Param terbaik disimpan ke {args.output} (dimuat otomatis oleh scanner saat start)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+# ==========================================
+# PEMBATAS REQUEST YAHOO FINANCE (TOKEN BUCKET + AIMD)
+# ==========================================
+# Semua panggilan ke Yahoo (scanner, detail, intraday) lewat sini supaya satu proses
+# punya satu "keran" bersama. Saat Yahoo throttle (429 / rate limit), keran
+# dikecilkan setengah (multiplicative decrease) lalu dibuka pelan-pelan lagi
+# (additive increase). Request DETAIL (user menunggu) selalu didahulukan dari SCAN.
+# Frame kosong BUKAN throttle: ticker salah / delisting / suspensi memang tidak punya
+# data, jadi langsung dikembalikan ke pemanggil tanpa retry & tanpa mengecilkan keran.
+
+PRIORITAS_DETAIL = 0
+PRIORITAS_SCAN = 1
+
+YAHOO_RATE_MAX = float(os.getenv("YAHOO_RATE", 15))      # Token per detik (batas atas)
+YAHOO_RATE_MIN = 0.5
+YAHOO_BURST = float(os.getenv("YAHOO_BURST", 20))
+YAHOO_KONKURENSI_MAX = int(os.getenv("YAHOO_KONKURENSI", 16))
+YAHOO_MAKS_COBA = 3
+YAHOO_JEDA_DASAR = 0.5 # Detik, dikali 2^percobaan + jitter
+
+STATUS_LIMITER = {
+    "rate": YAHOO_RATE_MAX,
+    "limit": 4.0,               # Batas request paralel (AIMD, float)
+    "tokens": YAHOO_BURST,
+    "t_isi": time.monotonic(),
+    "in_flight": 0,
+    "menunggu": [0, 0],         # Jumlah antrean per prioritas
+    "t_turun": 0.0,             # Kapan terakhir dikecilkan (1x per jendela)
+    "sukses": 0, "kosong": 0, "throttle": 0, "gagal": 0, "retry": 0
+}
+LIMITER_COND = threading.Condition()
+KONTEKS_PRIORITAS = threading.local()
+
+@contextmanager
+def prioritas_yahoo(prioritas):
+    """Semua panggilan Yahoo di thread ini memakai prioritas tsb (default: SCAN)."""
+    lama = getattr(KONTEKS_PRIORITAS, "nilai", PRIORITAS_SCAN)
+    KONTEKS_PRIORITAS.nilai = prioritas
+    try: yield
+    finally: KONTEKS_PRIORITAS.nilai = lama
+
+def isi_token(st):
+    now = time.monotonic()
+    st['tokens'] = min(YAHOO_BURST, st['tokens'] + (now - st['t_isi']) * st['rate'])
+    st['t_isi'] = now
+
+def ambil_slot(prioritas):
+    st = STATUS_LIMITER
+    with LIMITER_COND:
+        st['menunggu'][prioritas] += 1
+        try:
+            while True:
+                isi_token(st)
+                didahului = any(st['menunggu'][p] for p in range(prioritas))
+                if not didahului and st['in_flight'] < int(st['limit']) and st['tokens'] >= 1:
+                    st['tokens'] -= 1
+                    st['in_flight'] += 1
+                    return
+                tunggu = (1 - st['tokens']) / st['rate'] if st['tokens'] < 1 else 0.05
+                LIMITER_COND.wait(timeout=max(0.01, tunggu))
+        finally:
+            st['menunggu'][prioritas] -= 1
+
+def lepas_slot(hasil):
+    """hasil: 'ok' | 'kosong' | 'throttle' | 'gagal'."""
+    st = STATUS_LIMITER
+    with LIMITER_COND:
+        st['in_flight'] -= 1
+        if hasil == "ok":
+            st['sukses'] += 1
+            st['limit'] = min(YAHOO_KONKURENSI_MAX, st['limit'] + 1.0 / st['limit'])
+            st['rate'] = min(YAHOO_RATE_MAX, st['rate'] + 0.1)
+        elif hasil == "kosong":
+            st['kosong'] += 1 # Netral: tidak menaikkan maupun menurunkan keran
+        elif hasil == "throttle":
+            st['throttle'] += 1
+            now = time.monotonic()
+            # Satu kali turun per jendela 2 detik: 10 error serentak = 1 sinyal macet
+            if now - st['t_turun'] > 2.0:
+                st['t_turun'] = now
+                st['limit'] = max(1.0, st['limit'] / 2)
+                st['rate'] = max(YAHOO_RATE_MIN, st['rate'] / 2)
+                st['tokens'] = min(st['tokens'], 0)
+        else:
+            st['gagal'] += 1
+        LIMITER_COND.notify_all()
+
+def is_throttle(error):
+    teks = f"{type(error).__name__} {error}".lower()
+    return "429" in teks or "too many requests" in teks or "ratelimit" in teks or "rate limit" in teks
+
+def is_kosong(hasil):
+    if isinstance(hasil, pd.DataFrame): return hasil.empty
+    return hasil is None
+
+def panggil_yahoo(fungsi, *args, **kwargs):
+    """
+    Jalankan fungsi Yahoo lewat pembatas: antre slot (prioritas thread), lalu hanya
+    error 429 / rate limit yang di-retry dengan backoff eksponensial + jitter.
+    Error lain langsung dilempar, frame kosong langsung dikembalikan ("tidak ada data").
+    """
+    prioritas = getattr(KONTEKS_PRIORITAS, "nilai", PRIORITAS_SCAN)
+    for percobaan in range(YAHOO_MAKS_COBA):
+        ambil_slot(prioritas)
+        try:
+            hasil = fungsi(*args, **kwargs)
+        except Exception as e:
+            if not is_throttle(e):
+                lepas_slot("gagal")
+                raise
+            lepas_slot("throttle")
+            if percobaan == YAHOO_MAKS_COBA - 1: raise
+        else:
+            lepas_slot("kosong" if is_kosong(hasil) else "ok")
+            return hasil
+        with LIMITER_COND: STATUS_LIMITER['retry'] += 1
+        time.sleep(YAHOO_JEDA_DASAR * (2 ** percobaan) * random.uniform(0.5, 1.5))
+
+def status_limiter():
+    with LIMITER_COND:
+        st = STATUS_LIMITER
+        return {
+            "rate_per_sec": round(st['rate'], 2),
+            "concurrency_limit": int(st['limit']),
+            "in_flight": st['in_flight'],
+            "waiting": {"detail": st['menunggu'][PRIORITAS_DETAIL], "scan": st['menunggu'][PRIORITAS_SCAN]},
+            "ok": st['sukses'], "empty": st['kosong'], "throttled": st['throttle'], "failed": st['gagal'], "retries": st['retry']
+        }
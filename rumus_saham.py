@@ -1,88 +1,16 @@
+import os
+import json
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from multiprocessing import shared_memory
+from pembatas_yahoo import panggil_yahoo
 
 # ==========================================
-# 1. ALAT BANTU HITUNG (15 INDIKATOR LENGKAP)
+# 1. ALAT BANTU HITUNG (LEVEL & STRUKTUR)
 # ==========================================
-
-def hitung_rsi(series, period=14):
-    delta = series.diff(1)
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def hitung_bollinger(series, window=20):
-    sma = series.rolling(window=window).mean()
-    std = series.rolling(window=window).std()
-    return sma + (std * 2), sma - (std * 2)
-
-def hitung_bollinger_bandwidth(upper, lower, middle):
-    return ((upper - lower) / middle) * 100
-
-def hitung_macd(series, fast=12, slow=26, signal=9):
-    exp1 = series.ewm(span=fast, adjust=False).mean()
-    exp2 = series.ewm(span=slow, adjust=False).mean()
-    macd = exp1 - exp2
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    return macd, signal_line
-
-def hitung_obv(close, volume):
-    obv = (np.sign(close.diff()) * volume).fillna(0).cumsum()
-    return obv
-
-def hitung_rvol(volume, window=20):
-    avg_vol = volume.rolling(window=window).mean()
-    rvol = volume / avg_vol
-    return rvol
-
-def hitung_smart_money_flow(df, period=20):
-    close = df['Close']; high = df['High']; low = df['Low']; vol = df['Volume']
-    range_hl = (high - low).replace(0, 0.001)
-    iii = ((2 * close - high - low) / range_hl) * vol
-    smf = iii.rolling(window=period).sum()
-    return smf
-
-def hitung_stochastic(high, low, close, k_window=14, d_window=3):
-    low_min = low.rolling(window=k_window).min()
-    high_max = high.rolling(window=k_window).max()
-    denom = (high_max - low_min).replace(0, 0.001)
-    k_percent = 100 * ((close - low_min) / denom)
-    d_percent = k_percent.rolling(window=d_window).mean()
-    return k_percent, d_percent
-
-def hitung_vwap(df):
-    v = df['Volume']
-    tp = (df['High'] + df['Low'] + df['Close']) / 3
-    return (tp * v).cumsum() / v.cumsum()
-
-def hitung_adx(high, low, close, period=14):
-    plus_dm = high.diff(); minus_dm = low.diff()
-    plus_dm[plus_dm < 0] = 0; minus_dm[minus_dm > 0] = 0
-    tr1 = pd.DataFrame(high - low); tr2 = pd.DataFrame(abs(high - close.shift(1)))
-    tr3 = pd.DataFrame(abs(low - close.shift(1)))
-    tr = pd.concat([tr1, tr2, tr3], axis=1, join='inner').max(axis=1)
-    atr = tr.rolling(period).mean()
-    plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
-    minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
-    dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
-    adx = dx.rolling(period).mean()
-    return adx
-
-def hitung_cmf(high, low, close, volume, period=20):
-    mfv = ((close - low) - (high - close)) / (high - low).replace(0, 0.001)
-    mfv = mfv * volume
-    cmf = mfv.rolling(period).sum() / volume.rolling(period).sum()
-    return cmf
-
-def hitung_atr(high, low, close, period=14):
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(period).mean()
+# Rumus indikator (RSI, MACD, ATR, ADX, dst.) hanya ada di GRAF INDIKATOR di bawah.
 
 def hitung_fibonacci_levels(df, lookback=120):
     recent_high = df['High'].tail(lookback).max()
@@ -105,27 +33,288 @@ def hitung_fractals(df):
                      (low < low.shift(-1)) & (low < low.shift(-2))
     return is_fractal_high, is_fractal_low
 
-def hitung_force_index(df, period=13):
-    fi = df['Close'].diff(1) * df['Volume']
-    return fi.ewm(span=period, adjust=False).mean()
+def hitung_pivot(prev_candle):
+    """Pivot Points klasik (Floor Traders) dari candle sebelumnya."""
+    h, l, c = prev_candle['High'], prev_candle['Low'], prev_candle['Close']
+    pp = (h + l + c) / 3
+    return {"pp": pp, "r1": (2 * pp) - l, "s1": (2 * pp) - h, "r2": pp + (h - l), "s2": pp - (h - l)}
+
+def hitung_level_sr(df, maks_fractal=3, graf=None):
+    """
+    Semua level support/resistance penting untuk bar terakhir: Fibonacci, fractal terakhir,
+    pivot S/R, MA20/50/200, Bollinger bawah & VWAP. Return dict nama -> harga.
+    """
+    g = graf if graf is not None else graf_indikator(df)
+    level = {f"fibo_{round(float(k) * 1000)}": v for k, v in nilai_node(g, "fibo_120").items()}
+    for i, harga in enumerate(df['High'][nilai_node(g, "fractal_high")].tail(maks_fractal)[::-1]): level[f"fractal_high_{i + 1}"] = harga
+    for i, harga in enumerate(df['Low'][nilai_node(g, "fractal_low")].tail(maks_fractal)[::-1]): level[f"fractal_low_{i + 1}"] = harga
+    if len(df) >= 2: level.update(hitung_pivot(df.iloc[-2]))
+    for n in (20, 50, 200):
+        if len(df) >= n: level[f"sma_{n}"] = akhir(g, f"sma_{n}")
+    level["bb_lower"] = akhir(g, "bb_lower")
+    level["vwap"] = akhir(g, "vwap")
+    return {k: round(float(v), 2) for k, v in level.items() if pd.notna(v) and v > 0}
+
+# --- GRAF INDIKATOR (SETIAP PERANTARA DIHITUNG SEKALI PER SET BAR) ---
+# Node = (fungsi, dependensi). graf_indikator(df) membuat memo kosong untuk satu set bar;
+# nilai_node(graf, "atr_14") menghitung node + dependensinya sekali, lalu dipakai ulang oleh
+# siapa pun yang memintanya (scoring scanner, level S/R, laporan 13 indikator detail).
+# Contoh: tr dipakai atr_14 & adx_14, sma_20 dipakai Bollinger, bandwidth, squeeze & level.
+NODE_INDIKATOR = {}
+
+def node(nama, *dependensi):
+    def daftar(fungsi):
+        NODE_INDIKATOR[nama] = (fungsi, dependensi)
+        return fungsi
+    return daftar
+
+def graf_indikator(df):
+    return {"df": df, "open": df['Open'], "high": df['High'], "low": df['Low'],
+            "close": df['Close'], "volume": df['Volume']}
+
+def nilai_node(graf, nama):
+    if nama not in graf:
+        fungsi, dependensi = NODE_INDIKATOR[nama]
+        graf[nama] = fungsi(*(nilai_node(graf, d) for d in dependensi))
+    return graf[nama]
+
+def akhir(graf, nama, mundur=1):
+    """Nilai node di bar terakhir (mundur=2 -> bar sebelumnya)."""
+    return nilai_node(graf, nama).iloc[-mundur]
+
+# Rata-rata bergerak & rolling window dipakai bersama
+for _n in (5, 20, 50, 200):
+    node(f"sma_{_n}", "close")(lambda close, n=_n: close.rolling(window=n).mean())
+for _n in (9, 14, 26, 52):
+    node(f"high_max_{_n}", "high")(lambda high, n=_n: high.rolling(window=n).max())
+    node(f"low_min_{_n}", "low")(lambda low, n=_n: low.rolling(window=n).min())
+del _n
+
+node("delta", "close")(lambda close: close.diff(1))
+node("prev_close", "close")(lambda close: close.shift(1))
+node("range_hl", "high", "low")(lambda high, low: (high - low).replace(0, 0.001))
+node("std_20", "close")(lambda close: close.rolling(window=20).std())
+node("vol_sum_20", "volume")(lambda volume: volume.rolling(window=20).sum())
+node("vol_sma_20", "vol_sum_20")(lambda vol_sum: vol_sum / 20)
+
+# Volatilitas: true range SATU kali untuk ATR & ADX
+node("tr", "high", "low", "prev_close")(
+    lambda high, low, prev_close: pd.concat([high - low, abs(high - prev_close), abs(low - prev_close)], axis=1).max(axis=1))
+node("atr_14", "tr")(lambda tr: tr.rolling(14).mean())
+node("bb_upper", "sma_20", "std_20")(lambda sma, std: sma + (std * 2))
+node("bb_lower", "sma_20", "std_20")(lambda sma, std: sma - (std * 2))
+node("bb_bandwidth", "bb_upper", "bb_lower", "sma_20")(lambda upper, lower, middle: ((upper - lower) / middle) * 100)
+
+# Momentum
+@node("rsi_14", "delta")
+def _node_rsi(delta, period=14):
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+node("ema_12", "close")(lambda close: close.ewm(span=12, adjust=False).mean())
+node("ema_26", "close")(lambda close: close.ewm(span=26, adjust=False).mean())
+node("macd", "ema_12", "ema_26")(lambda ema12, ema26: ema12 - ema26)
+node("macd_signal", "macd")(lambda macd: macd.ewm(span=9, adjust=False).mean())
+node("macd_hist", "macd", "macd_signal")(lambda macd, signal: macd - signal)
+node("stoch_k", "close", "low_min_14", "high_max_14")(
+    lambda close, low_min, high_max: 100 * ((close - low_min) / (high_max - low_min).replace(0, 0.001)))
+node("stoch_d", "stoch_k")(lambda k: k.rolling(window=3).mean())
+
+@node("adx_14", "high", "low", "atr_14")
+def _node_adx(high, low, atr, period=14):
+    plus_dm = high.diff(); minus_dm = low.diff()
+    plus_dm[plus_dm < 0] = 0; minus_dm[minus_dm > 0] = 0
+    plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
+    minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
+    dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
+    return dx.rolling(period).mean()
+
+# Volume & bandar
+node("obv", "delta", "volume")(lambda delta, volume: (np.sign(delta) * volume).fillna(0).cumsum())
+node("rvol", "volume", "vol_sma_20")(lambda volume, avg: volume / avg)
+node("smf_20", "close", "high", "low", "volume", "range_hl")(
+    lambda close, high, low, vol, rng: (((2 * close - high - low) / rng) * vol).rolling(window=20).sum())
+node("cmf_20", "close", "high", "low", "volume", "range_hl", "vol_sum_20")(
+    lambda close, high, low, vol, rng, vol_sum: ((((close - low) - (high - close)) / rng) * vol).rolling(20).sum() / vol_sum)
+node("vwap", "high", "low", "close", "volume")(
+    lambda high, low, close, v: (((high + low + close) / 3) * v).cumsum() / v.cumsum())
+node("force_13", "delta", "volume")(lambda delta, volume: (delta * volume).ewm(span=13, adjust=False).mean())
+
+# Struktur
+node("fractal_high", "df")(lambda df: hitung_fractals(df)[0])
+node("fractal_low", "df")(lambda df: hitung_fractals(df)[1])
+node("fibo_120", "df")(lambda df: hitung_fibonacci_levels(df, lookback=120))
+node("pola", "df")(lambda df: deteksi_pola_df(df))
+
+# --- MESIN POLA CANDLE VEKTOR (SEMUA BAR, SEMUA TICKER SEKALIGUS) ---
+# Tiap pola = (nama, bit, fungsi mask). Fungsi menerima array o, h, l, c dan
+# versi bar sebelumnya (po, ph, pl, pc) lalu mengembalikan boolean array.
+# Untuk menambah pola cukup tambahkan baris baru di POLA_CANDLE (bit berikutnya).
+def _mask_doji(o, h, l, c, po, ph, pl, pc):
+    rng = h - l
+    return (np.abs(c - o) <= rng * 0.1) & (rng > 0)
+
+def _mask_hammer(o, h, l, c, po, ph, pl, pc):
+    body = np.abs(c - o); rng = h - l
+    upper = h - np.maximum(o, c); lower = np.minimum(o, c) - l
+    return (lower >= body * 2) & (upper <= body * 0.5) & (rng > 0)
+
+def _mask_bull_marubozu(o, h, l, c, po, ph, pl, pc):
+    rng = h - l
+    return (np.abs(c - o) > rng * 0.85) & (rng > 0) & (c > o)
+
+def _mask_bear_marubozu(o, h, l, c, po, ph, pl, pc):
+    rng = h - l
+    return (np.abs(c - o) > rng * 0.85) & (rng > 0) & ~(c > o)
+
+def _mask_bull_engulfing(o, h, l, c, po, ph, pl, pc):
+    return (pc < po) & (c > o) & (c > po) & (o < pc)
+
+POLA_CANDLE = [
+    ("Doji", 1 << 0, _mask_doji),
+    ("Hammer", 1 << 1, _mask_hammer),
+    ("Bullish Marubozu", 1 << 2, _mask_bull_marubozu),
+    ("Bearish Marubozu", 1 << 3, _mask_bear_marubozu),
+    ("Bullish Engulfing", 1 << 4, _mask_bull_engulfing),
+]
+BIT_POLA = {nama: bit for nama, bit, _ in POLA_CANDLE}
+
+def deteksi_pola_vektor(open_p, high_p, low_p, close_p):
+    """
+    Input array 1D (bar) atau 2D (bar x ticker). Output bitmask uint16 dengan shape sama.
+    Bar pertama tidak punya bar sebelumnya, jadi pola 2-candle di bar itu selalu 0.
+    """
+    o = np.asarray(open_p, dtype=float); h = np.asarray(high_p, dtype=float)
+    l = np.asarray(low_p, dtype=float); c = np.asarray(close_p, dtype=float)
+    po = np.full_like(o, np.nan); ph = np.full_like(h, np.nan)
+    pl = np.full_like(l, np.nan); pc = np.full_like(c, np.nan)
+    po[1:] = o[:-1]; ph[1:] = h[:-1]; pl[1:] = l[:-1]; pc[1:] = c[:-1]
+
+    mask = np.zeros(o.shape, dtype=np.uint16)
+    with np.errstate(invalid='ignore'):
+        for _, bit, fungsi in POLA_CANDLE:
+            mask |= np.where(fungsi(o, h, l, c, po, ph, pl, pc), bit, 0).astype(np.uint16)
+    return mask
+
+def deteksi_pola_df(df):
+    """Bitmask pola untuk seluruh histori 1 ticker (Series sejajar index df)."""
+    mask = deteksi_pola_vektor(df['Open'].values, df['High'].values, df['Low'].values, df['Close'].values)
+    return pd.Series(mask, index=df.index, name="pola_candle")
+
+def nama_pola(mask):
+    mask = int(mask)
+    return [nama for nama, bit, _ in POLA_CANDLE if mask & bit]
 
 def deteksi_candle_pattern(row, prev_row):
-    open_p, close_p = row['Open'], row['Close']
-    high_p, low_p = row['High'], row['Low']
-    body = abs(close_p - open_p)
-    range_len = high_p - low_p
-    upper_shadow = high_p - max(open_p, close_p)
-    lower_shadow = min(open_p, close_p) - low_p
-    pola = []
-    if body <= (range_len * 0.1) and range_len > 0: pola.append("Doji")
-    if lower_shadow >= (body * 2) and upper_shadow <= (body * 0.5) and range_len > 0: pola.append("Hammer")
-    if body > (range_len * 0.85) and range_len > 0:
-        if close_p > open_p: pola.append("Bullish Marubozu")
-        else: pola.append("Bearish Marubozu")
-    if (prev_row['Close'] < prev_row['Open']) and (close_p > open_p): 
-        if close_p > prev_row['Open'] and open_p < prev_row['Close']:
-            pola.append("Bullish Engulfing")
-    return pola
+    # Versi 2 bar (kompatibel lama) -> memakai mesin vektor yang sama
+    kolom = ['Open', 'High', 'Low', 'Close']
+    o, h, l, c = ([prev_row[k], row[k]] for k in kolom)
+    return nama_pola(deteksi_pola_vektor(o, h, l, c)[-1])
+
+# --- MATRIKS UNIVERSE & BREADTH PASAR ---
+def susun_matriks_harga(bars, kolom='Close'):
+    """bars: dict ticker -> DataFrame OHLCV. Return matriks (tanggal x ticker) yang sejajar."""
+    seri = {t: df[kolom] for t, df in bars.items() if df is not None and not df.empty}
+    if not seri: return pd.DataFrame()
+    return pd.concat(seri, axis=1).sort_index()
+
+def klasifikasi_regime(pct_naik, median_1d, pct_ma50):
+    if pct_naik < 25 and median_1d <= -0.008: return "CRASH"
+    elif pct_naik < 40 or pct_ma50 < 35: return "WEAK"
+    elif pct_naik > 60 and pct_ma50 > 60: return "STRONG"
+    return "NORMAL"
+
+def hitung_breadth(mat_close, sektor_map):
+    """
+    Advance/decline, % di atas MA50/MA200 dan return per sektor dari matriks close.
+    Regime: CRASH / WEAK / NORMAL / STRONG.
+    """
+    ret = mat_close.pct_change(fill_method=None)
+    ret_1d = ret.iloc[-1].dropna()
+    ret_5d = (mat_close.iloc[-1] / mat_close.iloc[-6] - 1).dropna() if len(mat_close) > 5 else ret_1d
+
+    naik = int((ret_1d > 0).sum()); turun = int((ret_1d < 0).sum()); tetap = int((ret_1d == 0).sum())
+    total = max(len(ret_1d), 1)
+    last = mat_close.iloc[-1]
+    ma50 = mat_close.rolling(50).mean().iloc[-1]
+    ma200 = mat_close.rolling(200).mean().iloc[-1]
+    valid50 = ma50.notna() & last.notna(); valid200 = ma200.notna() & last.notna()
+    pct_ma50 = float((last[valid50] > ma50[valid50]).mean() * 100) if valid50.any() else 0.0
+    pct_ma200 = float((last[valid200] > ma200[valid200]).mean() * 100) if valid200.any() else 0.0
+
+    sektor = pd.Series(sektor_map)
+    per_sektor = pd.DataFrame({
+        "ret_1d": ret_1d.groupby(sektor.reindex(ret_1d.index)).mean() * 100,
+        "ret_5d": ret_5d.groupby(sektor.reindex(ret_5d.index)).mean() * 100,
+        "naik": (ret_1d > 0).groupby(sektor.reindex(ret_1d.index)).mean() * 100,
+        "jumlah": ret_1d.groupby(sektor.reindex(ret_1d.index)).size()
+    }).round(2).sort_values("ret_1d", ascending=False)
+
+    pct_naik = naik / total * 100
+    median_1d = float(ret_1d.median()) if len(ret_1d) else 0.0
+    return {
+        "regime": klasifikasi_regime(pct_naik, median_1d, pct_ma50),
+        "tickers": total,
+        "advance": naik, "decline": turun, "unchanged": tetap,
+        "ad_ratio": round(naik / max(turun, 1), 2),
+        "pct_advance": round(pct_naik, 2),
+        "median_change_pct": round(median_1d * 100, 2),
+        "pct_above_ma50": round(pct_ma50, 2),
+        "pct_above_ma200": round(pct_ma200, 2),
+        "sectors": [
+            {"sector": k, "ret_1d": float(v['ret_1d']), "ret_5d": float(v['ret_5d']), "pct_advance": float(v['naik']), "tickers": int(v['jumlah'])}
+            for k, v in per_sektor.to_dict("index").items()
+        ],
+        "as_of": str(mat_close.index[-1])[:10]
+    }
+
+# --- RELATIVE STRENGTH & KORELASI (CROSS-SECTIONAL, SATU OPERASI MATRIKS) ---
+LOOKBACK_RS = (5, 20, 60, 120)
+
+def hitung_relative_strength(mat_close, sektor_map, lookbacks=LOOKBACK_RS):
+    """
+    Return per lookback untuk SEMUA ticker sekaligus (indexing baris array close), lalu
+    persentil rank lintas universe & dalam sektor. Skor RS = rata-rata persentil semua lookback.
+    Ticker yang historinya belum mencakup semua lookback (IPO baru) tidak ikut diranking:
+    kolom "partial" = True, rs_score / rs_rank kosong (NaN), ditaruh di bawah.
+    """
+    arr = mat_close.ffill().to_numpy(dtype=np.float64)
+    lookbacks = [lb for lb in lookbacks if lb < len(arr)]
+    if not lookbacks: return pd.DataFrame()
+    # (n_lookback x n_ticker) dalam satu langkah
+    ret = arr[-1] / arr[[-1 - lb for lb in lookbacks]] - 1
+    tabel = pd.DataFrame(ret.T * 100, index=mat_close.columns, columns=[f"ret_{lb}d" for lb in lookbacks])
+    tabel = tabel[tabel.notna().any(axis=1)]
+    tabel["partial"] = tabel.isna().any(axis=1)
+    lengkap = ~tabel["partial"]
+    kolom_ret = [f"ret_{lb}d" for lb in lookbacks]
+    rank = tabel.loc[lengkap, kolom_ret].rank(pct=True) * 100
+    tabel["rs_score"] = rank.mean(axis=1)
+    tabel["rs_rank"] = tabel["rs_score"].rank(ascending=False, method="min")
+    tabel["sector"] = [sektor_map.get(t, "LAINNYA") for t in tabel.index]
+    tabel["rs_sector_pct"] = tabel.groupby("sector")["rs_score"].rank(pct=True) * 100
+    return tabel.sort_values("rs_score", ascending=False, na_position="last")
+
+def hitung_korelasi(mat_close, window=60):
+    """
+    Matriks korelasi return harian `window` bar terakhir: standarisasi lalu Z.T @ Z (satu matmul).
+    Ticker yang datanya bolong > separuh jendela dibuang; bolong kecil diisi rata-rata (z = 0).
+    """
+    ret = np.log(mat_close.tail(window + 1)).diff().iloc[1:]
+    ret = ret.loc[:, ret.notna().sum() >= max(window // 2, 2)]
+    if ret.shape[1] < 2: return pd.DataFrame()
+    arr = ret.to_numpy(dtype=np.float64)
+    std = np.nanstd(arr, axis=0)
+    z = np.nan_to_num((arr - np.nanmean(arr, axis=0)) / np.where(std > 0, std, np.nan))
+    korelasi = np.clip(z.T @ z / len(z), -1, 1)
+    return pd.DataFrame(korelasi, index=ret.columns, columns=ret.columns)
+
+def korelasi_sektor(korelasi, sektor_map):
+    """Rata-rata korelasi antar blok sektor (diagonal = rata-rata korelasi dalam sektor, tanpa diri sendiri)."""
+    sektor = pd.Series([sektor_map.get(t, "LAINNYA") for t in korelasi.index], index=korelasi.index)
+    tanpa_diri = korelasi.where(~np.eye(len(korelasi), dtype=bool))
+    return tanpa_diri.T.groupby(sektor).mean().T.groupby(sektor).mean()
 
 # ==========================================
 # 2. FUNGSI AMBIL BERITA
@@ -135,7 +324,7 @@ def ambil_berita_saham(ticker):
         kode_bersih = ticker.replace(".JK", "")
         if not ticker.endswith(".JK"): ticker += ".JK"
         stock = yf.Ticker(kode_bersih)
-        raw_news = stock.news
+        raw_news = panggil_yahoo(lambda: stock.news)
         berita_bersih = []
         if raw_news:
             for n in raw_news[:5]: 
@@ -158,218 +347,157 @@ def ambil_berita_saham(ticker):
 # ==========================================
 # 3. OTAK UTAMA: ANALISA MULTI-STRATEGY (V9 - ALL SYSTEMS GO)
 # ==========================================
+HASIL_ERROR = {
+    "score": 0, "verdict": "ERROR", "type": "ERROR",
+    "reason": "", "last_price": 0, "change_pct": 0,
+    "support": 0, "stop_loss":0, "target_price":0
+}
+
+# --- PARAMETER SCORING (BOBOT SINYAL, THRESHOLD VERDICT, MIN SCORE PER REGIME) ---
+# Default = angka hand-tuned engine V9. Bisa ditimpa file JSON hasil kalibrasi_skor.py
+# (env PARAM_SKOR_PATH, default param_skor.json); kunci yang tidak ada tetap default.
+TIPE_SKOR = ["BSJP", "BPJS", "SCALPING", "SWING", "ARA", "INVEST"]
+
+PARAM_SKOR_DEFAULT = {
+    "bobot": {
+        # 1. BASE SCORE (INVEST dapat +20 lagi di blok INVEST)
+        "weekly_bullish": {"BSJP": 10, "BPJS": 10, "SCALPING": 10, "SWING": 10, "ARA": 10, "INVEST": 30},
+        # 2. VOLUME & BANDAR (BSJP dapat +25 lagi di blok BSJP)
+        "rvol_naik": {"SCALPING": 15, "ARA": 15, "BSJP": 15},
+        "smart_money": {"SWING": 15, "BSJP": 40, "SCALPING": 15},
+        "force_bullish": {"SCALPING": 10, "SWING": 10},
+        # 3. ARA HUNTER
+        "ara_lonjakan": {"ARA": 40},
+        "tutup_di_high": {"ARA": 20},
+        "gap_up": {"ARA": 15, "BPJS": 30},
+        "cmf_inflow": {"ARA": 15, "SWING": 10},
+        # 4. SCALPING
+        "atr_lebar": {"SCALPING": 20},
+        "di_atas_vwap": {"SCALPING": 30},
+        "di_bawah_vwap": {"SCALPING": -20},
+        "fractal_breakout": {"SCALPING": 20},
+        # 5. SWING
+        "trend_adx": {"SWING": 35},
+        "golden_cross": {"SWING": 30},
+        "squeeze": {"SWING": 20},
+        "macd_bullish": {"SWING": 15},
+        "stoch_swing": {"SWING": 10},
+        "dekat_ma20": {"SWING": 15},
+        "jauh_ma20": {"SWING": -10},
+        # 6. BSJP
+        "strong_close": {"BSJP": 30},
+        "tutup_dekat_high": {"BSJP": 30},
+        "stoch_naik": {"BSJP": 10},
+        # 7. BPJS
+        "momentum_pagi": {"BPJS": 40},
+        "hammer_oversold": {"BPJS": 30},
+        "stoch_oversold": {"BPJS": 20},
+        # 8. INVEST
+        "pe_murah": {"INVEST": 25},
+        "pbv_murah": {"INVEST": 25},
+        "di_atas_ma200": {"INVEST": 30},
+    },
+    "penalti_swing_bearish": 30,
+    "verdict": {"strong_buy": 88, "buy": 65, "neutral": 50},
+    "min_score": {"STRONG": 60, "NORMAL": 60, "WEAK": 70, "CRASH": 80}
+}
+
+def gabung_param(dasar, timpa):
+    """Merge rekursif dict parameter (timpa menang), tanpa mengubah `dasar`."""
+    hasil = {}
+    for k, v in dasar.items():
+        hasil[k] = gabung_param(v, timpa[k]) if isinstance(v, dict) and isinstance(timpa.get(k), dict) else timpa.get(k, v)
+    for k, v in timpa.items():
+        if k not in hasil: hasil[k] = v
+    return hasil
+
+def muat_param_skor(path=None):
+    path = path or os.getenv("PARAM_SKOR_PATH", "param_skor.json")
+    if not os.path.exists(path): return gabung_param(PARAM_SKOR_DEFAULT, {})
+    try:
+        with open(path) as f: timpa = json.load(f)
+        print(f"🎛️ Param Skor dimuat dari {path}")
+        return gabung_param(PARAM_SKOR_DEFAULT, timpa.get('param', timpa))
+    except Exception as e:
+        print(f"⚠️ Param Skor Gagal ({path}): {e}")
+        return gabung_param(PARAM_SKOR_DEFAULT, {})
+
+PARAM_SKOR = muat_param_skor()
+
+def ambil_data_multistrategy(ticker):
+    """Tahap I/O: ambil bar harian, mingguan & info dari Yahoo (langsung dirampingkan)."""
+    if not ticker.endswith(".JK"): ticker += ".JK"
+    stock = yf.Ticker(ticker)
+    df = rampingkan_bar(panggil_yahoo(stock.history, period="1y", interval="1d"))
+    df_weekly = rampingkan_bar(panggil_yahoo(stock.history, period="2y", interval="1wk"))
+    info = panggil_yahoo(lambda: stock.info)
+    # Dari ~150 field .info cuma ini yang dipakai scoring; sisanya dibuang sebelum antre di frames
+    info = {k: (info or {}).get(k) for k in INFO_SKOR}
+    return df, df_weekly, info
+
+def ambil_data_batch(tickers, info_map=None):
+    """
+    Versi batch ambil_data_multistrategy: SATU yf.download 2 tahun untuk semua ticker.
+    Harian = 1 tahun terakhir (sama dengan scanner), mingguan = resample dari harian
+    (hemat request interval='1wk'). info_map: ticker -> {trailingPE, priceToBook} dari cache
+    fundamental, karena download batch tidak membawa .info.
+    """
+    tickers = [t if t.endswith(".JK") else t + ".JK" for t in tickers]
+    if not tickers: return {}
+    raw = panggil_yahoo(yf.download, tickers, period="2y", interval="1d", group_by="ticker",
+                        progress=False, threads=False, auto_adjust=True)
+    frames = {}
+    if raw is None or raw.empty: return frames
+    for ticker in tickers:
+        try:
+            df = raw[ticker] if isinstance(raw.columns, pd.MultiIndex) else raw
+            df = rampingkan_bar(df.dropna(subset=['Close']))
+        except KeyError: continue
+        if df.empty: continue
+        df_weekly = resample_mingguan(df)
+        df = df[df.index > df.index[-1] - pd.DateOffset(years=1)]
+        info = {k: ((info_map or {}).get(ticker) or {}).get(k) for k in INFO_SKOR}
+        frames[ticker] = (df, df_weekly, info)
+    return frames
+
 def analisa_multistrategy(ticker):
     try:
         if not ticker.endswith(".JK"): ticker += ".JK"
-        stock = yf.Ticker(ticker)
-        
-        # --- AMBIL DATA ---
-        df = stock.history(period="1y", interval="1d")
-        df_weekly = stock.history(period="2y", interval="1wk")
-        info = stock.info 
-        
+        df, df_weekly, info = ambil_data_multistrategy(ticker)
+    except Exception as e:
+        return {**HASIL_ERROR, "reason": str(e)}
+    return hitung_skor_multistrategy(ticker, df, df_weekly, info)
+
+def hitung_skor_multistrategy(ticker, df, df_weekly, info, strategi=None, param=None):
+    """
+    Tahap CPU: scoring murni dari bar yang sudah ada (tanpa network).
+    `strategi` membatasi kandidat tipe (misal mode intraday: SCALPING/BPJS/BSJP).
+    `param` menimpa PARAM_SKOR (dipakai alat kalibrasi).
+    """
+    try:
         if df.empty or len(df) < 60: 
             return {"verdict": "SKIP", "reason": "Data Kurang", "score": 0, "type": "UNKNOWN", "last_price": 0, "change_pct": 0, "support": 0}
 
-        # --- DATA MENTAH ---
-        last = df.iloc[-1]; prev = df.iloc[-2]
-        last_price = float(last['Close']); prev_close = float(prev['Close'])
-        change_pct = (last_price - prev_close) / prev_close
-        open_price = last['Open']; high_price = last['High']; low_price = last['Low']
-        
-        # --- INDIKATOR DASAR ---
-        atr = hitung_atr(df['High'], df['Low'], df['Close']).iloc[-1] 
-        
-        # [POIN 3]: GAP UP VALID (Volatilitas check)
-        gap_nominal = open_price - prev_close
-        gap_percent = gap_nominal / prev_close
-        is_gap_up = (gap_percent > 0.005) and (gap_nominal > (atr * 0.5))
-
-        # --- INDIKATOR LANJUTAN ---
-        sma_5 = df['Close'].rolling(window=5).mean().iloc[-1]
-        sma_20 = df['Close'].rolling(window=20).mean().iloc[-1]
-        sma_50 = df['Close'].rolling(window=50).mean().iloc[-1]
-        sma_200 = df['Close'].rolling(window=200).mean().iloc[-1] if len(df) > 200 else 0
-        
-        is_golden_cross = (df['Close'].rolling(50).mean().iloc[-2] < df['Close'].rolling(200).mean().iloc[-2]) and (sma_50 > sma_200)
-
-        rsi = hitung_rsi(df['Close']).iloc[-1]
-        bb_upper, bb_lower = hitung_bollinger(df['Close'])
-        last_bb_lower = bb_lower.iloc[-1]
-        bandwidth = hitung_bollinger_bandwidth(bb_upper, bb_lower, sma_20).iloc[-1]
-        is_squeeze = bandwidth < 5.0
-
-        macd, macd_signal = hitung_macd(df['Close'])
-        last_macd = macd.iloc[-1]; last_signal = macd_signal.iloc[-1]
-        
-        last_rvol = hitung_rvol(df['Volume']).iloc[-1]
-        
-        # [POIN 1]: SMART MONEY FLOW (Filter Drop)
-        smf_series = hitung_smart_money_flow(df)
-        smf_now = smf_series.iloc[-1]; smf_prev = smf_series.iloc[-2]
-        is_smart_money_in = (smf_now > 0) and (smf_now >= (smf_prev * 0.9))
-
-        stoch_k, stoch_d = hitung_stochastic(df['High'], df['Low'], df['Close'])
-        last_k = stoch_k.iloc[-1]; last_d = stoch_d.iloc[-1] # Disimpan untuk Scoring
-        
-        last_vwap = hitung_vwap(df).iloc[-1]
-        adx = hitung_adx(df['High'], df['Low'], df['Close']).iloc[-1]
-        
-        cmf = hitung_cmf(df['High'], df['Low'], df['Close'], df['Volume']).iloc[-1]
-        money_inflow = cmf > 0.05
-        
-        fibs = hitung_fibonacci_levels(df)
-        pola_candle = deteksi_candle_pattern(last, prev)
-
-        # [POIN 2]: FORCE INDEX VALIDATION
-        fi_series = hitung_force_index(df)
-        fi_now = fi_series.iloc[-1]; fi_prev = fi_series.iloc[-2]
-        is_force_bullish = (fi_now > 0) and (fi_now >= (fi_prev * 0.8))
-        
-        # [POIN 5]: FRACTAL BREAKOUT (Volume Check)
-        frac_high, _ = hitung_fractals(df)
-        last_fractal_high = df[frac_high]['High'].iloc[-1] if not df[frac_high].empty else last_price * 1.5
-        is_fractal_breakout = (last_price > last_fractal_high) and (last_rvol >= 1.0)
-
-        # --- ANALISA WEEKLY ---
-        weekly_trend = "NEUTRAL"
-        if not df_weekly.empty and len(df_weekly) > 50:
-            w_sma_50 = df_weekly['Close'].rolling(window=50).mean().iloc[-1]
-            if df_weekly['Close'].iloc[-1] > w_sma_50: weekly_trend = "BULLISH"
-            else: weekly_trend = "BEARISH"
-
-        pe = info.get('trailingPE', 100) if info.get('trailingPE') else 100
-        pbv = info.get('priceToBook', 10) if info.get('priceToBook') else 10
-
-        # [POIN 4]: ADX CONTEXT
-        min_adx = 20 if weekly_trend == "BULLISH" else 25
-        is_trending = adx > min_adx
-        is_uptrend_ma = last_price > sma_50
-
-        # ==========================================
-        # SCORING ENGINE V9 (ALL INDICATORS ACTIVE)
-        # ==========================================
-        scores = {"BSJP": 0, "BPJS": 0, "SCALPING": 0, "SWING": 0, "ARA": 0, "INVEST": 0}
-        reasons = []
-
-        # 1. BASE SCORE
-        if weekly_trend == "BULLISH": 
-            for k in scores: scores[k] += 10
-            reasons.append("Weekly Uptrend")
-        
-        # 2. VOLUME & BANDAR
-        if last_rvol > 1.2: 
-            for k in ["SCALPING", "ARA", "BSJP"]: scores[k] += 15
-            reasons.append("Volume Naik")
-        if is_smart_money_in:
-            for k in ["SWING", "BSJP", "SCALPING"]: scores[k] += 15
-            reasons.append("Smart Money")
-        if is_force_bullish:
-            for k in ["SCALPING", "SWING"]: scores[k] += 10
-            reasons.append("Momentum Kuat")
-
-        # 3. ARA HUNTER
-        if change_pct > 0.04 and last_rvol > 1.8: scores["ARA"] += 40
-        if last_price >= (high_price * 0.99): scores["ARA"] += 20
-        if is_gap_up: scores["ARA"] += 15
-        
-        # [FIX 1: CMF DIAKTIFKAN LAGI]
-        if money_inflow: 
-            scores["ARA"] += 15
-            scores["SWING"] += 10 
-
-        # 4. SCALPING
-        if atr > (last_price * 0.015): scores["SCALPING"] += 20 
-        
-        # [POIN 8]: Scalping Wajib di atas VWAP
-        if last_price > last_vwap: 
-            scores["SCALPING"] += 30 
-        else:
-            scores["SCALPING"] -= 20 # Penalty agar tidak nekat
-            
-        if is_fractal_breakout: 
-            scores["SCALPING"] += 20
-            reasons.append("Fractal Breakout")
-
-        # 5. SWING
-        if is_trending and is_uptrend_ma: scores["SWING"] += 35
-        if is_golden_cross: 
-            scores["SWING"] += 30
-            reasons.append("Golden Cross")
-        if is_squeeze: scores["SWING"] += 20
-        
-        # [FIX 2: MACD DIAKTIFKAN LAGI]
-        if last_macd > last_signal: scores["SWING"] += 15
-        
-        # [FIX 3: STOCHASTIC UNTUK SWING]
-        if last_k > last_d and last_k < 80: scores["SWING"] += 10
-
-        # [POIN 9]: Efisiensi Swing
-        dist_ma20 = abs(last_price - sma_20) / sma_20
-        if dist_ma20 < 0.10: scores["SWING"] += 15
-        else: scores["SWING"] -= 10 
-
-        # 6. BSJP (BELI SORE JUAL PAGI)
-        # [POIN 6]: Validasi Body Candle
-        body_candle = abs(last_price - open_price)
-        is_body_strong = body_candle > (atr * 0.2)
-        
-        if last_price > open_price and is_body_strong: 
-            scores["BSJP"] += 30
-            reasons.append("Strong Close")
-        if last_price >= (high_price * 0.98): scores["BSJP"] += 30
-        if is_smart_money_in: scores["BSJP"] += 25
-        
-        # [FIX 4: STOCHASTIC MOMENTUM BSJP]
-        if last_k > last_d: scores["BSJP"] += 10
-
-        # 7. BPJS (BELI PAGI JUAL SORE)
-        # [POIN 7]: Validasi Gap
-        if is_gap_up: 
-            scores["BPJS"] += 30
-            reasons.append("Valid Gap")
-        if last_price > open_price and last_rvol > 1.1: 
-            scores["BPJS"] += 40
-        if rsi < 40 and "Hammer" in pola_candle: scores["BPJS"] += 30
-        
-        # [FIX 5: STOCHASTIC OVERSOLD BPJS]
-        if last_k < 20: 
-            scores["BPJS"] += 20
-            reasons.append("Stoch Oversold")
-        
-        # 8. INVEST
-        if pe < 15 and pe > 0: scores["INVEST"] += 25
-        if pbv < 1.5: scores["INVEST"] += 25
-        if last_price > sma_200: scores["INVEST"] += 30 
-        if weekly_trend == "BULLISH": scores["INVEST"] += 20
+        # Satu graf per set bar: scoring & level S/R berbagi perantara, dilepas bersama di akhir
+        graf = graf_indikator(df)
+        sinyal = hitung_sinyal_skor(df, df_weekly, info, graf)
+        p = param or PARAM_SKOR
+        scores = gabung_skor(sinyal, p)
+        reasons = list(sinyal['reasons'])
 
         # ==========================================
         # FINAL DECISION
         # ==========================================
+        if strategi: scores = {k: v for k, v in scores.items() if k in strategi}
         best_type = max(scores, key=scores.get)
         best_score = scores[best_type]
         
-        if weekly_trend == "BEARISH" and best_type == "SWING":
-            best_score -= 30
+        if sinyal['weekly_trend'] == "BEARISH" and best_type == "SWING":
+            best_score -= p['penalti_swing_bearish']
             reasons.append("⚠️ Weekly Bearish")
 
-        # LOGIKA TARGET DINAMIS (CHANDELIER)
-        candidates = [sma_20, sma_50, last_bb_lower, last_vwap, fibs['0.5'], fibs['0.618']]
-        valid_supports = [x for x in candidates if x < (last_price * 0.995)]
-        harga_support = max(valid_supports) if valid_supports else (last_price - (atr * 2))
-
-        stop_loss = harga_support - (atr * 2.0) 
-        risk = last_price - stop_loss
-        target_price = last_price + (risk * 3.0)
-
-        # [POIN 10]: THRESHOLD V8 Tuned
-        verdict = "WAIT"
-        if best_score >= 88: verdict = "STRONG BUY 🔥"
-        elif best_score >= 65: verdict = "BUY ✅"
-        elif best_score >= 50: verdict = "NEUTRAL ⚠️"
-        else: verdict = "AVOID / SELL"
-        
-        if is_smart_money_in: reasons.append("Bandar Masuk")
+        verdict = tentukan_verdict(best_score, p)
+        if sinyal['smart_money']: reasons.append("Bandar Masuk")
         
         # DEBUG DI TERMINAL (BIAR MAS BISA LIHAT SEMUA ALASAN)
         if best_score > 60:
@@ -380,16 +508,241 @@ def analisa_multistrategy(ticker):
             "verdict": verdict,
             "type": best_type,
             "reason": " | ".join(reasons[:3]), 
-            "last_price": int(last_price),
-            "change_pct": round(change_pct * 100, 2),
-            "support": int(harga_support),
-            "stop_loss": int(stop_loss),
-            "target_price": int(target_price)
+            "last_price": int(sinyal['last_price']),
+            "change_pct": round(sinyal['change_pct'] * 100, 2),
+            "support": int(sinyal['support']),
+            "stop_loss": int(sinyal['stop_loss']),
+            "target_price": int(sinyal['target_price']),
+            "indicators": sinyal['indikator'],
+            "levels": hitung_level_sr(df, graf=graf)
         }
 
     except Exception as e:
-        return {
-            "score": 0, "verdict": "ERROR", "type": "ERROR", 
-            "reason": str(e), "last_price": 0, "change_pct": 0, 
-            "support": 0, "stop_loss":0, "target_price":0
-        }
+        return {**HASIL_ERROR, "reason": str(e)}
+
+def hitung_sinyal_skor(df, df_weekly, info, graf=None):
+    """
+    Semua indikator -> sinyal boolean (nama = kunci PARAM_SKOR['bobot']) + level harga.
+    Tidak tergantung bobot, jadi bisa dihitung sekali lalu dipakai ulang oleh kalibrasi.
+    `graf` = graf_indikator(df) yang sudah ada (perantara dipakai bersama), opsional.
+    """
+    # --- DATA MENTAH ---
+    last = df.iloc[-1]; prev = df.iloc[-2]
+    last_price = float(last['Close']); prev_close = float(prev['Close'])
+    change_pct = (last_price - prev_close) / prev_close
+    open_price = last['Open']; high_price = last['High']; low_price = last['Low']
+    
+    # --- INDIKATOR DASAR ---
+    g = graf if graf is not None else graf_indikator(df)
+    atr = akhir(g, "atr_14")
+    
+    # [POIN 3]: GAP UP VALID (Volatilitas check)
+    gap_nominal = open_price - prev_close
+    gap_percent = gap_nominal / prev_close
+    is_gap_up = (gap_percent > 0.005) and (gap_nominal > (atr * 0.5))
+
+    # --- INDIKATOR LANJUTAN ---
+    sma_20 = akhir(g, "sma_20")
+    sma_50 = akhir(g, "sma_50")
+    sma_200 = akhir(g, "sma_200") if len(df) > 200 else 0
+    
+    # Seri MA50/MA200 yang sama dipakai ulang (dulu dihitung rolling ulang khusus golden cross)
+    is_golden_cross = (akhir(g, "sma_50", 2) < akhir(g, "sma_200", 2)) and (sma_50 > sma_200)
+
+    rsi = akhir(g, "rsi_14")
+    last_bb_lower = akhir(g, "bb_lower")
+    bandwidth = akhir(g, "bb_bandwidth")
+    is_squeeze = bandwidth < 5.0
+
+    last_macd = akhir(g, "macd"); last_signal = akhir(g, "macd_signal")
+    
+    last_rvol = akhir(g, "rvol")
+    
+    # [POIN 1]: SMART MONEY FLOW (Filter Drop)
+    smf_now = akhir(g, "smf_20"); smf_prev = akhir(g, "smf_20", 2)
+    is_smart_money_in = (smf_now > 0) and (smf_now >= (smf_prev * 0.9))
+
+    last_k = akhir(g, "stoch_k"); last_d = akhir(g, "stoch_d")
+    
+    last_vwap = akhir(g, "vwap")
+    adx = akhir(g, "adx_14")
+    
+    cmf = akhir(g, "cmf_20")
+    money_inflow = cmf > 0.05
+    
+    fibs = nilai_node(g, "fibo_120")
+    pola_candle = nama_pola(akhir(g, "pola"))
+
+    # [POIN 2]: FORCE INDEX VALIDATION
+    fi_now = akhir(g, "force_13"); fi_prev = akhir(g, "force_13", 2)
+    is_force_bullish = (fi_now > 0) and (fi_now >= (fi_prev * 0.8))
+    
+    # [POIN 5]: FRACTAL BREAKOUT (Volume Check)
+    frac_high = nilai_node(g, "fractal_high")
+    last_fractal_high = df[frac_high]['High'].iloc[-1] if not df[frac_high].empty else last_price * 1.5
+    is_fractal_breakout = (last_price > last_fractal_high) and (last_rvol >= 1.0)
+
+    # --- ANALISA WEEKLY ---
+    weekly_trend = "NEUTRAL"
+    if not df_weekly.empty and len(df_weekly) > 50:
+        w_sma_50 = df_weekly['Close'].rolling(window=50).mean().iloc[-1]
+        if df_weekly['Close'].iloc[-1] > w_sma_50: weekly_trend = "BULLISH"
+        else: weekly_trend = "BEARISH"
+
+    pe = info.get('trailingPE', 100) if info.get('trailingPE') else 100
+    pbv = info.get('priceToBook', 10) if info.get('priceToBook') else 10
+
+    # [POIN 4]: ADX CONTEXT
+    min_adx = 20 if weekly_trend == "BULLISH" else 25
+    is_trending = adx > min_adx
+    is_uptrend_ma = last_price > sma_50
+
+    # [POIN 9]: Efisiensi Swing
+    dekat_ma20 = abs(last_price - sma_20) / sma_20 < 0.10
+    # [POIN 6]: Validasi Body Candle
+    is_body_strong = abs(last_price - open_price) > (atr * 0.2)
+
+    sinyal = {
+        "weekly_bullish": weekly_trend == "BULLISH",
+        "rvol_naik": last_rvol > 1.2,
+        "smart_money": is_smart_money_in,
+        "force_bullish": is_force_bullish,
+        "ara_lonjakan": change_pct > 0.04 and last_rvol > 1.8,
+        "tutup_di_high": last_price >= (high_price * 0.99),
+        "gap_up": is_gap_up,
+        "cmf_inflow": money_inflow,
+        "atr_lebar": atr > (last_price * 0.015),
+        # [POIN 8]: Scalping Wajib di atas VWAP (di bawah = penalty agar tidak nekat)
+        "di_atas_vwap": last_price > last_vwap,
+        "di_bawah_vwap": not (last_price > last_vwap),
+        "fractal_breakout": is_fractal_breakout,
+        "trend_adx": is_trending and is_uptrend_ma,
+        "golden_cross": is_golden_cross,
+        "squeeze": is_squeeze,
+        "macd_bullish": last_macd > last_signal,
+        "stoch_swing": last_k > last_d and last_k < 80,
+        "dekat_ma20": dekat_ma20,
+        "jauh_ma20": not dekat_ma20,
+        "strong_close": last_price > open_price and is_body_strong,
+        "tutup_dekat_high": last_price >= (high_price * 0.98),
+        "stoch_naik": last_k > last_d,
+        "momentum_pagi": last_price > open_price and last_rvol > 1.1,
+        "hammer_oversold": rsi < 40 and "Hammer" in pola_candle,
+        "stoch_oversold": last_k < 20,
+        "pe_murah": pe < 15 and pe > 0,
+        "pbv_murah": pbv < 1.5,
+        "di_atas_ma200": last_price > sma_200,
+    }
+    sinyal = {k: bool(v) for k, v in sinyal.items()}
+
+    # Alasan (urutan sama dengan engine V9)
+    label = [("weekly_bullish", "Weekly Uptrend"), ("rvol_naik", "Volume Naik"), ("smart_money", "Smart Money"),
+             ("force_bullish", "Momentum Kuat"), ("fractal_breakout", "Fractal Breakout"), ("golden_cross", "Golden Cross"),
+             ("strong_close", "Strong Close"), ("gap_up", "Valid Gap"), ("stoch_oversold", "Stoch Oversold")]
+
+    # LOGIKA TARGET DINAMIS (CHANDELIER)
+    candidates = [sma_20, sma_50, last_bb_lower, last_vwap, fibs['0.5'], fibs['0.618']]
+    valid_supports = [x for x in candidates if x < (last_price * 0.995)]
+    harga_support = max(valid_supports) if valid_supports else (last_price - (atr * 2))
+    stop_loss = harga_support - (atr * 2.0) 
+    risk = last_price - stop_loss
+
+    # Nilai mentah indikator (dipakai mesin alert & screener, bukan untuk scoring)
+    indikator = {
+        "rsi": rsi, "rvol": last_rvol, "stoch_k": last_k, "stoch_d": last_d, "adx": adx, "cmf": cmf,
+        "atr": atr, "macd_hist": last_macd - last_signal, "bb_bandwidth": bandwidth,
+        "sma_20": sma_20, "sma_50": sma_50, "sma_200": sma_200, "vwap": last_vwap, "volume": last['Volume'],
+        "fibo_382": fibs['0.382'], "fibo_500": fibs['0.5'], "fibo_618": fibs['0.618']
+    }
+
+    sinyal.update({
+        "indikator": {k: (None if pd.isna(v) else round(float(v), 4)) for k, v in indikator.items()},
+        "reasons": [teks for k, teks in label if sinyal[k]],
+        "weekly_trend": weekly_trend,
+        "last_price": last_price, "change_pct": change_pct,
+        "support": harga_support, "stop_loss": stop_loss,
+        "target_price": last_price + (risk * 3.0)
+    })
+    return sinyal
+
+def gabung_skor(sinyal, param=None):
+    """Jumlahkan bobot semua sinyal yang aktif per tipe strategi."""
+    p = param or PARAM_SKOR
+    scores = {k: 0 for k in TIPE_SKOR}
+    for nama, bobot in p['bobot'].items():
+        if sinyal.get(nama):
+            for tipe, nilai in bobot.items(): scores[tipe] += nilai
+    return scores
+
+def tentukan_verdict(score, param=None):
+    # [POIN 10]: THRESHOLD V8 Tuned (bisa dikalibrasi, lihat kalibrasi_skor.py)
+    v = (param or PARAM_SKOR)['verdict']
+    if score >= v['strong_buy']: return "STRONG BUY 🔥"
+    elif score >= v['buy']: return "BUY ✅"
+    elif score >= v['neutral']: return "NEUTRAL ⚠️"
+    return "AVOID / SELL"
+
+def rampingkan_bar(df):
+    """
+    Buang kolom yang tidak dipakai (Dividends, Stock Splits, Capital Gains) dan downcast:
+    harga float64 -> float32, volume -> int32 (int64 hanya kalau ada hari > 2,1 miliar lembar).
+    """
+    if df is None or df.empty: return pd.DataFrame(columns=KOLOM_BAR)
+    hasil = df[[k for k in KOLOM_BAR if k in df.columns]].astype(DTYPE_BAR)
+    if 'Volume' in hasil:
+        vol = df['Volume'].fillna(0)
+        hasil['Volume'] = vol.astype(np.int32 if vol.max() < 2**31 else np.int64)
+    return hasil
+
+def resample_mingguan(df):
+    """Bar harian -> mingguan (minggu berakhir Jumat), pengganti history(interval='1wk')."""
+    if df is None or df.empty: return pd.DataFrame(columns=KOLOM_BAR)
+    w = df[KOLOM_BAR].resample('W-FRI').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    return w.dropna(subset=['Close'])
+
+
+# ==========================================
+# 4. SCORING MULTI-PROSES (SHARED MEMORY, TANPA PICKLE DATAFRAME)
+# ==========================================
+KOLOM_BAR = ['Open', 'High', 'Low', 'Close', 'Volume']
+INFO_SKOR = ('trailingPE', 'priceToBook')
+DTYPE_BAR = np.float32 # Harga IDX bulat & < 16 juta -> float32 tetap presisi, memori separuh
+
+def kemas_bar_shm(frames):
+    """
+    Gabungkan bar harian + mingguan semua ticker ke SATU blok float32 di shared memory.
+    Return (shm, shape, tugas); tugas = [(ticker, a, b, wa, wb, info_ringkas), ...].
+    Pemanggil wajib close() + unlink() shm setelah selesai.
+    """
+    total = sum(len(df) + len(dfw) for df, dfw, _ in frames.values())
+    shape = (max(total, 1), len(KOLOM_BAR))
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * np.dtype(DTYPE_BAR).itemsize)
+    blok = np.ndarray(shape, dtype=DTYPE_BAR, buffer=shm.buf)
+    tugas = []; pos = 0
+    for ticker, (df, dfw, info) in frames.items():
+        a = pos; b = a + len(df)
+        if len(df): blok[a:b] = df[KOLOM_BAR].to_numpy(dtype=DTYPE_BAR)
+        wa = b; wb = wa + len(dfw)
+        if len(dfw): blok[wa:wb] = dfw[KOLOM_BAR].to_numpy(dtype=DTYPE_BAR)
+        pos = wb
+        # Dari info cuma 2 field ini yang dipakai scoring
+        info_ringkas = {k: (info or {}).get(k) for k in INFO_SKOR}
+        tugas.append((ticker, a, b, wa, wb, info_ringkas))
+    del blok
+    return shm, shape, tugas
+
+def skor_dari_shm(nama_shm, shape, tugas):
+    """Dijalankan di worker proses: baca bar dari shared memory lalu scoring."""
+    shm = shared_memory.SharedMemory(name=nama_shm)
+    try:
+        blok = np.ndarray(shape, dtype=DTYPE_BAR, buffer=shm.buf)
+        hasil = {}
+        for ticker, a, b, wa, wb, info in tugas:
+            # Copy lokal (memcpy kecil) supaya blok bisa ditutup bersih setelah loop
+            df = pd.DataFrame(blok[a:b].copy(), columns=KOLOM_BAR)
+            dfw = pd.DataFrame(blok[wa:wb].copy(), columns=KOLOM_BAR)
+            hasil[ticker] = hitung_skor_multistrategy(ticker, df, dfw, info)
+        del blok
+        return hasil
+    finally:
+        shm.close()
@@ -1,7 +1,21 @@
 import os
+import re
+import sys
 import time
+import atexit
+import shutil
+import sqlite3
+import threading
 from datetime import datetime
 import concurrent.futures
+from contextlib import contextmanager
+import gzip
+import json
+import hashlib
+import multiprocessing
+import queue
+import uuid
+from collections import deque
 import yfinance as yf
 import pandas as pd
 import numpy as np
@@ -9,7 +23,7 @@ import math
 import pytz
 import feedparser
 import urllib.parse
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from dotenv import load_dotenv
 
 
@@ -28,10 +42,37 @@ try:
 except ImportError:
     genai = None
 
+# --- OPSIONAL: KOMPRESI BROTLI & ENCODING MESSAGEPACK ---
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# --- OPSIONAL: PEAK RSS (UNIX SAJA) ---
+try:
+    import resource
+except ImportError:
+    resource = None
+
 load_dotenv()
 
 # Pastikan file rumus_saham.py ada di folder yang sama (untuk scanner awal)
-from rumus_saham import analisa_multistrategy, ambil_berita_saham 
+from rumus_saham import (
+    ambil_data_multistrategy, hitung_skor_multistrategy, ambil_berita_saham, HASIL_ERROR,
+    susun_matriks_harga, hitung_breadth, kemas_bar_shm, skor_dari_shm, PARAM_SKOR, rampingkan_bar,
+    hitung_relative_strength, hitung_korelasi, korelasi_sektor, LOOKBACK_RS, hitung_pivot,
+    graf_indikator, nilai_node, akhir, ambil_data_batch
+)
+from pembatas_yahoo import panggil_yahoo, prioritas_yahoo, status_limiter, PRIORITAS_DETAIL, PRIORITAS_SCAN, KONTEKS_PRIORITAS
+from daftar_saham import (
+    SEKTOR_SYARIAH, DATABASE_SYARIAH, DATABASE_BANK, SEKTOR_SAHAM, SET_SYARIAH, SET_BATUBARA,
+    DATABASE_LQ45, SET_LQ45, WATCHLIST, WATCHLIST_SET
+)
 
 app = Flask(__name__)
 
@@ -70,43 +111,55 @@ def get_waktu_pasar():
     jam = now.strftime("%H:%M")
     hari = now.strftime("%A, %d %B %Y")
     
+    _, sesi = get_sesi_pasar(now)
+    return f"📅 {hari} | ⏰ {jam} WIB | 🏛️ Status: {sesi}"
+
+def get_sesi_pasar(now=None):
+    """
+    Kode sesi (untuk logika mesin) + label sesi (untuk AI/tampilan).
+    Kode: TUTUP, SESI1, ISTIRAHAT, SESI2, PRECLOSING.
+    """
+    if now is None: now = datetime.now(pytz.timezone('Asia/Jakarta'))
+
     # Konversi ke menit untuk hitungan sesi
     h = now.hour
     m = now.minute
     total_menit = h * 60 + m
     
     # Logika Sesi Bursa Efek Indonesia (WIB)
-    sesi = "TUTUP (Pasar Belum Buka)"
+    kode, sesi = "TUTUP", "TUTUP (Pasar Belum Buka)"
     if 540 <= total_menit < 720: 
-        sesi = "SESI 1 (Opening/Morning - Volatile)" # 09:00 - 12:00
+        kode, sesi = "SESI1", "SESI 1 (Opening/Morning - Volatile)" # 09:00 - 12:00
     elif 720 <= total_menit < 810: 
-        sesi = "ISTIRAHAT SIANG"       # 12:00 - 13:30
+        kode, sesi = "ISTIRAHAT", "ISTIRAHAT SIANG"       # 12:00 - 13:30
     elif 810 <= total_menit < 950: 
-        sesi = "SESI 2 (Afternoon - Trend Formation)"    # 13:30 - 15:50
+        kode, sesi = "SESI2", "SESI 2 (Afternoon - Trend Formation)"    # 13:30 - 15:50
     elif 950 <= total_menit < 975: 
-        sesi = "PRE-CLOSING (Blind Market)"           # 15:50 - 16:15
+        kode, sesi = "PRECLOSING", "PRE-CLOSING (Blind Market)"           # 15:50 - 16:15
     elif total_menit >= 975: 
-        sesi = "TUTUP (After Market - Analisa Besok)"
+        kode, sesi = "TUTUP", "TUTUP (After Market - Analisa Besok)"
     
-    return f"📅 {hari} | ⏰ {jam} WIB | 🏛️ Status: {sesi}"
+    return kode, sesi
 
 # ==========================================
 # 2. FITUR V14: MESIN HITUNG 13 INDIKATOR (GOD MODE - CODE LENGKAP)
 # ==========================================
-def hitung_indikator_lengkap(ticker_lengkap):
+def hitung_indikator_dict(ticker_lengkap, df=None, graf=None):
     """
     Menghitung 13 Indikator Teknikal secara manual (Hard Coded) agar presisi.
     Tidak ada yang disembunyikan/disederhanakan di sini.
+    Return dict angka mentah (dipakai laporan panjang maupun konteks AI ringkas).
+    Semua seri diambil dari graf indikator yang sama dengan scanner (rumus_saham.NODE_INDIKATOR).
     """
     try:
         # Ambil data historis panjang untuk akurasi Ichimoku & MA200
-        df = yf.Ticker(ticker_lengkap).history(period="1y")
-        if len(df) < 120: return "Data Historis Tidak Cukup untuk Analisa God Mode."
+        # (bar 1Y dari cache scanner dipakai ulang kalau ada)
+        if df is None: df = rampingkan_bar(panggil_yahoo(yf.Ticker(ticker_lengkap).history, period="1y"))
+        if len(df) < 120: return {"error": "Data Historis Tidak Cukup untuk Analisa God Mode."}
+        g = graf if graf is not None else graf_indikator(df)
 
         # Data Harga Terakhir
         close = df['Close'].iloc[-1]
-        high = df['High'].iloc[-1]
-        low = df['Low'].iloc[-1]
         volume = df['Volume'].iloc[-1]
 
         # ----------------------------------------
@@ -114,28 +167,17 @@ def hitung_indikator_lengkap(ticker_lengkap):
         # ----------------------------------------
         
         # 1. RSI (Relative Strength Index - 14)
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs)).iloc[-1]
+        rsi = akhir(g, "rsi_14")
 
         # 2. Stochastic Oscillator (14, 3, 3)
-        low14 = df['Low'].rolling(window=14).min().iloc[-1]
-        high14 = df['High'].rolling(window=14).max().iloc[-1]
-        stoch_k = 100 * ((close - low14) / (high14 - low14))
+        stoch_k = akhir(g, "stoch_k")
 
         # 3. MACD (12, 26, 9)
-        exp12 = df['Close'].ewm(span=12, adjust=False).mean()
-        exp26 = df['Close'].ewm(span=26, adjust=False).mean()
-        macd_line = exp12.iloc[-1] - exp26.iloc[-1]
-        signal_line = (exp12 - exp26).ewm(span=9, adjust=False).mean().iloc[-1]
-        macd_hist = macd_line - signal_line
+        macd_hist = akhir(g, "macd_hist")
 
         # 4. OBV (On-Balance Volume) - Deteksi Bandar
-        obv_series = (np.sign(df['Close'].diff()) * df['Volume']).fillna(0).cumsum()
-        obv_now = obv_series.iloc[-1]
-        obv_prev = obv_series.iloc[-5]
+        obv_now = akhir(g, "obv")
+        obv_prev = akhir(g, "obv", 5)
         obv_trend = "NAIK (Akumulasi)" if obv_now > obv_prev else "TURUN (Distribusi)"
 
         # ----------------------------------------
@@ -143,29 +185,24 @@ def hitung_indikator_lengkap(ticker_lengkap):
         # ----------------------------------------
 
         # 5. Bollinger Bands (20, 2)
-        ma20 = df['Close'].rolling(window=20).mean().iloc[-1]
-        std = df['Close'].rolling(window=20).std().iloc[-1]
-        upper_bb = ma20 + (2 * std)
-        lower_bb = ma20 - (2 * std)
+        ma20 = akhir(g, "sma_20")
+        upper_bb = akhir(g, "bb_upper")
+        lower_bb = akhir(g, "bb_lower")
         # Posisi Harga Relatif terhadap BB (0=Bawah, 0.5=Tengah, 1=Atas)
         bb_pos = (close - lower_bb) / (upper_bb - lower_bb)
 
         # 6. ATR (Average True Range - 14) - Untuk Stop Loss
-        tr1 = df['High'] - df['Low']
-        tr2 = abs(df['High'] - df['Close'].shift(1))
-        tr3 = abs(df['Low'] - df['Close'].shift(1))
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean().iloc[-1]
+        atr = akhir(g, "atr_14")
 
         # 7. Moving Averages (Trend)
-        ma5 = df['Close'].rolling(window=5).mean().iloc[-1]
-        ma50 = df['Close'].rolling(window=50).mean().iloc[-1]
-        ma200 = df['Close'].rolling(window=200).mean().iloc[-1] if len(df) > 200 else ma20
+        ma5 = akhir(g, "sma_5")
+        ma50 = akhir(g, "sma_50")
+        ma200 = akhir(g, "sma_200") if len(df) > 200 else ma20
         trend_long = "BULLISH (Di atas MA200)" if close > ma200 else "BEARISH (Di bawah MA200)"
         trend_short = "UP" if ma5 > ma20 else "DOWN"
 
         # 8. Volume Ratio (Ledakan Volume)
-        vol_avg = df['Volume'].rolling(window=20).mean().iloc[-1]
+        vol_avg = akhir(g, "vol_sma_20")
         vol_ratio = volume / vol_avg if vol_avg > 0 else 0
 
         # ----------------------------------------
@@ -174,19 +211,13 @@ def hitung_indikator_lengkap(ticker_lengkap):
 
         # 9. Ichimoku Cloud (Manual Calculation)
         # Tenkan-sen (9)
-        high9 = df['High'].rolling(window=9).max().iloc[-1]
-        low9 = df['Low'].rolling(window=9).min().iloc[-1]
-        tenkan = (high9 + low9) / 2
+        tenkan = (akhir(g, "high_max_9") + akhir(g, "low_min_9")) / 2
         # Kijun-sen (26)
-        high26 = df['High'].rolling(window=26).max().iloc[-1]
-        low26 = df['Low'].rolling(window=26).min().iloc[-1]
-        kijun = (high26 + low26) / 2
+        kijun = (akhir(g, "high_max_26") + akhir(g, "low_min_26")) / 2
         # Senkou Span A (Future)
         span_a = (tenkan + kijun) / 2
         # Senkou Span B (52)
-        high52 = df['High'].rolling(window=52).max().iloc[-1]
-        low52 = df['Low'].rolling(window=52).min().iloc[-1]
-        span_b = (high52 + low52) / 2
+        span_b = (akhir(g, "high_max_52") + akhir(g, "low_min_52")) / 2
         
         ichi_status = "NETRAL"
         if close > span_a and close > span_b: ichi_status = "STRONG BULLISH (Di Atas Awan)"
@@ -206,44 +237,54 @@ def hitung_indikator_lengkap(ticker_lengkap):
         # Squeeze terjadi jika Bollinger Bands masuk ke dalam Keltner Channel
         # Kita pakai pendekatan sederhana: Jika Bandwidth sangat kecil dibanding rata-rata
         bb_width = (upper_bb - lower_bb) / ma20
-        avg_bb_width = (df['Close'].rolling(20).std() / df['Close'].rolling(20).mean()).mean() * 4 # Approx
+        avg_bb_width = (nilai_node(g, "std_20") / nilai_node(g, "sma_20")).mean() * 4 # Approx
         squeeze_status = "SIAP MELEDAK (Squeeze)" if bb_width < avg_bb_width else "Normal"
 
         # 12. Pivot Points (Classic - Floor Traders)
-        prev_candle = df.iloc[-2]
-        pp = (prev_candle['High'] + prev_candle['Low'] + prev_candle['Close']) / 3
-        r1 = (2 * pp) - prev_candle['Low']
-        s1 = (2 * pp) - prev_candle['High']
-        r2 = pp + (prev_candle['High'] - prev_candle['Low'])
-        s2 = pp - (prev_candle['High'] - prev_candle['Low'])
+        pivot = hitung_pivot(df.iloc[-2])
+        r1, s1, r2, s2 = pivot['r1'], pivot['s1'], pivot['r2'], pivot['s2']
 
         # 13. Posisi Harga & Final Report
-        return f"""
+        return {
+            "close": float(close), "volume": float(volume),
+            "rsi": float(rsi), "stoch_k": float(stoch_k), "macd_hist": float(macd_hist),
+            "obv_naik": bool(obv_now > obv_prev), "obv_trend": obv_trend, "vol_ratio": float(vol_ratio),
+            "ma5": float(ma5), "ma20": float(ma20), "ma50": float(ma50), "ma200": float(ma200),
+            "trend_long": trend_long, "trend_short": trend_short, "ichi_status": ichi_status,
+            "fibo_382": float(fibo_382), "fibo_500": float(fibo_500), "fibo_618": float(fibo_618),
+            "s1": float(s1), "s2": float(s2), "r1": float(r1), "r2": float(r2),
+            "squeeze": squeeze_status != "Normal", "squeeze_status": squeeze_status,
+            "bb_pos": float(bb_pos), "atr": float(atr)
+        }
+    except Exception as e:
+        return {"error": f"[Error Hitung Indikator]: {e}"}
+
+def format_indikator_lengkap(ind):
+    return f"""
         [DATA TEKNIKAL 13 INDIKATOR - GOD MODE]
         
         A. MOMENTUM & BANDAR:
-        1. RSI (14): {rsi:.2f} ( >60 = Strong Trend )
-        2. Stochastic %K: {stoch_k:.2f}
-        3. MACD Histogram: {macd_hist:.2f} ({'Positif' if macd_hist>0 else 'Negatif'})
-        4. OBV Trend (Bandar): {obv_trend}
-        5. Volume Ratio: {vol_ratio:.2f}x Rata-rata
+        1. RSI (14): {ind['rsi']:.2f} ( >60 = Strong Trend )
+        2. Stochastic %K: {ind['stoch_k']:.2f}
+        3. MACD Histogram: {ind['macd_hist']:.2f} ({'Positif' if ind['macd_hist']>0 else 'Negatif'})
+        4. OBV Trend (Bandar): {ind['obv_trend']}
+        5. Volume Ratio: {ind['vol_ratio']:.2f}x Rata-rata
 
         B. TREN & STRUKTUR:
-        6. Tren Jangka Panjang (MA200): {trend_long} (Harga: {close:.0f} vs MA200: {ma200:.0f})
-        7. Tren Jangka Pendek (MA5): {trend_short}
-        8. Ichimoku Cloud: {ichi_status}
+        6. Tren Jangka Panjang (MA200): {ind['trend_long']} (Harga: {ind['close']:.0f} vs MA200: {ind['ma200']:.0f})
+        7. Tren Jangka Pendek (MA5): {ind['trend_short']}
+        8. Ichimoku Cloud: {ind['ichi_status']}
         
         C. AREA PENTING (SUPPORT/RESISTANCE):
-        9. Fibonacci Golden Ratio (Support Kuat): {fibo_618:.0f}
-        10. Pivot Points (Harian): Support S1={s1:.0f} | Resistance R1={r1:.0f} | R2={r2:.0f}
+        9. Fibonacci Golden Ratio (Support Kuat): {ind['fibo_618']:.0f}
+        10. Pivot Points (Harian): Support S1={ind['s1']:.0f} | Resistance R1={ind['r1']:.0f} | R2={ind['r2']:.0f}
         
         D. VOLATILITAS & RISIKO:
-        11. TTM Squeeze: {squeeze_status}
-        12. Bollinger Position: {bb_pos:.2f} (0=Bawah, 1=Atas)
-        13. ATR (Risiko/Napas): {atr:.0f} (Gunakan 1.5x ATR untuk jarak Stop Loss)
+        11. TTM Squeeze: {ind['squeeze_status']}
+        12. Bollinger Position: {ind['bb_pos']:.2f} (0=Bawah, 1=Atas)
+        13. ATR (Risiko/Napas): {ind['atr']:.0f} (Gunakan 1.5x ATR untuk jarak Stop Loss)
         """
-    except Exception as e:
-        return f"[Error Hitung Indikator]: {e}"
+
 
 import feedparser
 import urllib.parse
@@ -266,17 +307,18 @@ def dapatkan_keywords_cerdas(ticker, sektor, nama_perusahaan=""):
         query = f"berita saham emiten {ticker_bersih} Indonesia IDX terkini"
     
     # 2. Logika Korelasi Sektoral (Context Injection)
-    if any(x in sektor for x in ["GOLD", "MINING", "METAL"]): 
+    # (Nama sektor Yahoo dalam Inggris + bucket internal dalam Indonesia)
+    if any(x in sektor for x in ["GOLD", "MINING", "METAL", "TAMBANG"]): 
         query += " + harga emas nikel dunia"
-    elif any(x in sektor for x in ["OIL", "ENERGY"]): 
-        query += " + harga minyak brent crude oil"
-    elif "COAL" in sektor or ticker_bersih in ["ADRO", "PTBA", "ITMG"]: 
+    elif "COAL" in sektor or ticker_bersih in SET_BATUBARA: 
         query += " + harga batubara newcastle"
+    elif any(x in sektor for x in ["OIL", "ENERGY", "ENERGI"]): 
+        query += " + harga minyak brent crude oil"
     elif "BANK" in sektor: 
         query += " + suku bunga BI rate"
-    elif "TECH" in sektor: 
+    elif any(x in sektor for x in ["TECH", "TEKNOLOGI"]): 
         query += " + saham teknologi goto nasdaq"
-    elif "CPO" in sektor: 
+    elif any(x in sektor for x in ["CPO", "AGRIKULTUR"]): 
         query += " + harga CPO malaysia"
     elif "PROPERTY" in sektor:
         query += " + insentif ppn properti"
@@ -351,12 +393,27 @@ def agen_pencari_berita_robust(ticker, sektor, berita_yahoo_backup, nama_perusah
 # ==========================================
 # 4. FITUR V13: AGEN KEPALA ANALIS (ACTION PLAN DETAIL)
 # ==========================================
-def agen_analis_utama(data_context):
-    """
-    Prompt ini sangat lengkap. Membaca Waktu, 13 Indikator, dan memberi TP1, TP2, TP3.
-    Menggunakan sistem FAILOVER (DeepSeek -> Groq -> Gemini).
-    """
-    prompt_analis = f"""
+AI_TOKEN_BUDGET = int(os.getenv("AI_TOKEN_BUDGET", 700)) # Budget token untuk data_context mode ringkas
+AI_KONTEKS_MODE = os.getenv("AI_KONTEKS_MODE", "ringkas") # "ringkas" atau "lengkap" (format lama)
+
+def estimasi_token(teks):
+    # Pendekatan umum tokenizer BPE: ~4 karakter per token (tanpa dependensi tokenizer)
+    return max(1, (len(teks) + 3) // 4)
+
+def susun_prompt_analis(data_context, ringkas=False):
+    if ringkas:
+        return f"""Kamu Elite Fund Manager saham IDX. Analisa data ringkas (key=value) berikut.
+{data_context}
+SOP: RSI>60 & Stoch naik=momentum kuat (bukan overbought). Harga>awan Ichimoku & >MA200=super bullish; di dalam awan=hati-hati. OBV naik & volx>1.2=akumulasi bandar. squeeze=YES -> buy on breakout. Entry di fib618/S1, target R1/R2, SL pakai ATR/S2. Sesi 1=volatilitas, Sesi 2=trend akhir.
+Jawab tegas pakai angka dari data, 6 poin:
+1. Korelasi berita & makro
+2. Bandarmologi (OBV, volume)
+3. Valuasi (PER/PBV): invest atau trading
+4. Kekuatan tren (Ichimoku, MA200, MACD, squeeze)
+5. ACTION PLAN: strategi (SCALPING/SWING/INVEST/BPJS/BSJP/HINDARI/CALON ARA), timing masuk, area entry, TP1/TP2/TP3, stop loss
+6. VERDICT (STRONG BUY/BUY/WAIT/SELL)"""
+
+    return f"""
     Kamu adalah Elite Fund Manager & Ahli Strategi Saham (Quantitative Expert).
     
     TUGAS UTAMA:
@@ -395,118 +452,189 @@ def agen_analis_utama(data_context):
     Jawab tegas, gunakan angka dari data indikator di atas sebagai bukti analisamu.
     """
 
-    # --- FAILOVER SYSTEM: ANTI-OFFLINE ---
-    
+def ringkas_teks(teks):
+    teks = teks.replace("**", "").replace("__", "")
+    return [" ".join(baris.split()) for baris in teks.splitlines() if baris.strip()]
+
+def fmt_angka_ringkas(nilai):
+    nilai = float(nilai or 0)
+    for batas, akhiran in ((1e12, "T"), (1e9, "M"), (1e6, "jt")):
+        if abs(nilai) >= batas: return f"{nilai / batas:.1f}{akhiran}"
+    return f"{nilai:.0f}"
+
+def susun_konteks_ringkas(ticker_polos, nama, info_waktu, data, ind, info_live, funda, laporan_berita, budget=None):
+    """
+    Konteks AI versi ringkas & terstruktur (key=value), dibatasi budget token.
+    Identitas, skor & harga live selalu masuk; baris teknikal/fundamental diisi menurut
+    prioritas selama muat, lalu berita baris demi baris sampai budget habis.
+    Return (teks, jumlah_token); token hanya bisa > budget kalau baris wajib saja sudah melebihi.
+    """
+    budget = budget or AI_TOKEN_BUDGET
+    hist = data.get('hist_data', {})
+    wajib = [
+        f"SAHAM={ticker_polos} ({nama})",
+        " ".join(info_waktu.replace("📅", "").replace("⏰", "").replace("🏛️", "").split()),
+        f"SKOR={data['score']} VERDICT={data['verdict']} TIPE={data['type']} WARN={hist.get('note', 'Valid')}",
+        " ".join(info_live.replace("- LIVE:", "LIVE").split()),
+    ]
+    opsional = [] # Urut prioritas: yang paling berguna untuk action plan dulu
+    if ind and "error" not in ind:
+        opsional += [
+            f"MOM rsi={ind['rsi']:.1f} stochK={ind['stoch_k']:.1f} macdH={ind['macd_hist']:+.1f} obv={'UP' if ind['obv_naik'] else 'DOWN'} volx={ind['vol_ratio']:.2f}",
+            f"TREN close={ind['close']:.0f} ma5={ind['ma5']:.0f} ma20={ind['ma20']:.0f} ma50={ind['ma50']:.0f} ma200={ind['ma200']:.0f} short={ind['trend_short']} ichi={ind['ichi_status'].split(' (')[0]}",
+            f"LVL fib382={ind['fibo_382']:.0f} fib500={ind['fibo_500']:.0f} fib618={ind['fibo_618']:.0f} S1={ind['s1']:.0f} S2={ind['s2']:.0f} R1={ind['r1']:.0f} R2={ind['r2']:.0f}",
+            f"VOL squeeze={'YES' if ind['squeeze'] else 'NO'} bbpos={ind['bb_pos']:.2f} atr={ind['atr']:.0f}",
+        ]
+    elif ind:
+        opsional.append(f"TEKNIKAL={ind['error']}")
+    opsional.append(f"FUND sektor={funda.get('sektor')} per={float(funda.get('per') or 0):.1f} pbv={float(funda.get('pbv') or 0):.2f} roe={float(funda.get('roe') or 0):.2f} mcap={fmt_angka_ringkas(funda.get('market_cap'))}")
+
+    sisa = budget - estimasi_token("\n".join(wajib)) - 2
+    masuk = set()
+    for i, b in enumerate(opsional):
+        biaya = estimasi_token(b) + 1
+        if biaya <= sisa: masuk.add(i); sisa -= biaya
+    teks = "\n".join(wajib + [b for i, b in enumerate(opsional) if i in masuk])
+    berita = []
+    for b in ringkas_teks(laporan_berita):
+        biaya = estimasi_token(b) + 1
+        if biaya > sisa: break
+        berita.append(b); sisa -= biaya
+    if berita: teks += "\nNEWS:\n" + "\n".join(berita)
+    return teks, estimasi_token(teks)
+
+def agen_analis_utama(data_context, ringkas=False):
+    """
+    Prompt ini sangat lengkap. Membaca Waktu, 13 Indikator, dan memberi TP1, TP2, TP3.
+    Menggunakan sistem FAILOVER (DeepSeek -> Groq -> Gemini).
+    """
+    prompt_analis = susun_prompt_analis(data_context, ringkas)
+
+    hasil = panggil_ai_failover(prompt_analis)
+    if hasil: return hasil
+    return "⚠️ SYSTEM ERROR: Semua AI (DeepSeek, Groq, Gemini) tidak merespons. Cek kuota API/Koneksi."
+
+AI_MIN_SISA = float(os.getenv("AI_MIN_SISA", 3)) # Detik minimal agar satu percobaan AI masih layak dicoba
+# Pemanggil tanpa tenggat (job worker, compare, sentimen) tetap dibatasi: satu provider yang hang
+# tidak boleh memegang SLOT_AI selamanya dan membuat request detail (yang punya tenggat) kelaparan
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", 60)) # Detik per percobaan AI kalau tanpa tenggat
+AI_SLOT_TUNGGU = float(os.getenv("AI_SLOT_TUNGGU", 30)) # Detik maksimal antre slot AI kalau tanpa tenggat
+
+def timeout_ai(provider):
+    """
+    kwargs timeout untuk satu percobaan AI = sisa tenggat request (AI_TIMEOUT kalau tanpa tenggat).
+    None kalau waktunya sudah tidak cukup.
+    """
+    sisa = sisa_waktu()
+    if sisa is None: return {"timeout": AI_TIMEOUT}
+    if sisa < AI_MIN_SISA:
+        print(f"⏱️ {provider} dilewati: sisa tenggat {sisa:.1f} detik")
+        return None
+    return {"timeout": sisa}
+
+# Batas panggilan AI paralel per proses (detail, job, compare, sentimen berbagi slot yang sama)
+AI_KONKURENSI = int(os.getenv("AI_KONKURENSI", 4))
+SLOT_AI = threading.BoundedSemaphore(AI_KONKURENSI)
+GEMINI_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=AI_KONKURENSI, thread_name_prefix="gemini")
+STATUS_AI = {"limit": AI_KONKURENSI, "in_use": 0, "waiting": 0, "rejected": 0}
+STATUS_AI_LOCK = threading.Lock()
+
+def panggil_ai_failover(prompt, json_mode=False):
+    """
+    Antre slot AI (maks AI_KONKURENSI), paling lama sampai tenggat request (AI_SLOT_TUNGGU kalau
+    tanpa tenggat), lalu jalankan failover.
+    Return teks jawaban, atau None kalau slot tidak didapat / semua AI gagal.
+    """
+    sisa = sisa_waktu()
+    with STATUS_AI_LOCK: STATUS_AI['waiting'] += 1
+    dapat = SLOT_AI.acquire(timeout=AI_SLOT_TUNGGU if sisa is None else sisa)
+    with STATUS_AI_LOCK:
+        STATUS_AI['waiting'] -= 1
+        if dapat: STATUS_AI['in_use'] += 1
+        else: STATUS_AI['rejected'] += 1
+    if not dapat:
+        print("⏱️ Slot AI penuh sampai batas tunggu habis")
+        return None
+    try: return panggil_ai_berantai(prompt, json_mode)
+    finally:
+        with STATUS_AI_LOCK: STATUS_AI['in_use'] -= 1
+        SLOT_AI.release()
+
+def panggil_ai_berantai(prompt, json_mode=False):
+    """
+    FAILOVER SYSTEM: ANTI-OFFLINE (DeepSeek -> Groq -> Gemini).
+    json_mode=True meminta output JSON murni (untuk tugas terstruktur seperti sentimen batch).
+    Return teks jawaban, atau None kalau semua AI gagal.
+    """
+    format_json = {"response_format": {"type": "json_object"}} if json_mode else {}
+
     # 1. Prioritas Utama: DeepSeek (Analisa Paling Dalam)
     if client_deepseek:
+        batas = timeout_ai("DeepSeek")
+        if batas is None: return None
         try:
             print("🤖 Mencoba DeepSeek...")
             res = client_deepseek.chat.completions.create(
                 model="deepseek-chat", 
-                messages=[{"role": "user", "content": prompt_analis}]
+                messages=[{"role": "user", "content": prompt}],
+                **format_json, **batas
             )
             return res.choices[0].message.content.strip()
         except Exception as e: print(f"⚠️ DeepSeek Gagal: {e}")
 
     # 2. Cadangan Pertama: Groq (Super Cepat)
     if client_groq:
+        batas = timeout_ai("Groq")
+        if batas is None: return None
         try:
             print("⚡ Switch ke Groq...")
             chat = client_groq.chat.completions.create(
-                messages=[{"role": "user", "content": prompt_analis}],
+                messages=[{"role": "user", "content": prompt}],
                 model="llama-3.3-70b-versatile",
+                **format_json, **batas
             )
             return chat.choices[0].message.content.strip()
         except Exception as e: print(f"⚠️ Groq Gagal: {e}")
 
     # 3. Cadangan Terakhir: Gemini (Stabil)
-    if client_gemini:
+    # SDK Gemini tidak menerima timeout per panggilan: dijalankan di GEMINI_POOL dan ditunggu
+    # paling lama sisa tenggat / AI_TIMEOUT (panggilan yang lewat waktu dibiarkan selesai di pool)
+    batas = timeout_ai("Gemini") if client_gemini else None
+    if batas is not None:
         try:
             print("🌟 Switch ke Gemini...")
-            return client_gemini.models.generate_content(
-                model='gemini-1.5-flash', contents=prompt_analis
-            ).text.strip()
+            config = {"response_mime_type": "application/json"} if json_mode else None
+            future = GEMINI_POOL.submit(client_gemini.models.generate_content,
+                                        model='gemini-1.5-flash', contents=prompt, config=config)
+            return future.result(timeout=batas['timeout']).text.strip()
+        except concurrent.futures.TimeoutError: print(f"⏱️ Gemini melewati tenggat ({batas['timeout']:.1f} detik)")
         except Exception as e: print(f"⚠️ Gemini Gagal: {e}")
             
-    return "⚠️ SYSTEM ERROR: Semua AI (DeepSeek, Groq, Gemini) tidak merespons. Cek kuota API/Koneksi."
+    return None
 
 # ==========================================
 # 5. UTILS & DATABASE (V18 - 115+ TOP LIQUID STOCKS)
 # ==========================================
 CACHE_DATA = {}
+CACHE_FUNDA = {}
 CACHE_TIMEOUT = 300 
+CACHE_GRACE = int(os.getenv("CACHE_GRACE", 900)) # Data basi masih boleh disajikan selama ini (detik)
 MARKET_STATUS = {"condition": "NORMAL", "last_check": 0}
-
-# --- DATABASE SAHAM SYARIAH (JII 70 + ISSI PILIHAN) ---
-# Total: 100+ Saham Syariah Terbaik & Terlikuid
-DATABASE_SYARIAH = [
-    # 1. ENERGI, MINYAK & GAS (High Volatility)
-    "ADRO", "PTBA", "ITMG", "HRUM", "INDY", "DOID", "KKGI", "BUMI", 
-    "PGAS", "ELSA", "MEDC", "AKRA", "ADMR", "PGEO", "MBMA", "RAJA", "ENRG",
-    
-    # 2. TAMBANG LOGAM & MINERAL
-    "ANTM", "INCO", "MDKA", "TINS", "NCKL", "AMMN", "BRMS", "PSAB", "ZINC", "DKFT",
-    
-    # 3. KESEHATAN & FARMASI (Defensive & Trending) -> [NEW]
-    "KLBF", "SIDO", "MIKA", "HEAL", "SILO", "SAME", "KAEF", "TSPC", "PRDA",
-    
-    # 4. KONSUMER & RITEL (Bluechip Syariah)
-    "ICBP", "INDF", "MYOR", "UNVR", "CMRY", "GOOD", "ROTI", "STTP",
-    "AMRT", "MIDI", "ACES", "MAPI", "MAPA", "ERAA", "RALS", "LPPF",
-    
-    # 5. TELEKOMUNIKASI, MENARA & MEDIA
-    "TLKM", "ISAT", "EXCL", "TOWR", "TBIG", "MTEL", "MNCN", "SCMA", "EMTK",
-    
-    # 6. PROPERTY, KONSTRUKSI & SEMEN
-    "CTRA", "BSDE", "PWON", "SMRA", "ASRI", "DMAS", "DILD", # Property
-    "PTPP", "WIKA", "ADHI", "WEGE", "TOTL", # Konstruksi
-    "SMGR", "INTP", "JSMR", # Semen & Tol
-    
-    # 7. TEKNOLOGI & DIGITAL BANKING
-    "GOTO", "BUKA", "WIRG", "ARTO", "BELI", "MLPT",
-    
-    # 8. BAHAN BAKU & KERTAS (Basic Materials)
-    "INKP", "TKIM", "BRPT", "TPIA", "ESSA", "AVIA", "ARNA", "WOOD",
-    
-    # 9. AGRIKULTUR & POULTRY (CPO & Ayam)
-    "CPIN", "JPFA", "MAIN", 
-    "AALI", "LSIP", "DSNG", "TAPG", "STAA", "SSMS", "SMAR",
-    
-    # 10. TRANSPORTASI & LOGISTIK -> [NEW]
-    "SMDR", "TMAS", "ASSA", "BIRD", "GIAA",
-    
-    # 11. OTOMOTIF & KOMPONEN
-    "ASII", "AUTO", "DRMA", "SMSM",
-    
-    # 12. HOLDING & LAINNYA
-    "UNTR", "SRTG", "BNBR", "VKTR"
-]
-
-# --- MARKET UNIVERSE (SYARIAH + KONVENSIONAL BIG CAPS) ---
-# Gabungan Syariah + Bank Besar Konvensional (BBCA, BBRI, dll)
-MARKET_UNIVERSE = list(set(DATABASE_SYARIAH + [
-    "BBCA", "BBRI", "BMRI", "BBNI", # The Big 4
-    "BBTN", "BDMN", "BNGA", "NISP", "PNBN", "BJBR" # Mid-Cap Banks
-]))
-
-# --- WATCHLIST (FAVORIT TRADER HARIAN) ---
-# Top 40 Saham Paling Sering Di-Tradingkan
-WATCHLIST = [
-    # Big Caps / Movers
-    "BBRI", "BBCA", "BMRI", "BBNI", "TLKM", "ASII", "GOTO", "AMMN", "BREN",
-    # Energy & Commodities (Sering Rally)
-    "ADRO", "PTBA", "PGAS", "MEDC", "AKRA", "ANTM", "MDKA", "INCO", "TINS",
-    # Gorengan Mewah & Second Liner (High Cuan)
-    "BRMS", "BUMI", "DOID", "ENRG", "PSAB", "RAJA", "BRIS",
-    # Consumer & Health (Defensive)
-    "ICBP", "AMRT", "KLBF", "MIKA",
-    # Property & Tech
-    "CTRA", "BSDE", "ARTO", "EMTK"
-]
-
-def validasi_histori_panjang(ticker_lengkap, data_short):
+REFRESH_AKTIF = set() # Ticker yang sedang di-refresh di belakang
+REFRESH_LOCK = threading.Lock()
+REFRESH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr-refresh")
+# Ticker yang gagal diambil / tanpa harga: dicatat satu siklus agar scan yang sama tidak
+# mengambilnya dua kali (muat_ulang_universe lalu process_single_stock)
+CACHE_GAGAL = {} # ticker -> {'data': HASIL_ERROR..., 'timestamp': ...}
+CACHE_GAGAL_TTL = int(os.getenv("CACHE_GAGAL_TTL", CACHE_TIMEOUT))
+BREADTH_MIN_TICKER = 20 # Minimal ticker termuat agar breadth dianggap representatif
+
+LIMIT_SCAN = int(os.getenv("LIMIT_SCAN", 60)) # Maksimal ticker per scan (kuota Yahoo)
+
+def validasi_histori_panjang(ticker_lengkap, data_short, hist=None):
     try:
-        hist = yf.Ticker(ticker_lengkap).history(period="1y")
+        # Bar 1Y yang sudah diambil scanner bisa dipakai ulang (hemat 1 request Yahoo)
+        if hist is None: hist = rampingkan_bar(panggil_yahoo(yf.Ticker(ticker_lengkap).history, period="1y"))
         if hist.empty: return 0, {} 
         current_price = data_short['last_price']
         price_1y_ago = hist['Close'].iloc[0]
@@ -523,23 +651,122 @@ def validasi_histori_panjang(ticker_lengkap, data_short):
         return final_score, hist_data
     except: return data_short['score'], {}
 
+def status_cache(item, now):
+    """SEGAR (< CACHE_TIMEOUT), BASI (masih dalam CACHE_GRACE -> sajikan + refresh latar), KOSONG."""
+    if item is None: return "KOSONG"
+    umur = now - item['timestamp']
+    if umur < CACHE_TIMEOUT: return "SEGAR"
+    if umur < CACHE_TIMEOUT + CACHE_GRACE: return "BASI"
+    # Entri dari snapshot disk (worker baru boot): tetap disajikan + di-refresh latar, bukan ditunggu
+    if item.get('snapshot') and umur < SNAPSHOT_MAX_AGE: return "BASI"
+    return "KOSONG"
+
 def get_cached_analysis(ticker):
     now = time.time()
-    if ticker in CACHE_DATA:
-        item = CACHE_DATA[ticker]
-        if now - item['timestamp'] < CACHE_TIMEOUT: return item['data']
-    data = analisa_multistrategy(ticker)
+    item = CACHE_DATA.get(ticker)
+    status = status_cache(item, now)
+    if status == "SEGAR": return item['data']
+    if status == "BASI":
+        # Stale-while-revalidate: user langsung dapat data lama, refresh jalan di belakang
+        jadwalkan_refresh([ticker])
+        return item['data']
+    gagal = gagal_cache(ticker, now)
+    if gagal is not None: return gagal
+    return refresh_analisa([ticker])[ticker]
+
+def gagal_cache(ticker, now):
+    item = CACHE_GAGAL.get(ticker)
+    if item and now - item['timestamp'] < CACHE_GAGAL_TTL: return item['data']
+    return None
+
+def is_basi(data):
+    return bool(data.get('as_of')) and time.time() - data['as_of'] >= CACHE_TIMEOUT
+
+def simpan_cache_analisa(ticker, data, df, now):
     if data['last_price'] > 0:
-        new_score, hist_data = validasi_histori_panjang(ticker, data)
+        new_score, hist_data = validasi_histori_panjang(ticker, data, hist=df)
         data['score'] = int(new_score); data['hist_data'] = hist_data
-        CACHE_DATA[ticker] = {'data': data, 'timestamp': now}
+        data['as_of'] = int(now)
+        # Bar harian ikut disimpan -> dipakai ulang mesin breadth (tanpa network tambahan)
+        CACHE_DATA[ticker] = {'data': data, 'timestamp': now, 'bars': df}
+        CACHE_GAGAL.pop(ticker, None)
+    else:
+        CACHE_GAGAL[ticker] = {'data': data, 'timestamp': now}
     return data
 
+def refresh_analisa(tickers):
+    """Ambil ulang (I/O paralel) lalu scoring batch (CPU) untuk daftar ticker. Return dict ticker -> data."""
+    now = time.time()
+    frames = {}; hasil = {}
+    if len(tickers) == 1:
+        try: frames[tickers[0]] = ambil_data_multistrategy(tickers[0])
+        except Exception as e: hasil[tickers[0]] = {**HASIL_ERROR, "reason": str(e)}
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SCAN_IO_WORKER) as executor:
+            futures = {executor.submit(ambil_data_multistrategy, t): t for t in tickers}
+            for future in concurrent.futures.as_completed(futures):
+                try: frames[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Fetch {futures[future]} Gagal: {e}")
+                    hasil[futures[future]] = {**HASIL_ERROR, "reason": str(e)}
+    for ticker, data in hasil.items(): CACHE_GAGAL[ticker] = {'data': data, 'timestamp': now}
+
+    hasil.update(skor_dan_simpan(frames, now))
+    return hasil
+
+def skor_dan_simpan(frames, now):
+    """Scoring batch + simpan cache + umpan mesin alert & indeks level (dipakai refresh & compare)."""
+    hasil = {}
+    for ticker, data in skor_batch(frames).items():
+        hasil[ticker] = simpan_cache_analisa(ticker, data, frames[ticker][0], now)
+    proses_alert(hasil)
+    perbarui_level_saham(hasil)
+    jadwalkan_tulis_snapshot()
+    return hasil
+
+def jadwalkan_refresh(tickers):
+    jalankan_refresh_latar(tickers, refresh_analisa)
+
+def jalankan_refresh_latar(kunci, fungsi):
+    """Refresh latar belakang, maksimal SATU refresh berjalan per kunci."""
+    with REFRESH_LOCK:
+        baru = [k for k in kunci if k not in REFRESH_AKTIF]
+        REFRESH_AKTIF.update(baru)
+    if not baru: return
+
+    def kerja():
+        try: fungsi(baru)
+        except Exception as e: print(f"⚠️ Refresh Latar Gagal: {e}")
+        finally:
+            with REFRESH_LOCK: REFRESH_AKTIF.difference_update(baru)
+    REFRESH_POOL.submit(kerja)
+
+FUNDA_KOSONG = {"ok": False, "nama": None, "sektor": "General", "per": 0, "pbv": 0, "market_cap": 0, "roe": 0, "text_summary": "Data Fundamental N/A"}
+
+def ambil_data_fundamental(ticker_lengkap):
+    """Fundamental jarang berubah: pakai cache + stale-while-revalidate seperti analisa."""
+    now = time.time()
+    item = CACHE_FUNDA.get(ticker_lengkap)
+    status = status_cache(item, now)
+    if status != "KOSONG":
+        if status == "BASI":
+            jalankan_refresh_latar(["FUNDA:" + ticker_lengkap],
+                                   lambda _: simpan_cache_funda(ticker_lengkap, ambil_data_fundamental_live(ticker_lengkap)))
+        return item['data']
+    return simpan_cache_funda(ticker_lengkap, ambil_data_fundamental_live(ticker_lengkap))
+
+def simpan_cache_funda(ticker_lengkap, funda):
+    funda['as_of'] = int(time.time())
+    if funda.get('ok'): CACHE_FUNDA[ticker_lengkap] = {'data': funda, 'timestamp': time.time()}
+    return funda
+
 def ambil_data_fundamental_live(ticker_lengkap):
     try:
         stock = yf.Ticker(ticker_lengkap)
-        info = stock.info
+        info = panggil_yahoo(lambda: stock.info)
         return {
+            "ok": True,
+            "nama": info.get('longName'),
             "sektor": info.get('sector', 'General'),
             "per": info.get('trailingPE', 0),
             "pbv": info.get('priceToBook', 0),
@@ -547,23 +774,114 @@ def ambil_data_fundamental_live(ticker_lengkap):
             "roe": info.get('returnOnEquity', 0),
             "text_summary": f"Sektor: {info.get('sector')} | PER: {info.get('trailingPE', 0):.2f}x | PBV: {info.get('priceToBook', 0):.2f}x | ROE: {info.get('returnOnEquity', 0):.2f}"
         }
-    except: return {"sektor": "General", "per": 0, "pbv": 0, "market_cap": 0, "roe": 0, "text_summary": "Data Fundamental N/A"}
+    except: return dict(FUNDA_KOSONG)
 
 def ambil_data_live_lengkap(ticker_lengkap):
     try:
         stock = yf.Ticker(ticker_lengkap)
-        info = stock.info
+        info = panggil_yahoo(lambda: stock.info)
         day_open = info.get('open', 0); day_high = info.get('dayHigh', 0); day_low = info.get('dayLow', 0)
         curr_price = info.get('currentPrice', day_open); volume = info.get('volume', 0)
         candle_stat = "🟢 BULLISH" if curr_price > day_open else "🔴 BEARISH"
         return f"- LIVE: Open {day_open} | High {day_high} | Low {day_low} | Last {curr_price} | {candle_stat} | Vol: {volume}"
     except: return "Data Live Tidak Tersedia."
 
+# --- SECURITY MASTER (stocks_master + daftar di atas, diindeks di memori) ---
+# Dimuat sekali saat start; semua lookup badge / sektor / universe = O(1) dict/set.
+SECURITY_MASTER = {
+    "by_ticker": {},  # kode -> {"ticker", "name", "sector", "syariah", "lq45", "status"}
+    "by_sector": {},  # sektor -> [kode, ...] (urutan tetap)
+    "syariah": [], "lq45": [], "universe": [],
+    "syariah_set": set(), "lq45_set": set(),
+    "loaded_at": 0
+}
+
+def muat_security_master():
+    master = {}
+    def tambah(kode):
+        if kode not in master:
+            master[kode] = {"ticker": kode, "name": None, "sector": SEKTOR_SAHAM.get(kode, "LAINNYA"),
+                            "syariah": kode in SET_SYARIAH, "lq45": kode in SET_LQ45, "status": "NORMAL"}
+        return master[kode]
+
+    for kode in DATABASE_SYARIAH + DATABASE_BANK + WATCHLIST: tambah(kode)
+    try:
+        conn = sqlite3.connect(DB_NAME, timeout=10)
+        rows = conn.execute("SELECT ticker, company_name, sector, is_syariah, is_lq45, special_status FROM stocks_master").fetchall()
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Security Master DB Gagal: {e}")
+        rows = []
+    for ticker, nama, sektor, syariah, lq45, status in rows:
+        item = tambah(ticker.upper().replace(".JK", ""))
+        item['name'] = nama or item['name']
+        # Bucket internal lebih spesifik; sektor DB dipakai kalau ticker belum punya bucket
+        if item['sector'] == "LAINNYA" and sektor: item['sector'] = sektor.upper()
+        item['syariah'] = item['syariah'] or bool(syariah)
+        item['lq45'] = item['lq45'] or bool(lq45)
+        item['status'] = status or "NORMAL"
+
+    by_sector = {}
+    for kode, item in master.items(): by_sector.setdefault(item['sector'], []).append(kode)
+    syariah = [k for k, v in master.items() if v['syariah']]
+    lq45 = [k for k, v in master.items() if v['lq45']]
+    SECURITY_MASTER.update({
+        "by_ticker": master, "by_sector": by_sector,
+        "syariah": syariah, "lq45": lq45, "universe": list(master),
+        "syariah_set": set(syariah), "lq45_set": set(lq45),
+        "loaded_at": int(time.time())
+    })
+    print(f"🗂️ Security Master: {len(master)} ticker, {len(syariah)} syariah, {len(lq45)} LQ45")
+
+def info_saham(kode):
+    return SECURITY_MASTER['by_ticker'].get(kode) or {
+        "ticker": kode, "name": None, "sector": "LAINNYA", "syariah": False, "lq45": False, "status": "NORMAL"}
+
+def is_syariah(kode): return kode in SECURITY_MASTER['syariah_set']
+
+def is_lq45(kode): return kode in SECURITY_MASTER['lq45_set']
+
+def sektor_ticker(kode): return info_saham(kode)['sector']
+
+def badge_saham(kode): return {"syariah": is_syariah(kode), "lq45": is_lq45(kode)}
+
+MATRIKS_UNIVERSE = {"mat": None, "timestamp": 0, "tickers": 0}
+MATRIKS_TTL = 60
+
+def matriks_close_universe():
+    """Matriks close (tanggal x ticker) dari bar yang SUDAH dimuat scanner (CACHE_DATA). Tanpa network."""
+    now = time.time()
+    if MATRIKS_UNIVERSE['mat'] is not None and now - MATRIKS_UNIVERSE['timestamp'] < MATRIKS_TTL and MATRIKS_UNIVERSE['tickers'] == len(CACHE_DATA):
+        return MATRIKS_UNIVERSE['mat']
+    bars = {t.replace(".JK", ""): item['bars'] for t, item in list(CACHE_DATA.items()) if item.get('bars') is not None}
+    mat = susun_matriks_harga(bars)
+    MATRIKS_UNIVERSE.update({"mat": mat, "timestamp": now, "tickers": len(CACHE_DATA)})
+    return mat
+
+def hitung_breadth_universe():
+    mat_close = matriks_close_universe()
+    if mat_close.shape[1] < BREADTH_MIN_TICKER: return None
+    return hitung_breadth(mat_close, {kode: sektor_ticker(kode) for kode in mat_close.columns})
+
 def cek_kondisi_market():
     now = time.time()
+    # Breadth dihitung ulang tiap menit (murah: hanya operasi matriks di memori)
+    if MARKET_STATUS.get('source') == "BREADTH" and now - MARKET_STATUS['last_check'] < 60: return MARKET_STATUS['condition']
+    try:
+        breadth = hitung_breadth_universe()
+        if breadth:
+            MARKET_STATUS['condition'] = breadth['regime']
+            MARKET_STATUS['breadth'] = breadth
+            MARKET_STATUS['source'] = "BREADTH"
+            MARKET_STATUS['last_check'] = now
+            return MARKET_STATUS['condition']
+    except Exception as e: print(f"⚠️ Breadth Gagal: {e}")
+
+    # Fallback: universe belum dimuat -> pakai pergerakan IHSG
     if now - MARKET_STATUS['last_check'] < 900: return MARKET_STATUS['condition']
+    MARKET_STATUS['source'] = "IHSG"
     try:
-        ihsg = yf.Ticker("^JKSE").history(period="2d")
+        ihsg = panggil_yahoo(yf.Ticker("^JKSE").history, period="2d")
         if len(ihsg) >= 2:
             change = (ihsg['Close'].iloc[-1] - ihsg['Close'].iloc[-2]) / ihsg['Close'].iloc[-2]
             MARKET_STATUS['condition'] = "CRASH" if change < -0.008 else "NORMAL"
@@ -595,7 +913,8 @@ def get_psychological_step(harga):
 def format_angka(nilai):
     return "{:,}".format(int(nilai)).replace(",", ".")
 
-def hitung_plan_sakti(data_analisa, ticker_fibo=None):
+def hitung_plan_sakti(data_analisa, ticker_fibo=None, df_fibo=None):
+    """df_fibo: bar harian yang sudah ada (mis. hasil batch) -> swing 1 bulan tanpa request Yahoo."""
     harga_sekarang = data_analisa.get('last_price', 0)
     hist_data = data_analisa.get('hist_data', {})
     support_short = data_analisa.get('support', 0)
@@ -630,9 +949,10 @@ def hitung_plan_sakti(data_analisa, ticker_fibo=None):
         if max_1y > buy_low and max_1y < (buy_low * 1.5): tp2_raw = max_1y
         else: tp2_raw = buy_low * 1.08
 
-        if ticker_fibo:
+        if ticker_fibo or df_fibo is not None:
             try:
-                hist = yf.Ticker(ticker_fibo).history(period="1mo")
+                if df_fibo is not None: hist = df_fibo[df_fibo.index > df_fibo.index[-1] - pd.DateOffset(months=1)]
+                else: hist = panggil_yahoo(yf.Ticker(ticker_fibo).history, period="1mo")
                 if not hist.empty:
                     swing_high = hist['High'].max()
                     swing_low = hist['Low'].min()
@@ -656,36 +976,188 @@ def hitung_plan_sakti(data_analisa, ticker_fibo=None):
 # ==========================================
 # 7. ENDPOINT DETAIL (CORE LOGIC AGGREGATOR)
 # ==========================================
+# --- TENGGAT PER REQUEST (DEADLINE PROPAGATION) ---
+# Detail punya satu budget waktu total. Tiap tahap (live, indikator, fibo, fundamental,
+# berita, AI) dijalankan dengan sisa budget; yang kehabisan waktu dilewati dengan nilai
+# cadangan dan namanya dicatat di "degraded". Plan teknikal dari cache selalu dikirim.
+DETAIL_BUDGET = float(os.getenv("DETAIL_BUDGET", 25)) # Detik, di bawah timeout router/gunicorn
+DETAIL_BUDGET_MIN = 3.0
+TAHAP_MIN_SISA = 0.3 # Tahap tidak dimulai kalau sisa budget lebih kecil dari ini
+KONTEKS_TENGGAT = threading.local()
+# Tahap yang kehabisan waktu tetap jalan di sini sampai selesai (hasilnya masuk cache untuk request berikutnya)
+TAHAP_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.getenv("DETAIL_STAGE_WORKER", 32)),
+                                                   thread_name_prefix="detail-tahap")
+
+@contextmanager
+def tenggat(detik):
+    """Pasang deadline (monotonic) + daftar degraded untuk thread ini."""
+    lama = (getattr(KONTEKS_TENGGAT, "batas", None), getattr(KONTEKS_TENGGAT, "degraded", None))
+    KONTEKS_TENGGAT.batas = time.monotonic() + detik
+    KONTEKS_TENGGAT.degraded = []
+    try: yield KONTEKS_TENGGAT.degraded
+    finally: KONTEKS_TENGGAT.batas, KONTEKS_TENGGAT.degraded = lama
+
+def sisa_waktu():
+    """Detik tersisa sampai deadline thread ini; None kalau tidak ada deadline."""
+    batas = getattr(KONTEKS_TENGGAT, "batas", None)
+    return None if batas is None else max(0.0, batas - time.monotonic())
+
+def tandai_degraded(tahap):
+    degraded = getattr(KONTEKS_TENGGAT, "degraded", None)
+    if degraded is not None and tahap not in degraded: degraded.append(tahap)
+
+def kirim_tahap(fungsi, *args, **kwargs):
+    """Jalankan fungsi di TAHAP_POOL; deadline & prioritas Yahoo thread ini ikut terbawa."""
+    batas = getattr(KONTEKS_TENGGAT, "batas", None)
+    prioritas = getattr(KONTEKS_PRIORITAS, "nilai", PRIORITAS_DETAIL)
+
+    def dengan_konteks():
+        KONTEKS_TENGGAT.batas = batas
+        KONTEKS_TENGGAT.degraded = None # Penanda degraded hanya dicatat di thread request
+        with prioritas_yahoo(prioritas): return fungsi(*args, **kwargs)
+    return TAHAP_POOL.submit(dengan_konteks)
+
+def tunggu_tahap(tahap, cadangan, future):
+    """Tunggu hasil tahap paling lama sisa budget. Gagal / lewat waktu -> cadangan + degraded."""
+    sisa = sisa_waktu()
+    try:
+        return future.result(timeout=sisa)
+    except concurrent.futures.TimeoutError:
+        print(f"⏱️ Tahap '{tahap}' melewati tenggat ({sisa:.1f} detik)")
+    except Exception as e:
+        print(f"⚠️ Tahap '{tahap}' gagal: {e}")
+    tandai_degraded(tahap)
+    return cadangan
+
+def jalankan_tahap(tahap, cadangan, fungsi, *args, **kwargs):
+    """
+    Jalankan satu tahap detail dalam sisa budget. Deadline & prioritas Yahoo ikut ke thread
+    pool (timeout AI per percobaan tetap tahu sisa waktunya). Gagal / lewat waktu -> cadangan.
+    """
+    sisa = sisa_waktu()
+    if sisa is None: return fungsi(*args, **kwargs)
+    if sisa < TAHAP_MIN_SISA:
+        tandai_degraded(tahap)
+        return cadangan
+    return tunggu_tahap(tahap, cadangan, kirim_tahap(fungsi, *args, **kwargs))
+
+# --- COALESCING DETAIL (SINGLEFLIGHT) ---
+# Ticker yang sedang ramai dibuka puluhan user bersamaan: hanya request PERTAMA (leader)
+# menjalankan pipeline Yahoo + berita + AI; request lain untuk ticker yang sama menempel
+# ke Future-nya. Hasil lengkap (tanpa degraded) dipakai ulang sebentar untuk ekor burst.
+# Follower yang budget-nya lebih longgar dari leader tidak menerima hasil degraded leader:
+# ia membuka putaran baru (follower lain dengan budget serupa menempel ke putaran itu).
+DETAIL_REUSE = int(os.getenv("DETAIL_REUSE", 30)) # Detik hasil detail lengkap boleh dipakai ulang
+DETAIL_TOLERANSI = 1.0 # Detik: tenggat leader yang lebih awal dari ini masih dianggap setara
+DETAIL_TERBANG = {} # kode -> {"future", "mulai", "batas"}
+DETAIL_SELESAI = {} # kode -> {"data", "timestamp"}
+TERBANG_LOCK = threading.Lock()
+STATUS_COALESCE = {"pipelines": 0, "coalesced": 0, "reused": 0, "rerun": 0, "fallback": 0}
+
+def detail_terkoalesi(kode):
+    """Return (data, peran): peran = leader | follower | reused | fallback."""
+    batas = getattr(KONTEKS_TENGGAT, "batas", None)
+    batas = math.inf if batas is None else batas
+    while True:
+        now = time.time()
+        with TERBANG_LOCK:
+            item = DETAIL_SELESAI.get(kode)
+            if item and now - item['timestamp'] < DETAIL_REUSE:
+                STATUS_COALESCE['reused'] += 1
+                return item['data'], "reused"
+            terbang = DETAIL_TERBANG.get(kode)
+            if terbang is None:
+                terbang = DETAIL_TERBANG[kode] = {"future": concurrent.futures.Future(), "mulai": now, "batas": batas}
+                STATUS_COALESCE['pipelines'] += 1
+                break # Jadi leader
+            STATUS_COALESCE['coalesced'] += 1
+
+        try: data = terbang['future'].result(timeout=sisa_waktu())
+        except concurrent.futures.TimeoutError:
+            # Budget follower habis duluan: tetap kirim plan teknikal (semua tahap lain = cadangan)
+            with TERBANG_LOCK: STATUS_COALESCE['fallback'] += 1
+            return bangun_detail_saham(kode), "fallback"
+        except Exception as e:
+            # Pipeline leader gagal: follower tidak ikut 500, jalankan pipeline sendiri dengan sisa budget
+            print(f"⚠️ Detail {kode}: leader gagal ({e}), follower jalan sendiri")
+            with TERBANG_LOCK: STATUS_COALESCE['fallback'] += 1
+            return bangun_detail_saham(kode), "fallback"
+        if data.get('degraded') and terbang['batas'] < batas - DETAIL_TOLERANSI:
+            # Leader menyerah lebih cepat dari budget follower ini -> putaran baru dengan sisa budget sendiri
+            with TERBANG_LOCK: STATUS_COALESCE['rerun'] += 1
+            continue
+        return data, "follower"
+
+    try:
+        data = bangun_detail_saham(kode)
+    except Exception as e:
+        with TERBANG_LOCK:
+            if DETAIL_TERBANG.get(kode) is terbang: del DETAIL_TERBANG[kode]
+        terbang['future'].set_exception(e)
+        raise
+    # Hasil dipublikasikan ke DETAIL_SELESAI SEBELUM flight dilepas: request yang datang di
+    # antaranya memakai hasil ini, bukan memulai pipeline kedua
+    with TERBANG_LOCK:
+        if not data.get('degraded') and 'error' not in data:
+            for k in [k for k, v in DETAIL_SELESAI.items() if now - v['timestamp'] >= DETAIL_REUSE]: del DETAIL_SELESAI[k]
+            DETAIL_SELESAI[kode] = {"data": data, "timestamp": time.time()}
+        if DETAIL_TERBANG.get(kode) is terbang: del DETAIL_TERBANG[kode]
+    terbang['future'].set_result(data)
+    return data, "leader"
+
 @app.route('/api/stock-detail', methods=['GET'])
 def get_stock_detail():
     ticker_polos = request.args.get('ticker')
     if not ticker_polos: return jsonify({"error": "No Ticker"}), 400
-    
+    # ?budget=<detik> boleh lebih ketat dari default (mis. klien dengan timeout pendek), tidak lebih longgar
+    try: budget = min(DETAIL_BUDGET, max(DETAIL_BUDGET_MIN, float(request.args.get('budget', DETAIL_BUDGET))))
+    except ValueError: return jsonify({"error": "budget harus angka (detik)"}), 400
+
+    kode = ticker_polos.strip().upper().replace(".JK", "")
+
+    # ?mode=async -> langsung balas job id (202), analisa jalan di antrean job (lihat bagian 18)
+    if request.args.get('mode') == 'async':
+        return respon_job_baru(kode, request.args.get('priority', 'interactive'))
+
+    # User sedang menunggu -> panggilan Yahoo di request ini didahulukan dari scanner
+    with prioritas_yahoo(PRIORITAS_DETAIL), tenggat(budget):
+        data, peran = detail_terkoalesi(kode)
+    # Salinan dangkal: dict hasil dipakai bersama semua penunggu, jangan diubah
+    return jsonify({**data, "coalesced": peran})
+
+def bangun_detail_saham(ticker_polos):
     ticker_lengkap = ticker_polos + ".JK"
-    data = get_cached_analysis(ticker_lengkap)
+    # Ticker dingin = Yahoo + retry/backoff: ikut tenggat juga, pengambilan tetap selesai di
+    # TAHAP_POOL sehingga request berikutnya dapat dari cache
+    data = jalankan_tahap("data", None, get_cached_analysis, ticker_lengkap)
+    if data is None:
+        return {"error": "Timeout", "analysis": {"score": 0, "verdict": "ERR", "type": "-",
+                                                 "reason": "Data saham belum tersedia dalam batas waktu, coba lagi sebentar."},
+                "degraded": list(getattr(KONTEKS_TENGGAT, "degraded", None) or [])}
     
     if data['last_price'] == 0:
-        return jsonify({"error": "Not Found", "analysis": {"score":0, "verdict":"ERR", "reason":"-", "type":"-"}})
+        return {"error": "Not Found", "analysis": {"score":0, "verdict":"ERR", "reason":"-", "type":"-"}}
     
     # 1. Ambil Waktu Pasar (Fitur V15)
     info_waktu = get_waktu_pasar()
 
     # 2. Ambil Data Teknikal Live & 13 Indikator (Fitur V14)
-    info_live = ambil_data_live_lengkap(ticker_lengkap)
-    teknikal_lengkap = hitung_indikator_lengkap(ticker_lengkap)
+    # Tiap tahap lewat jalankan_tahap: kalau budget habis, pakai cadangan & dicatat di "degraded"
+    info_live = jalankan_tahap("live", "Data Live Tidak Tersedia.", ambil_data_live_lengkap, ticker_lengkap)
+    indikator = jalankan_tahap("indicators", {"error": "Indikator dilewati (batas waktu)"},
+                               hitung_indikator_dict, ticker_lengkap, df=CACHE_DATA.get(ticker_lengkap, {}).get('bars'))
     hist_data = data.get('hist_data', {})
-    entry, sl, tp = hitung_plan_sakti(data, ticker_fibo=ticker_lengkap)
+    # Plan selalu ada: tanpa fibo 1 bulan pun hitung_plan_sakti tetap memberi entry/SL/TP dari data scan
+    plan = jalankan_tahap("plan_fibo", None, hitung_plan_sakti, data, ticker_fibo=ticker_lengkap)
+    entry, sl, tp = plan if plan else hitung_plan_sakti(data, ticker_fibo=None)
 
-    # 3. Ambil Data Fundamental Live
-    funda = ambil_data_fundamental_live(ticker_lengkap)
+    # 3. Ambil Data Fundamental Live (cache SWR)
+    funda = jalankan_tahap("fundamental", dict(FUNDA_KOSONG), ambil_data_fundamental, ticker_lengkap)
 
     # --- [UPDATE V7.1: AMBIL NAMA PERUSAHAAN] ---
     # Tujuannya agar pencarian berita tidak nyasar ke saham luar negeri (misal META/APPLE)
-    try:
-        stock_info = yf.Ticker(ticker_lengkap).info
-        nama_perusahaan_asli = stock_info.get('longName', ticker_polos)
-    except:
-        nama_perusahaan_asli = ticker_polos
+    # Nama diambil dari .info yang sama dengan fundamental (tidak perlu request kedua)
+    nama_perusahaan_asli = funda.get('nama') or info_saham(ticker_polos)['name'] or ticker_polos
     # --------------------------------------------
 
     score = data['score']
@@ -694,34 +1166,48 @@ def get_stock_detail():
     trend_1y = hist_data.get('trend_1y', 'N/A')
     
     # 4. Ambil Berita & Cari di Internet (Fitur V7 Updated)
-    list_berita = ambil_berita_saham(ticker_lengkap)
+    list_berita = jalankan_tahap("news_yahoo", [], ambil_berita_saham, ticker_lengkap)
     
     # UPDATE PEMANGGILAN: Masukkan nama_perusahaan_asli sebagai parameter ke-4
-    laporan_berita = agen_pencari_berita_robust(ticker_polos, funda['sektor'], list_berita, nama_perusahaan_asli)
-
-    # 5. Susun Context untuk AI
-    data_context = f"""
-    SAHAM: {ticker_polos} ({nama_perusahaan_asli})
+    # Sektor dari security master (bucket internal), .info hanya jadi cadangan
+    sektor = sektor_ticker(ticker_polos)
+    if sektor == "LAINNYA": sektor = funda['sektor']
+    laporan_berita = jalankan_tahap("news", "Berita tidak sempat dikumpulkan (batas waktu).",
+                                    agen_pencari_berita_robust, ticker_polos, sektor, list_berita, nama_perusahaan_asli)
+
+    # 5. Susun Context untuk AI (default: ringkas & dibatasi budget token)
+    ringkas = AI_KONTEKS_MODE == "ringkas"
+    if ringkas:
+        data_context, token_konteks = susun_konteks_ringkas(
+            ticker_polos, nama_perusahaan_asli, info_waktu, data, indikator, info_live, funda, laporan_berita)
+    else:
+        teknikal_lengkap = indikator['error'] if "error" in indikator else format_indikator_lengkap(indikator)
+        data_context = f"""
+        SAHAM: {ticker_polos} ({nama_perusahaan_asli})
     
-    {info_waktu}
+        {info_waktu}
     
-    [DATA TEKNIKAL SYSTEM]
-    - Skor: {score}/100 | Trend 1Y: {trend_1y}
-    - Warning: {catatan_histori}
-    {info_live}
+        [DATA TEKNIKAL SYSTEM]
+        - Skor: {score}/100 | Trend 1Y: {trend_1y}
+        - Warning: {catatan_histori}
+        {info_live}
     
-    {teknikal_lengkap}
+        {teknikal_lengkap}
     
-    [DATA FUNDAMENTAL LIVE]
-    {funda['text_summary']}
-    - Market Cap: {funda['market_cap']:,}
+        [DATA FUNDAMENTAL LIVE]
+        {funda['text_summary']}
+        - Market Cap: {funda['market_cap']:,}
     
-    [LAPORAN BERITA & KORELASI]
-    {laporan_berita}
-    """
+        [LAPORAN BERITA & KORELASI]
+        {laporan_berita}
+        """
+        token_konteks = estimasi_token(data_context)
+    token_prompt = estimasi_token(susun_prompt_analis(data_context, ringkas))
+    print(f"🧮 Konteks AI {ticker_polos}: {token_konteks} token (prompt total ~{token_prompt})")
     
     # 6. Analisa Final oleh Kepala Analis (AI V9 Failover)
-    analisa_final = agen_analis_utama(data_context)
+    analisa_final = jalankan_tahap("analysis", "⏱️ Analisa AI dilewati: batas waktu request habis. Plan teknikal di atas tetap berlaku.",
+                                   agen_analis_utama, data_context, ringkas)
     
     rincian_teknikal = f"🕒 **{info_waktu}**\n\n🔍 **SKOR {score} ({verdict})**\n"
     if catatan_histori != "Valid": rincian_teknikal += f"⚠️ {catatan_histori}\n"
@@ -734,7 +1220,7 @@ def get_stock_detail():
     stock_detail = {
         "ticker": ticker_polos,
         "company_name": f"Rp {format_angka(data['last_price'])} ({tanda}{pct:.2f}%)",
-        "badges": { "syariah": ticker_polos in DATABASE_SYARIAH, "lq45": True },
+        "badges": badge_saham(ticker_polos),
         "analysis": {
             "score": int(data['score']),
             "verdict": data['verdict'],
@@ -743,9 +1229,17 @@ def get_stock_detail():
         },
         "plan": { "entry": entry, "stop_loss": sl, "take_profit": tp },
         "news": list_berita, 
-        "is_watchlist": ticker_polos in WATCHLIST
+        "is_watchlist": ticker_polos in WATCHLIST_SET,
+        "as_of": data.get('as_of'),
+        "stale": is_basi(data),
+        "ai_context": {"mode": "ringkas" if ringkas else "lengkap", "tokens": token_konteks,
+                       "prompt_tokens": token_prompt, "budget": AI_TOKEN_BUDGET if ringkas else None,
+                       "over_budget": ringkas and token_konteks > AI_TOKEN_BUDGET},
+        # Bagian yang dilewati / memakai cadangan karena tenggat (kosong = respon lengkap)
+        "degraded": list(getattr(KONTEKS_TENGGAT, "degraded", None) or []),
+        "time_left": None if sisa_waktu() is None else round(sisa_waktu(), 2)
     }
-    return jsonify(stock_detail)
+    return stock_detail
 
 # ==========================================
 # 8. SCANNER & WATCHLIST (CORE ENGINE V5)
@@ -758,65 +1252,1756 @@ def process_single_stock(kode, target_strategy, min_score_needed):
         if data['score'] < min_score_needed: return None 
 
         tipe_ditemukan = data['type']
-        if target_strategy == 'SYARIAH': pass 
+        if target_strategy in ('SYARIAH', 'LQ45'): pass 
         elif target_strategy not in ['ALL', 'WATCHLIST']:
             if target_strategy not in tipe_ditemukan: return None
 
-        entry, sl, tp = hitung_plan_sakti(data, ticker_fibo=None)
-        pct = data.get('change_pct', 0)
-        tanda = "+" if pct >= 0 else ""
-        info_harga = f"Rp {format_angka(data['last_price'])} ({tanda}{pct:.2f}%)"
-
-        return {
-            "ticker": kode,
-            "company_name": info_harga,
-            "badges": { "syariah": kode in DATABASE_SYARIAH, "lq45": True },
-            "analysis": {
-                "score": int(data['score']),
-                "verdict": data['verdict'],
-                "reason": data['reason'],
-                "type": tipe_ditemukan
-            },
-            "plan": {"entry": entry, "stop_loss": sl, "take_profit": tp},
-            "news": [], 
-            "is_watchlist": kode in WATCHLIST
-        }
+        return format_baris_scan(kode, data)
     except: return None
 
+def format_baris_scan(kode, data):
+    entry, sl, tp = hitung_plan_sakti(data, ticker_fibo=None)
+    pct = data.get('change_pct', 0)
+    tanda = "+" if pct >= 0 else ""
+    info_harga = f"Rp {format_angka(data['last_price'])} ({tanda}{pct:.2f}%)"
+
+    return {
+        "ticker": kode,
+        "company_name": info_harga,
+        "badges": badge_saham(kode),
+        "analysis": {
+            "score": int(data['score']),
+            "verdict": data['verdict'],
+            "reason": data['reason'],
+            "type": data['type']
+        },
+        "plan": {"entry": entry, "stop_loss": sl, "take_profit": tp},
+        "news": [], 
+        "is_watchlist": kode in WATCHLIST_SET,
+        "as_of": data.get('as_of'),
+        "stale": is_basi(data)
+    }
+
+# --- PIPELINE SCAN 2 TAHAP: I/O (THREAD) -> CPU (PROSES + SHARED MEMORY) ---
+SCAN_IO_WORKER = int(os.getenv("SCAN_IO_WORKER", 10))
+SCAN_PROSES = int(os.getenv("SCAN_PROSES", os.cpu_count() or 1))
+SCAN_PROSES_MIN = 8 # Di bawah ini overhead proses lebih mahal dari hitungannya
+PROSES_POOL = {"pool": None}
+PROSES_LOCK = threading.Lock()
+
+def ambil_proses_pool():
+    with PROSES_LOCK:
+        if PROSES_POOL['pool'] is None:
+            # Bukan fork: worker gunicorn gthread punya banyak thread, fork bisa mewarisi lock
+            # yang sedang dipegang thread lain (deadlock). forkserver/spawn mulai dari proses bersih.
+            metode = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            PROSES_POOL['pool'] = concurrent.futures.ProcessPoolExecutor(
+                max_workers=SCAN_PROSES, mp_context=multiprocessing.get_context(metode))
+        return PROSES_POOL['pool']
+
+def tutup_proses_pool():
+    if PROSES_POOL['pool'] is not None: PROSES_POOL['pool'].shutdown(wait=False, cancel_futures=True)
+
+atexit.register(tutup_proses_pool)
+
+def skor_batch(frames):
+    """
+    Tahap CPU. frames: dict ticker -> (df, df_weekly, info).
+    Bar dikemas ke satu blok shared memory; worker proses hanya menerima nama blok + offset.
+    """
+    if SCAN_PROSES <= 1 or len(frames) < SCAN_PROSES_MIN:
+        return {t: hitung_skor_multistrategy(t, df, dfw, info) for t, (df, dfw, info) in frames.items()}
+
+    shm, shape, tugas = kemas_bar_shm(frames)
+    try:
+        pool = ambil_proses_pool()
+        n = min(SCAN_PROSES, len(tugas))
+        potongan = [tugas[i::n] for i in range(n)]
+        futures = [pool.submit(skor_dari_shm, shm.name, shape, p) for p in potongan]
+        hasil = {}
+        for f in futures: hasil.update(f.result())
+        return hasil
+    except concurrent.futures.BrokenExecutor as e:
+        print(f"⚠️ Process Pool Rusak, fallback ke thread utama: {e}")
+        with PROSES_LOCK: PROSES_POOL['pool'] = None
+        return {t: hitung_skor_multistrategy(t, df, dfw, info) for t, (df, dfw, info) in frames.items()}
+    finally:
+        shm.close(); shm.unlink()
+
+MUAT_TERBANG = {} # ticker -> Future pemuatan scan yang sedang berjalan
+MUAT_LOCK = threading.Lock()
+
+def muat_ulang_universe(tickers):
+    """
+    Refresh ticker yang cache-nya kedaluwarsa sebelum scan disajikan.
+    Yang masih dalam masa grace cukup disajikan lama + di-refresh di belakang;
+    hanya yang benar-benar kosong yang ditunggu (I/O paralel lalu scoring batch).
+    """
+    now = time.time()
+    kosong = []; basi = []
+    for t in tickers:
+        status = status_cache(CACHE_DATA.get(t), now)
+        if status == "KOSONG" and gagal_cache(t, now) is None: kosong.append(t)
+        elif status == "BASI": basi.append(t)
+    if basi: jadwalkan_refresh(basi)
+    if not kosong: return 0
+
+    # Ticker yang sedang dimuat scan strategi lain (SYARIAH & LQ45 banyak beririsan) cukup ditunggu
+    selesai = concurrent.futures.Future()
+    with MUAT_LOCK:
+        milik = [t for t in kosong if t not in MUAT_TERBANG]
+        ditunggu = {MUAT_TERBANG[t] for t in kosong if t in MUAT_TERBANG}
+        for t in milik: MUAT_TERBANG[t] = selesai
+    try: jumlah = len(refresh_analisa(milik)) if milik else 0
+    finally:
+        with MUAT_LOCK:
+            for t in milik: MUAT_TERBANG.pop(t, None)
+        selesai.set_result(None)
+    concurrent.futures.wait(ditunggu)
+    return jumlah
+
 @app.route('/api/scan-results', methods=['GET'])
 def get_scan_results():
     target_strategy = request.args.get('strategy', 'ALL') 
+    # ?sentiment=1 -> top-N hasil scan diberi sentimen berita (1x panggilan AI untuk semuanya)
+    dengan_sentimen = request.args.get('sentiment') == '1'
+    return respon_snapshot(snapshot_untuk_respon(target_strategy, dengan_sentimen))
+
+@app.route('/api/scan-results/delta', methods=['GET'])
+def get_scan_delta():
+    """
+    Feed delta: /api/scan-results/delta?strategy=ALL&since=<version>
+    Hanya baris yang ditambah / dihapus / berubah skor atau verdict sejak versi klien.
+    Versi yang sudah tidak ada di riwayat -> full=true + seluruh list (resync).
+    """
+    target_strategy = request.args.get('strategy', 'ALL')
+    snap = snapshot_untuk_respon(target_strategy)
+    try: since = int(request.args.get('since', 0))
+    except ValueError: return jsonify({"error": "since harus angka"}), 400
+
+    with SNAPSHOT_LOCK:
+        # Versi tak dikenal semuanya dipetakan ke satu kunci resync (cache delta tetap kecil)
+        if since != snap['versi'] and not any(s['versi'] == since for s in RIWAYAT_SNAPSHOT.get(target_strategy, [])): since = -1
+        if since not in snap['delta']:
+            snap['delta'][since] = {"payload": hitung_delta_snapshot(snap, since), "encoded": {}}
+        delta = snap['delta'][since]
+    resp = respon_payload(delta['payload'], f"delta-{target_strategy}-{since}-{snap['versi']}", cache=delta['encoded'])
+    resp.headers["X-Scan-Version"] = str(snap['versi'])
+    return resp
+
+def selang_per_sektor(daftar):
+    """Round-robin antar sektor (urutan dalam sektor tetap) agar potongan scan mewakili semua sektor"""
+    per_sektor = {}
+    for kode in daftar: per_sektor.setdefault(sektor_ticker(kode), []).append(kode)
+    antrean = list(per_sektor.values()); hasil = []
+    for i in range(max((len(a) for a in antrean), default=0)):
+        hasil.extend(a[i] for a in antrean if i < len(a))
+    return hasil
+
+# Singleflight per strategi: request scan serentak untuk strategi yang sama (mis. semua klien
+# dingin setelah deploy) menunggu SATU scan, bukan masing-masing menskor ulang ticker yang sama
+SCAN_TERBANG = {} # (strategy, sentimen) -> Future snapshot
+SCAN_TERBANG_LOCK = threading.Lock()
+
+def hitung_snapshot_scan(target_strategy, dengan_sentimen=False):
+    kunci = (target_strategy, dengan_sentimen)
+    with SCAN_TERBANG_LOCK:
+        future = SCAN_TERBANG.get(kunci)
+        leader = future is None
+        if leader: future = SCAN_TERBANG[kunci] = concurrent.futures.Future()
+    if not leader: return future.result()
+    try:
+        snap = jalankan_scan(target_strategy, dengan_sentimen)
+    except Exception as e:
+        with SCAN_TERBANG_LOCK: SCAN_TERBANG.pop(kunci, None)
+        future.set_exception(e)
+        raise
+    with SCAN_TERBANG_LOCK: SCAN_TERBANG.pop(kunci, None)
+    future.set_result(snap)
+    return snap
+
+def jalankan_scan(target_strategy, dengan_sentimen=False):
     kondisi_market = cek_kondisi_market()
-    MIN_SCORE = 60 
-    if kondisi_market == "CRASH": MIN_SCORE = 80 
+    # Ambang per regime dari PARAM_SKOR (default 60 / WEAK 70 / CRASH 80, bisa dikalibrasi)
+    MIN_SCORE = PARAM_SKOR['min_score'].get(kondisi_market, PARAM_SKOR['min_score']['NORMAL'])
     
     daftar_scan = []
-    if target_strategy == 'SYARIAH': daftar_scan = DATABASE_SYARIAH 
+    if target_strategy == 'SYARIAH': daftar_scan = SECURITY_MASTER['syariah'] 
+    elif target_strategy == 'LQ45': daftar_scan = SECURITY_MASTER['lq45']
     elif target_strategy == 'ALL' or target_strategy == 'WATCHLIST': daftar_scan = WATCHLIST
-    else: daftar_scan = MARKET_UNIVERSE
+    else: daftar_scan = SECURITY_MASTER['universe']
 
     results = []
-    limit_scan = daftar_scan[:60] 
+    # Dipotong setelah diselang per sektor: daftar master urut syariah dulu, jadi potong
+    # langsung [:LIMIT_SCAN] tidak akan pernah menyentuh bank besar di ujung daftar
+    limit_scan = selang_per_sektor(daftar_scan)[:LIMIT_SCAN]
+    muat_ulang_universe([kode + ".JK" for kode in limit_scan])
     with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
         futures = {executor.submit(process_single_stock, kode, target_strategy, MIN_SCORE): kode for kode in limit_scan}
         for future in concurrent.futures.as_completed(futures):
             res = future.result()
             if res: results.append(res)
-    results.sort(key=lambda x: x['analysis']['score'], reverse=True)
-    return jsonify(results)
+    # Urutan stabil (skor lalu ticker) supaya snapshot yang isinya sama punya versi yang sama
+    results.sort(key=lambda x: (-x['analysis']['score'], x['ticker']))
+    if dengan_sentimen:
+        # Dibatasi SENTIMEN_BUDGET: LLM yang lambat tidak boleh menahan respon scan (dan semua
+        # penunggu singleflight-nya). Ticker yang belum sempat dinilai menyusul di polling berikutnya.
+        try:
+            with tenggat(SENTIMEN_BUDGET): analisa_sentimen_batch([r['ticker'] for r in results[:SENTIMEN_TOP_N]])
+        except Exception as e: print(f"⚠️ Sentimen Batch Gagal: {e}")
+    for r in results: r['sentiment'] = sentimen_cache(r['ticker'])
+    simpan_riwayat_scan(results)
+    return terbitkan_snapshot(target_strategy, results)
 
 @app.route('/api/watchlist/add', methods=['POST'])
 def add_watchlist():
     ticker = request.args.get('ticker')
-    if ticker and ticker not in WATCHLIST: WATCHLIST.append(ticker)
+    if ticker and ticker not in WATCHLIST_SET: WATCHLIST.append(ticker); WATCHLIST_SET.add(ticker)
     return jsonify({"message": "Success", "current_list": WATCHLIST})
 
 @app.route('/api/watchlist/remove', methods=['POST'])
 def remove_watchlist():
     ticker = request.args.get('ticker')
-    if ticker and ticker in WATCHLIST: WATCHLIST.remove(ticker)
+    if ticker and ticker in WATCHLIST_SET: WATCHLIST.remove(ticker); WATCHLIST_SET.discard(ticker)
     return jsonify({"message": "Success", "current_list": WATCHLIST})
 
+@app.route('/api/master', methods=['GET'])
+def get_security_master():
+    """Lookup security master: ?ticker=BBRI atau filter ?sector=BANK&syariah=1&lq45=1"""
+    kode = request.args.get('ticker')
+    if kode: return jsonify(info_saham(kode.upper().replace(".JK", "")))
+    sektor = request.args.get('sector')
+    daftar = SECURITY_MASTER['by_sector'].get(sektor.upper(), []) if sektor else SECURITY_MASTER['universe']
+    if request.args.get('syariah') == '1': daftar = [k for k in daftar if is_syariah(k)]
+    if request.args.get('lq45') == '1': daftar = [k for k in daftar if is_lq45(k)]
+    return jsonify({
+        "count": len(daftar),
+        "sectors": {k: len(v) for k, v in SECURITY_MASTER['by_sector'].items()},
+        "tickers": [info_saham(k) for k in daftar]
+    })
+
+# --- SNAPSHOT SCAN: VERSI, ETAG, 304 & KOMPRESI ---
+SNAPSHOT_SCAN = {} # strategy -> {"versi", "sidik", "dicek", "results", "encoded": {(format, encoding): bytes}}
+VERSI_SCAN = {} # strategy -> versi terakhir (monoton naik, hanya naik kalau sidik berubah)
+# Klien yang membawa If-None-Match dijawab dari snapshot yang baru diverifikasi, tanpa scan ulang
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", 30))
+SNAPSHOT_RIWAYAT = 50 # Jumlah versi lama per strategy yang disimpan untuk feed delta
+RIWAYAT_SNAPSHOT = {} # strategy -> deque snapshot lama
+SNAPSHOT_LOCK = threading.Lock()
+KOMPRESI_MIN_BYTES = 1024
+
+def sidik_results(results):
+    """
+    Sidik isi scan (blake2b, BUKAN hash() yang di-salt per proses). ETag diturunkan dari sini:
+    isi sama = ETag sama di worker mana pun. as_of berubah setiap data di-refresh, jadi cukup
+    untuk mendeteksi plan/score yang berubah.
+    """
+    kunci = json.dumps([(r['ticker'], r['analysis']['score'], r['analysis']['verdict'], r['analysis']['type'], r.get('as_of'),
+                         (r.get('sentiment') or {}).get('as_of')) for r in results], default=str)
+    return hashlib.blake2b(kunci.encode('utf-8'), digest_size=8).hexdigest()
+
+def versi_berikutnya(kunci):
+    """
+    Versi feed delta per strategy: selalu lebih besar dari versi sebelumnya. Dilantai ke epoch
+    milidetik supaya versi dari worker gunicorn lain tidak kebetulan sama dengan versi lokal
+    (since asing -> resync penuh, bukan delta dari isi yang salah). Masih aman untuk JS (< 2^53).
+    """
+    VERSI_SCAN[kunci] = max(VERSI_SCAN.get(kunci, 0) + 1, int(time.time() * 1000))
+    return VERSI_SCAN[kunci]
+
+def terbitkan_snapshot(kunci, results):
+    """Versi baru hanya diterbitkan kalau isi scan berubah; kalau sama, snapshot lama (dan byte-nya) dipakai ulang."""
+    sidik = sidik_results(results)
+    with SNAPSHOT_LOCK:
+        snap = SNAPSHOT_SCAN.get(kunci)
+        if snap and snap['sidik'] == sidik:
+            snap['dicek'] = time.time()
+            return snap
+        snap = {"kunci": kunci, "versi": versi_berikutnya(kunci), "sidik": sidik, "dicek": time.time(),
+                "results": results, "encoded": {}, "delta": {}}
+        SNAPSHOT_SCAN[kunci] = snap
+        RIWAYAT_SNAPSHOT.setdefault(kunci, deque(maxlen=SNAPSHOT_RIWAYAT)).append(snap)
+        return snap
+
+def snapshot_untuk_respon(strategy, dengan_sentimen=False):
+    """
+    Klien dengan If-None-Match: kalau snapshot strategi ini diverifikasi < SNAPSHOT_TTL lalu,
+    ETag-nya dicocokkan dulu (304 tanpa scan). Selain itu scan seperti biasa.
+    """
+    snap = SNAPSHOT_SCAN.get(strategy)
+    if (snap and not dengan_sentimen and request.headers.get('If-None-Match')
+            and time.time() - snap['dicek'] < SNAPSHOT_TTL):
+        return snap
+    return hitung_snapshot_scan(strategy, dengan_sentimen)
+
+def hitung_delta_snapshot(snap, since):
+    payload = {"strategy": snap['kunci'], "version": snap['versi'], "since": since, "full": False,
+               "added": [], "removed": [], "changed": []}
+    if since == snap['versi']: return payload
+
+    basis = next((s for s in RIWAYAT_SNAPSHOT.get(snap['kunci'], []) if s['versi'] == since), None)
+    if basis is None:
+        payload['full'] = True
+        payload['added'] = snap['results']
+        return payload
+
+    lama = {r['ticker']: r for r in basis['results']}
+    baru = {r['ticker']: r for r in snap['results']}
+    for ticker, row in baru.items():
+        if ticker not in lama: payload['added'].append(row)
+        elif (row['analysis']['score'], row['analysis']['verdict']) != (lama[ticker]['analysis']['score'], lama[ticker]['analysis']['verdict']):
+            payload['changed'].append(row)
+    payload['removed'] = [t for t in lama if t not in baru]
+    return payload
+
+def daftar_accept_encoding():
+    hasil = set()
+    for bagian in request.headers.get('Accept-Encoding', '').split(','):
+        nama, _, param = bagian.strip().partition(';')
+        if nama and param.replace(' ', '') not in ('q=0', 'q=0.0'): hasil.add(nama.lower())
+    return hasil
+
+def encode_payload(obj, fmt, encoding):
+    if fmt == "msgpack": body = msgpack.packb(obj, use_bin_type=True)
+    else: body = app.json.dumps(obj).encode('utf-8')
+    if encoding == "br": return brotli.compress(body, quality=5)
+    if encoding == "gzip": return gzip.compress(body, compresslevel=6)
+    return body
+
+def respon_payload(obj, etag, cache=None):
+    """
+    Respon dengan ETag + 304 (If-None-Match), gzip/brotli (Accept-Encoding)
+    dan MessagePack opsional (?format=msgpack atau Accept: application/x-msgpack).
+    `cache` (dict) menyimpan byte hasil encode supaya tidak serialize ulang.
+    """
+    fmt = "json"
+    if msgpack and (request.args.get('format') == 'msgpack' or 'application/x-msgpack' in request.headers.get('Accept', '')):
+        fmt = "msgpack"
+    etag = f'W/"{etag}-{fmt}"'
+
+    diminta = [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]
+    if etag in diminta or '*' in diminta:
+        return Response(status=304, headers={"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding, Accept"})
+
+    if cache is None: cache = {}
+    if (fmt, None) not in cache: cache[(fmt, None)] = encode_payload(obj, fmt, None)
+    encoding = None
+    if len(cache[(fmt, None)]) >= KOMPRESI_MIN_BYTES:
+        bisa = daftar_accept_encoding()
+        if brotli and "br" in bisa: encoding = "br"
+        elif "gzip" in bisa: encoding = "gzip"
+    if (fmt, encoding) not in cache: cache[(fmt, encoding)] = encode_payload(obj, fmt, encoding)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding, Accept"}
+    if encoding: headers["Content-Encoding"] = encoding
+    mimetype = "application/x-msgpack" if fmt == "msgpack" else "application/json"
+    return Response(cache[(fmt, encoding)], mimetype=mimetype, headers=headers)
+
+def respon_snapshot(snap):
+    resp = respon_payload(snap['results'], f"scan-{snap['kunci']}-{snap['sidik']}", cache=snap['encoded'])
+    resp.headers["X-Scan-Version"] = str(snap['versi'])
+    return resp
+
+# ==========================================
+# 9. RIWAYAT SCAN (SQLITE - SCAN_RESULTS)
+# ==========================================
+DB_NAME = os.getenv("DB_PATH", "ihsg_hunter.db")
+RIWAYAT_TERSIMPAN = {}  # ticker -> waktu terakhir ditulis ke scan_results
+RIWAYAT_LOCK = threading.Lock()
+
+def buka_koneksi_db():
+    """
+    Koneksi SQLite per-panggilan (aman dipakai dari banyak thread).
+    WAL membuat pembaca /api/scan-history tidak terblokir saat scanner menulis.
+    """
+    conn = sqlite3.connect(DB_NAME, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def siapkan_index_riwayat():
+    try:
+        conn = buka_koneksi_db()
+        with conn:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_date ON scan_results (scan_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_ticker ON scan_results (ticker, scan_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_type ON scan_results (scanner_type, scan_date, accuracy_score)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_hari ON scan_results (substr(scan_date, 1, 10))")
+        conn.close()
+    except Exception as e: print(f"⚠️ Index Riwayat Gagal: {e}")
+
+def simpan_riwayat_scan(results):
+    """
+    Menulis hasil scan ke tabel scan_results dalam SATU transaksi (executemany).
+    Tiap ticker hanya ditulis sekali per siklus CACHE_TIMEOUT supaya polling
+    berulang dari aplikasi tidak menggandakan baris yang sama.
+    scan_date selalu WIB (lihat skema di bikin_database.py).
+    """
+    now = time.time()
+    scan_date = datetime.now(pytz.timezone('Asia/Jakarta')).strftime("%Y-%m-%d %H:%M:%S")
+    rows = []; tanda_lama = {}
+    with RIWAYAT_LOCK:
+        for r in results:
+            kode = r['ticker']
+            if now - RIWAYAT_TERSIMPAN.get(kode, 0) < CACHE_TIMEOUT: continue
+            # Ditandai sekarang agar scan paralel tidak ikut menulis; dibatalkan kalau insert gagal
+            tanda_lama[kode] = RIWAYAT_TERSIMPAN.get(kode, 0)
+            RIWAYAT_TERSIMPAN[kode] = now
+            rows.append((
+                scan_date, kode + ".JK", r['analysis']['type'], int(r['analysis']['score']),
+                r['analysis']['verdict'], r['analysis']['reason'], r['plan']['entry'],
+                int(r['plan']['stop_loss']), r['plan']['take_profit']
+            ))
+    if not rows: return 0
+    try:
+        conn = buka_koneksi_db()
+        with conn:
+            conn.executemany("""
+                INSERT INTO scan_results (scan_date, ticker, scanner_type, accuracy_score, ai_verdict, ai_reason, entry_area, stop_loss, take_profit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Simpan Riwayat Gagal: {e}")
+        with RIWAYAT_LOCK:
+            for kode, lama in tanda_lama.items():
+                if RIWAYAT_TERSIMPAN.get(kode) == now: RIWAYAT_TERSIMPAN[kode] = lama
+        return 0
+    return len(rows)
+
+@app.route('/api/scan-history', methods=['GET'])
+def get_scan_history():
+    """
+    Contoh: /api/scan-history?strategy=SWING&min_score=80&sessions=10
+    Menjawab dari index scan_results tanpa menyentuh Yahoo.
+    """
+    strategy = request.args.get('strategy')
+    ticker = request.args.get('ticker')
+    try:
+        min_score = int(request.args.get('min_score', 0))
+        sessions = max(1, min(int(request.args.get('sessions', 10)), 250))
+        limit = max(1, min(int(request.args.get('limit', 500)), 5000))
+    except ValueError:
+        return jsonify({"error": "Parameter angka tidak valid"}), 400
+
+    filters = ["accuracy_score >= ?"]; params = [min_score]
+    if strategy:
+        filters.append("scanner_type = ?"); params.append(strategy.upper())
+    if ticker:
+        filters.append("ticker = ?"); params.append(ticker.upper().replace(".JK", "") + ".JK")
+
+    # N sesi terakhir = N tanggal bursa terakhir yang punya data scan (idx_scan_hari, berhenti setelah N tanggal)
+    where = f"""
+        WHERE scan_date >= COALESCE((
+            SELECT MIN(d) FROM (
+                SELECT DISTINCT substr(scan_date, 1, 10) AS d FROM scan_results ORDER BY d DESC LIMIT ?
+            )
+        ), '')
+        AND {' AND '.join(filters)}
+    """
+    sql = f"""
+        SELECT scan_date, ticker, scanner_type, accuracy_score, ai_verdict, ai_reason, entry_area, stop_loss, take_profit
+        FROM scan_results {where}
+        ORDER BY scan_date DESC, accuracy_score DESC
+        LIMIT ?
+    """
+    # Ringkasan per ticker dihitung dari SEMUA baris yang lolos filter, bukan dari history yang kena LIMIT
+    sql_ringkasan = f"""
+        SELECT ticker, COUNT(*), COUNT(DISTINCT substr(scan_date, 1, 10)), MAX(accuracy_score)
+        FROM scan_results {where}
+        GROUP BY ticker
+    """
+    try:
+        conn = buka_koneksi_db()
+        rows = conn.execute(sql, [sessions] + params + [limit]).fetchall()
+        rows_ringkasan = conn.execute(sql_ringkasan, [sessions] + params).fetchall()
+        conn.close()
+    except Exception as e:
+        return jsonify({"error": f"Database Error: {e}"}), 500
+
+    history = [{
+        "scan_date": r[0], "ticker": r[1].replace(".JK", ""), "type": r[2], "score": r[3],
+        "verdict": r[4], "reason": r[5],
+        "plan": {"entry": r[6], "stop_loss": r[7], "take_profit": r[8]}
+    } for r in rows]
+
+    # Ringkasan per ticker: berapa sesi berbeda lolos filter (untuk pertanyaan tren)
+    summary = sorted(
+        [{"ticker": r[0].replace(".JK", ""), "hits": r[1], "sessions": r[2], "max_score": r[3]} for r in rows_ringkasan],
+        key=lambda x: (x['sessions'], x['max_score']), reverse=True
+    )
+    return jsonify({"sessions": sessions, "summary": summary, "history": history, "truncated": sum(r[1] for r in rows_ringkasan) > len(history)})
+
+muat_security_master()
+
+@app.route('/api/market-breadth', methods=['GET'])
+def get_market_breadth():
+    kondisi = cek_kondisi_market()
+    return jsonify({
+        "condition": kondisi,
+        "source": MARKET_STATUS.get('source', 'IHSG'),
+        "breadth": MARKET_STATUS.get('breadth') if MARKET_STATUS.get('source') == "BREADTH" else None
+    })
+
+def bulat_json(nilai, digit=2):
+    """float/NaN numpy -> angka bulat atau None (jsonify menulis NaN mentah = JSON tidak valid)."""
+    if isinstance(nilai, (float, np.floating)): return round(float(nilai), digit) if np.isfinite(nilai) else None
+    if isinstance(nilai, np.integer): return int(nilai)
+    if isinstance(nilai, np.bool_): return bool(nilai)
+    return nilai
+
+def matriks_json(arr, digit=3):
+    return [[bulat_json(x, digit) for x in baris] for baris in np.asarray(arr, dtype=np.float64)]
+
+@app.route('/api/relative-strength', methods=['GET'])
+def get_relative_strength():
+    """?lookbacks=5,20,60,120&sector=TAMBANG&limit=50 -> ranking RS lintas universe (dan dalam sektor)."""
+    try: lookbacks = [int(x) for x in request.args.get('lookbacks', '').split(',') if x.strip()] or list(LOOKBACK_RS)
+    except ValueError: return jsonify({"error": "lookbacks harus angka, misal 5,20,60"}), 400
+    limit = request.args.get('limit', 100, type=int)
+    sektor = request.args.get('sector', '').upper()
+
+    mat_close = matriks_close_universe()
+    if mat_close.shape[1] < 2: return jsonify({"error": "Universe belum dimuat, jalankan scan dulu", "tickers": 0}), 503
+    tabel = hitung_relative_strength(mat_close, {k: sektor_ticker(k) for k in mat_close.columns}, lookbacks)
+    if sektor: tabel = tabel[tabel['sector'] == sektor]
+
+    return jsonify({
+        "as_of": str(mat_close.index[-1])[:10],
+        "lookbacks": [lb for lb in lookbacks if lb < len(mat_close)],
+        "tickers": len(tabel),
+        "sectors": tabel.groupby('sector')['rs_score'].mean().round(2).sort_values(ascending=False).reset_index()
+                        .rename(columns={'rs_score': 'avg_rs_score'}).to_dict('records'),
+        "partial": int(tabel['partial'].sum()),
+        "ranking": [{"ticker": kode, **{k: (int(v) if k == 'rs_rank' and v == v else bulat_json(v)) for k, v in row.items()}}
+                    for kode, row in tabel.head(limit).to_dict('index').items()]
+    })
+
+@app.route('/api/correlation', methods=['GET'])
+def get_correlation():
+    """
+    ?window=60 -> matriks korelasi return universe.
+    &group=sector -> matriks rata-rata per sektor; &ticker=ANTM&top=10 -> peer paling searah/berlawanan.
+    """
+    window = max(10, min(request.args.get('window', 60, type=int), 250))
+    top = request.args.get('top', 10, type=int)
+    mat_close = matriks_close_universe()
+    korelasi = hitung_korelasi(mat_close, window) if mat_close.shape[1] >= 2 else pd.DataFrame()
+    if korelasi.empty: return jsonify({"error": "Universe belum dimuat, jalankan scan dulu", "tickers": 0}), 503
+    hasil = {"as_of": str(mat_close.index[-1])[:10], "window": window, "tickers": len(korelasi)}
+
+    ticker = request.args.get('ticker', '').upper().replace(".JK", "")
+    if ticker:
+        if ticker not in korelasi: return jsonify({"error": f"{ticker} tidak ada di universe yang dimuat"}), 404
+        peer = korelasi[ticker].drop(ticker).sort_values(ascending=False)
+        hasil.update({
+            "ticker": ticker, "sector": sektor_ticker(ticker),
+            "most_correlated": [{"ticker": k, "corr": round(float(v), 3)} for k, v in peer.head(top).items()],
+            "least_correlated": [{"ticker": k, "corr": round(float(v), 3)} for k, v in peer.tail(top)[::-1].items()]
+        })
+        return jsonify(hasil)
+
+    if request.args.get('group') == 'sector':
+        blok = korelasi_sektor(korelasi, {k: sektor_ticker(k) for k in korelasi.index})
+        # Sektor dengan 1 ticker: korelasi dalam sektor tidak terdefinisi -> null
+        hasil.update({"labels": list(blok.index), "matrix": matriks_json(blok.to_numpy()),
+                      "tickers_per_sector": {k: int(v) for k, v in pd.Series([sektor_ticker(t) for t in korelasi.index]).value_counts().items()}})
+        return jsonify(hasil)
+
+    # Pasangan paling searah (segitiga atas saja, tanpa diagonal)
+    atas = np.triu_indices(len(korelasi), k=1)
+    nilai = korelasi.to_numpy()[atas]
+    urut = np.argsort(nilai)[::-1][:top]
+    hasil.update({
+        "labels": list(korelasi.index),
+        "matrix": matriks_json(korelasi.to_numpy()),
+        "top_pairs": [{"a": korelasi.index[atas[0][i]], "b": korelasi.index[atas[1][i]], "corr": round(float(nilai[i]), 3)} for i in urut]
+    })
+    return jsonify(hasil)
+
+@app.route('/api/debug/upstream', methods=['GET'])
+def get_upstream_status():
+    return jsonify({"yahoo": status_limiter()})
+
+# --- AKUNTANSI MEMORI (PER CACHE & PER TICKER) ---
+def ukuran_obj(obj, dilihat=None):
+    """Estimasi byte sebuah objek (DataFrame/ndarray dihitung buffer-nya, container rekursif)."""
+    dilihat = set() if dilihat is None else dilihat
+    if id(obj) in dilihat: return 0
+    dilihat.add(id(obj))
+    if isinstance(obj, pd.DataFrame): return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series): return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray): return int(obj.nbytes)
+    ukuran = sys.getsizeof(obj)
+    if isinstance(obj, dict): ukuran += sum(ukuran_obj(k, dilihat) + ukuran_obj(v, dilihat) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)): ukuran += sum(ukuran_obj(x, dilihat) for x in list(obj))
+    return ukuran
+
+def baca_rss():
+    """(rss_sekarang, rss_puncak) dalam MB. Linux: /proc + getrusage."""
+    sekarang = puncak = None
+    try:
+        with open("/proc/self/statm") as f: sekarang = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception: pass
+    if resource is not None:
+        puncak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB di Linux
+    return (round(sekarang, 1) if sekarang else None), (round(puncak, 1) if puncak else None)
+
+@app.route('/api/debug/memory', methods=['GET'])
+def get_memory_status():
+    try: top = int(request.args.get('top', 20))
+    except ValueError: top = 20
+    rss, rss_puncak = baca_rss()
+
+    per_ticker = []
+    for ticker, item in list(CACHE_DATA.items()):
+        bars = item.get('bars')
+        per_ticker.append({
+            "ticker": ticker,
+            "bars_rows": len(bars) if bars is not None else 0,
+            "bars_bytes": ukuran_obj(bars) if bars is not None else 0,
+            "data_bytes": ukuran_obj(item.get('data')),
+            # Buffer & cache intraday di-key dengan ticker lengkap (.JK); ticker tanpa intraday = 0 byte
+            "intraday_bytes": sum(ukuran_obj(c[ticker]) for c in (BUFFER_INTRADAY, CACHE_INTRADAY) if ticker in c)
+        })
+    for row in per_ticker: row['total_bytes'] = row['bars_bytes'] + row['data_bytes'] + row['intraday_bytes']
+    per_ticker.sort(key=lambda x: x['total_bytes'], reverse=True)
+
+    caches = {
+        "analysis": CACHE_DATA, "failed": CACHE_GAGAL, "fundamental": CACHE_FUNDA, "sentiment": CACHE_SENTIMEN,
+        "intraday_buffer": BUFFER_INTRADAY, "intraday": CACHE_INTRADAY,
+        "scan_snapshots": SNAPSHOT_SCAN, "snapshot_history": RIWAYAT_SNAPSHOT,
+        "security_master": SECURITY_MASTER
+    }
+    return jsonify({
+        "rss_mb": rss, "peak_rss_mb": rss_puncak,
+        "caches": {nama: {"entries": len(c), "bytes": ukuran_obj(c)} for nama, c in caches.items()},
+        "tickers": per_ticker[:top],
+        "tickers_cached": len(per_ticker)
+    })
+
+# ==========================================
+# 10. MODE INTRADAY (RING BUFFER 1m/5m - SCALPING/BPJS/BSJP)
+# ==========================================
+INTRADAY_MODE = os.getenv("INTRADAY_MODE", "0") == "1"
+INTRADAY_INTERVAL = os.getenv("INTRADAY_INTERVAL", "5m") # "1m" atau "5m"
+INTRADAY_MAX_BAR = int(os.getenv("INTRADAY_MAX_BAR", 240)) # Batas memori per ticker
+INTRADAY_POLL = int(os.getenv("INTRADAY_POLL", 60)) # Detik antar polling
+STRATEGI_INTRADAY = ("SCALPING", "BPJS", "BSJP")
+SESI_INTRADAY = ("SESI1", "SESI2", "PRECLOSING")
+
+BUFFER_INTRADAY = {} # ticker -> deque(maxlen=INTRADAY_MAX_BAR) isi (ts, open, high, low, close, volume)
+CACHE_INTRADAY = {}  # ticker -> {'data': hasil scoring, 'timestamp': ...}
+INTRADAY_STATUS = {"running": False, "last_poll": 0, "tickers_updated": 0, "error": None}
+INTRADAY_LOCK = threading.Lock()
+
+def gabung_bar_intraday(ticker, df):
+    """
+    Masukkan bar baru ke ring buffer. Bar terakhir yang masih berjalan (timestamp sama)
+    ditimpa; bar yang lebih lama diabaikan. Return True kalau ada perubahan.
+    """
+    buf = BUFFER_INTRADAY.get(ticker)
+    if buf is None:
+        buf = BUFFER_INTRADAY[ticker] = deque(maxlen=INTRADAY_MAX_BAR)
+    berubah = False
+    last_ts = buf[-1][0] if buf else 0
+    for ts, row in zip(df.index, df[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False)):
+        ts = int(ts.timestamp())
+        bar = (ts, float(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]))
+        if ts > last_ts:
+            buf.append(bar); last_ts = ts; berubah = True
+        elif ts == last_ts and buf[-1] != bar:
+            buf[-1] = bar; berubah = True
+    return berubah
+
+def tutup_harian_sebelumnya(ticker, buf):
+    """
+    Close hari bursa sebelumnya untuk change_pct intraday. Utamakan bar harian di CACHE_DATA;
+    kalau belum ada, pakai bar intraday terakhir dari tanggal sebelum bar terbaru di buffer.
+    """
+    tz = pytz.timezone('Asia/Jakarta')
+    hari_ini = datetime.fromtimestamp(buf[-1][0], tz).date()
+    harian = CACHE_DATA.get(ticker, {}).get('bars')
+    if harian is not None and not harian.empty:
+        idx = harian.index.tz_convert(tz) if getattr(harian.index, 'tz', None) is not None else harian.index
+        sebelum = harian['Close'][pd.Series(idx.date, index=harian.index) < hari_ini].dropna()
+        if not sebelum.empty: return float(sebelum.iloc[-1])
+    for bar in reversed(buf):
+        if datetime.fromtimestamp(bar[0], tz).date() < hari_ini: return bar[4]
+    return None
+
+def skor_intraday(ticker):
+    buf = BUFFER_INTRADAY.get(ticker)
+    if not buf: return None
+    df = pd.DataFrame(list(buf), columns=['ts', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    # Weekly & info kosong: strategi intraday tidak memakai valuasi
+    data = hitung_skor_multistrategy(ticker, df, pd.DataFrame(), {}, strategi=STRATEGI_INTRADAY)
+    # change_pct dari scoring = perubahan vs bar sebelumnya; klien menampilkannya sebagai perubahan harian
+    data['bar_change_pct'] = data['change_pct']
+    prev_close = tutup_harian_sebelumnya(ticker, buf)
+    data['change_pct'] = round((data['last_price'] - prev_close) / prev_close * 100, 2) if prev_close else 0.0
+    data['interval'] = INTRADAY_INTERVAL
+    data['bars'] = len(buf)
+    return data
+
+def poll_intraday():
+    """
+    Satu siklus: 1x batch download untuk seluruh universe aktif (bukan per ticker),
+    lalu hanya ticker yang bar-nya berubah yang di-scoring ulang.
+    """
+    universe = [k + ".JK" for k in list(WATCHLIST)]
+    if not universe: return 0
+    # Buffer kosong -> seed 5 hari, selanjutnya cukup delta hari ini
+    period = "5d" if any(t not in BUFFER_INTRADAY for t in universe) else "1d"
+    raw = panggil_yahoo(yf.download, universe, period=period, interval=INTRADAY_INTERVAL,
+                      group_by="ticker", progress=False, threads=False, auto_adjust=False)
+    if raw is None or raw.empty: return 0
+
+    diperbarui = 0
+    now = time.time()
+    for ticker in universe:
+        try:
+            df = raw[ticker] if isinstance(raw.columns, pd.MultiIndex) else raw
+            df = df.dropna(subset=['Close'])
+            if df.empty: continue
+            with INTRADAY_LOCK:
+                if not gabung_bar_intraday(ticker, df): continue
+                data = skor_intraday(ticker)
+            if data and data['last_price'] > 0:
+                CACHE_INTRADAY[ticker] = {'data': data, 'timestamp': now}
+                diperbarui += 1
+        except Exception as e:
+            print(f"⚠️ Intraday {ticker} Skip: {e}")
+    return diperbarui
+
+def loop_intraday():
+    while True:
+        try:
+            now = datetime.now(pytz.timezone('Asia/Jakarta'))
+            kode_sesi, _ = get_sesi_pasar(now)
+            if now.weekday() < 5 and kode_sesi in SESI_INTRADAY:
+                INTRADAY_STATUS['tickers_updated'] = poll_intraday()
+                INTRADAY_STATUS['last_poll'] = time.time()
+                INTRADAY_STATUS['error'] = None
+        except Exception as e:
+            INTRADAY_STATUS['error'] = str(e)
+            print(f"⚠️ Intraday Poll Gagal: {e}")
+        time.sleep(INTRADAY_POLL)
+
+def mulai_intraday():
+    with INTRADAY_LOCK:
+        if INTRADAY_STATUS['running']: return
+        INTRADAY_STATUS['running'] = True
+    threading.Thread(target=loop_intraday, name="intraday-poller", daemon=True).start()
+    print(f"⏱️ Mode Intraday aktif ({INTRADAY_INTERVAL}, maks {INTRADAY_MAX_BAR} bar/ticker)")
+
+@app.route('/api/intraday', methods=['GET'])
+def get_intraday_results():
+    target_strategy = request.args.get('strategy', 'ALL')
+    if INTRADAY_MODE: mulai_intraday()
+
+    results = []
+    for ticker, item in list(CACHE_INTRADAY.items()):
+        data = item['data']
+        if target_strategy in STRATEGI_INTRADAY and data['type'] != target_strategy: continue
+        row = format_baris_scan(ticker.replace(".JK", ""), data)
+        row['interval'] = data['interval']
+        row['updated_at'] = int(item['timestamp'])
+        results.append(row)
+    results.sort(key=lambda x: x['analysis']['score'], reverse=True)
+    return jsonify({
+        "mode": "ON" if INTRADAY_STATUS['running'] else "OFF",
+        "interval": INTRADAY_INTERVAL,
+        "last_poll": int(INTRADAY_STATUS['last_poll']),
+        "error": INTRADAY_STATUS['error'],
+        "results": results
+    })
+
+# ==========================================
+# 11. SENTIMEN BERITA BATCH (TOP-N SCAN, 1x PANGGILAN AI)
+# ==========================================
+SENTIMEN_TOP_N = int(os.getenv("SENTIMEN_TOP_N", 10))
+SENTIMEN_TIMEOUT = 3600 # Sentimen berita tidak perlu dihitung ulang tiap 5 menit
+SENTIMEN_BUDGET = float(os.getenv("SENTIMEN_BUDGET", 15)) # Detik maksimal sentimen batch di dalam request scan
+CACHE_SENTIMEN = {} # kode -> {'data': {...} | None (tidak ada berita), 'timestamp': ...}
+SENTIMEN_TERBANG = set() # Ticker yang sedang dinilai batch lain (poll paralel tidak ikut memanggil AI)
+SENTIMEN_LOCK = threading.Lock()
+
+def sentimen_segar(kode):
+    item = CACHE_SENTIMEN.get(kode)
+    return bool(item) and time.time() - item['timestamp'] < SENTIMEN_TIMEOUT
+
+def sentimen_cache(kode):
+    return CACHE_SENTIMEN[kode]['data'] if sentimen_segar(kode) else None
+
+def analisa_sentimen_batch(kodes):
+    """
+    Klasifikasi sentimen berita banyak ticker dalam SATU request AI (output JSON).
+    Headline diambil paralel (lewat pembatas Yahoo), hasil disimpan ke news_sentiment.
+    Ticker tanpa berita dicache negatif (TTL sama) agar tidak diambil ulang tiap polling.
+    """
+    with SENTIMEN_LOCK:
+        kodes = [k for k in dict.fromkeys(kodes) if not sentimen_segar(k) and k not in SENTIMEN_TERBANG]
+        SENTIMEN_TERBANG.update(kodes)
+    if not kodes: return 0
+    try: return nilai_sentimen_batch(kodes)
+    finally:
+        with SENTIMEN_LOCK: SENTIMEN_TERBANG.difference_update(kodes)
+
+def nilai_sentimen_batch(kodes):
+    berita = {}
+    # Tanpa `with`: pengambilan yang lewat tenggat tidak ditunggu saat executor ditutup.
+    # Berita maksimal separuh tenggat: sisanya untuk AI menilai headline yang sudah terkumpul.
+    sisa = sisa_waktu()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=SCAN_IO_WORKER)
+    try:
+        futures = {executor.submit(ambil_berita_saham, k + ".JK"): k for k in kodes}
+        batas_berita = None if sisa is None else sisa / 2
+        for future in concurrent.futures.as_completed(futures, timeout=batas_berita):
+            kode = futures[future]
+            try: daftar = future.result()
+            except Exception: continue # Gagal ambil != tidak ada berita: dicoba lagi polling berikutnya
+            # Item "System" = placeholder (tidak ada berita asli)
+            daftar = [b for b in daftar if b.get('publisher') != "System"]
+            if daftar: berita[kode] = daftar[:5]
+            else: CACHE_SENTIMEN[kode] = {'data': None, 'timestamp': time.time()}
+    except concurrent.futures.TimeoutError:
+        print("⏱️ Berita sentimen melewati tenggat: ticker yang tertinggal dinilai polling berikutnya")
+    finally: executor.shutdown(wait=False, cancel_futures=True)
+    if not berita: return 0
+
+    blok = "\n".join(
+        f"[{kode}]\n" + "\n".join(f"- {b['title']}" for b in daftar) for kode, daftar in berita.items()
+    )
+    prompt = f"""Kamu analis sentimen pasar modal Indonesia (IDX).
+Nilai sentimen headline berita tiap saham di bawah terhadap harga sahamnya dalam 1-5 hari ke depan.
+
+{blok}
+
+Balas HANYA JSON dengan format:
+{{"hasil": [{{"ticker": "KODE", "sentiment": "POSITIF|NETRAL|NEGATIF", "impact": 1-10, "alasan": "maks 12 kata"}}]}}
+Satu entri untuk setiap ticker di atas."""
+
+    jawaban = panggil_ai_failover(prompt, json_mode=True)
+    if not jawaban: return 0
+    try:
+        teks = jawaban.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+        hasil = json.loads(teks).get('hasil', [])
+    except Exception as e:
+        print(f"⚠️ JSON Sentimen Tidak Valid: {e}")
+        return 0
+
+    now = time.time(); rows = []
+    for h in hasil:
+        kode = str(h.get('ticker', '')).upper().replace(".JK", "")
+        if kode not in berita: continue
+        sentimen = str(h.get('sentiment', 'NETRAL')).upper()
+        if sentimen not in ("POSITIF", "NETRAL", "NEGATIF"): sentimen = "NETRAL"
+        try: impact = max(1, min(10, int(h.get('impact', 5))))
+        except (TypeError, ValueError): impact = 5
+        data = {"label": sentimen, "impact": impact, "reason": str(h.get('alasan', ''))[:120],
+                "headline": berita[kode][0]['title'], "as_of": int(now)}
+        CACHE_SENTIMEN[kode] = {'data': data, 'timestamp': now}
+        rows.append((kode + ".JK", berita[kode][0]['title'], "SCAN_BATCH", sentimen, str(impact), berita[kode][0].get('link', '')))
+
+    if rows:
+        try:
+            conn = buka_koneksi_db()
+            with conn:
+                conn.executemany("""
+                    INSERT INTO news_sentiment (ticker, title, category, ai_sentiment, impact_score, url_link)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+            conn.close()
+        except Exception as e: print(f"⚠️ Simpan Sentimen Gagal: {e}")
+    print(f"📰 Sentimen batch: {len(rows)} ticker dalam 1 panggilan AI")
+    return len(rows)
+
+# ==========================================
+# 12. MESIN ALERT INKREMENTAL (ATURAN USER -> PREDIKAT VEKTOR)
+# ==========================================
+# Hasil scoring tiap ticker disalin ke TABEL_INDIKATOR: satu numpy array per kolom
+# (baris = ticker) + salinan nilai sebelumnya untuk deteksi "crosses" / "becomes".
+# Aturan teks ("rsi < 30 and rvol > 2", "price crosses_above fibo_618",
+# "verdict becomes STRONG BUY") dikompilasi SEKALI jadi fungsi numpy. Tiap refresh,
+# hanya baris ticker yang nilainya berubah yang dievaluasi; klausa yang sama dipakai
+# banyak aturan dihitung sekali per refresh. Alert bersifat edge-trigger: event keluar
+# saat aturan berubah dari salah -> benar untuk ticker tsb.
+KOLOM_ANGKA = ["score", "last_price", "change_pct", "support", "stop_loss", "target_price", "as_of",
+               "rsi", "rvol", "stoch_k", "stoch_d", "adx", "cmf", "atr", "macd_hist", "bb_bandwidth",
+               "sma_20", "sma_50", "sma_200", "vwap", "volume", "fibo_382", "fibo_500", "fibo_618"]
+KOLOM_TEKS = ["verdict", "type", "sector"]
+# Kolom metadata: disimpan untuk screener/snapshot tapi TIDAK ikut deteksi perubahan
+# (as_of berganti tiap refresh, kalau ikut dibandingkan semua ticker selalu "berubah")
+KOLOM_META = {"as_of"}
+ALIAS_KOLOM = {"price": "last_price", "harga": "last_price", "close": "last_price", "change": "change_pct",
+               "ma20": "sma_20", "ma50": "sma_50", "ma200": "sma_200", "sma20": "sma_20", "sma50": "sma_50", "sma200": "sma_200",
+               "fib_618": "fibo_618", "fib_500": "fibo_500", "fib_382": "fibo_382"}
+OPERATOR_BANDING = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+                    "==": np.equal, "!=": np.not_equal}
+ALERT_MAKS_ATURAN = int(os.getenv("ALERT_MAKS_ATURAN", 5000))
+ALERT_MAKS_EVENT = 1000
+
+TABEL_INDIKATOR = {
+    "tickers": [], "index": {},
+    "kolom": {k: np.empty(0) for k in KOLOM_ANGKA + KOLOM_TEKS},
+    "prev": {k: np.empty(0) for k in KOLOM_ANGKA + KOLOM_TEKS},
+    "versi": 0
+}
+ATURAN_ALERT = {}  # id -> {"id", "rule", "clauses", "tickers", "created", "fungsi"}
+STATUS_ALERT = {}  # id aturan -> bool array per baris TABEL_INDIKATOR: kondisi sedang TRUE (edge-trigger)
+ANTRIAN_ALERT = deque(maxlen=ALERT_MAKS_EVENT)
+ALERT_SEQ = {"aturan": 0, "event": 0, "last_eval_ms": 0.0, "last_eval_rows": 0}
+ALERT_LOCK = threading.RLock()
+
+def nilai_baris_alert(kode, data):
+    ind = data.get('indicators') or {}
+    baris = {k: data.get(k, ind.get(k)) for k in KOLOM_ANGKA}
+    baris.update({"verdict": data.get('verdict', ''), "type": data.get('type', ''), "sector": sektor_ticker(kode)})
+    return baris
+
+def perbarui_tabel_indikator(hasil):
+    """
+    hasil: dict ticker -> data scoring. Return array index baris yang nilainya berubah.
+    Ticker baru -> array diperpanjang (jarang); ticker lama -> update in-place.
+    """
+    tabel = TABEL_INDIKATOR
+    berubah = []
+    with ALERT_LOCK:
+        baru = [t.replace(".JK", "") for t in hasil if t.replace(".JK", "") not in tabel['index']]
+        if baru:
+            for kode in baru:
+                tabel['index'][kode] = len(tabel['tickers']); tabel['tickers'].append(kode)
+            for nama in KOLOM_ANGKA + KOLOM_TEKS:
+                isi = np.full(len(baru), np.nan) if nama in KOLOM_ANGKA else np.full(len(baru), "", dtype=object)
+                tabel['kolom'][nama] = np.concatenate([tabel['kolom'][nama], isi])
+                tabel['prev'][nama] = np.concatenate([tabel['prev'][nama], isi.copy()])
+            for id_aturan, aktif in STATUS_ALERT.items():
+                STATUS_ALERT[id_aturan] = np.concatenate([aktif, np.zeros(len(baru), dtype=bool)])
+
+        for ticker, data in hasil.items():
+            if not data or data.get('verdict') in ("ERROR", "SKIP"): continue
+            kode = ticker.replace(".JK", ""); i = tabel['index'][kode]
+            baris = nilai_baris_alert(kode, data)
+            sama = True
+            for nama, nilai in baris.items():
+                if nama in KOLOM_META: continue
+                lama = tabel['kolom'][nama][i]
+                if nama in KOLOM_ANGKA:
+                    nilai = np.nan if nilai is None else float(nilai)
+                    if lama == nilai or (np.isnan(lama) and np.isnan(nilai)): continue
+                elif lama == nilai: continue
+                sama = False
+            for nama in KOLOM_META: tabel['kolom'][nama][i] = np.nan if baris[nama] is None else float(baris[nama])
+            if sama: continue
+            for nama, nilai in baris.items():
+                if nama in KOLOM_META: continue
+                tabel['prev'][nama][i] = tabel['kolom'][nama][i]
+                tabel['kolom'][nama][i] = (np.nan if nilai is None else float(nilai)) if nama in KOLOM_ANGKA else nilai
+            berubah.append(i)
+        if berubah: tabel['versi'] += 1
+    return np.array(sorted(berubah), dtype=np.intp)
+
+# --- KOMPILER ATURAN ---
+# Grammar: aturan := klausa (("and" | "or") klausa)*   ("and" lebih kuat dari "or")
+#          klausa := kolom OP (angka | kolom)
+#                  | kolom ("crosses" | "crosses_above" | "crosses_below") (angka | kolom)
+#                  | ("verdict" | "type" | "sector") ("==" | "!=" | "becomes") TEKS
+class AturanTidakValid(ValueError): pass
+
+def nama_kolom(token):
+    token = ALIAS_KOLOM.get(token.lower(), token.lower())
+    return token if token in KOLOM_ANGKA or token in KOLOM_TEKS else None
+
+def operand_angka(token):
+    """Angka -> konstanta; nama kolom -> ambil kolom (sekarang / sebelumnya)."""
+    kolom = nama_kolom(token)
+    if kolom in KOLOM_ANGKA: return lambda t, idx, prev=False: (t['prev'] if prev else t['kolom'])[kolom][idx]
+    try: angka = float(token)
+    except ValueError: raise AturanTidakValid(f"'{token}' bukan angka atau kolom indikator")
+    return lambda t, idx, prev=False: angka
+
+def kompilasi_klausa(teks):
+    bagian = teks.split()
+    if len(bagian) < 3: raise AturanTidakValid(f"Klausa tidak lengkap: '{teks}'")
+    kiri, op, kanan = bagian[0], bagian[1].lower(), " ".join(bagian[2:])
+    kolom = nama_kolom(kiri)
+    if kolom is None: raise AturanTidakValid(f"Kolom '{kiri}' tidak dikenal. Tersedia: {', '.join(KOLOM_ANGKA + KOLOM_TEKS)}")
+
+    if kolom in KOLOM_TEKS:
+        target = kanan.strip("'\"").upper()
+        # Verdict berakhiran emoji ("STRONG BUY 🔥") -> cocokkan awalan; "BUY" tidak ikut "STRONG BUY"
+        cocok = lambda arr: np.array([str(v).upper().startswith(target) for v in arr], dtype=bool) if kolom == "verdict" else (arr == target)
+        if op in ("==", "is"): return lambda t, idx: cocok(t['kolom'][kolom][idx])
+        if op == "!=": return lambda t, idx: ~cocok(t['kolom'][kolom][idx])
+        if op == "becomes": return lambda t, idx: cocok(t['kolom'][kolom][idx]) & ~cocok(t['prev'][kolom][idx])
+        raise AturanTidakValid(f"Operator '{op}' tidak berlaku untuk {kolom} (pakai ==, != atau becomes)")
+
+    a = operand_angka(kiri); b = operand_angka(kanan)
+    if op in OPERATOR_BANDING:
+        fungsi = OPERATOR_BANDING[op]
+        return lambda t, idx: fungsi(a(t, idx), b(t, idx))
+    if op in ("crosses_above", "crosses_below", "crosses"):
+        def silang(t, idx):
+            atas_kini = a(t, idx) > b(t, idx); atas_lalu = a(t, idx, True) > b(t, idx, True)
+            # Baris yang belum punya nilai sebelumnya tidak dihitung menyilang
+            ada_lalu = ~np.isnan(np.asarray(a(t, idx, True) - b(t, idx, True), dtype=float))
+            if op == "crosses_above": return ada_lalu & atas_kini & ~atas_lalu
+            if op == "crosses_below": return ada_lalu & ~atas_kini & atas_lalu
+            return ada_lalu & (atas_kini != atas_lalu)
+        return silang
+    raise AturanTidakValid(f"Operator '{op}' tidak dikenal")
+
+def kompilasi_aturan(teks):
+    """Return (fungsi(tabel, idx, memo) -> bool array, daftar klausa ter-normalisasi)."""
+    if not teks or not teks.strip(): raise AturanTidakValid("Aturan kosong")
+    grup_or = []
+    for bagian_or in re.split(r"\s+or\s+", teks.strip(), flags=re.IGNORECASE):
+        klausa = [" ".join(k.split()) for k in re.split(r"\s+and\s+", bagian_or, flags=re.IGNORECASE)]
+        grup_or.append([(k.lower(), kompilasi_klausa(k)) for k in klausa])
+
+    def evaluasi(tabel, idx, memo=None):
+        memo = {} if memo is None else memo
+        hasil = np.zeros(len(idx), dtype=bool)
+        for grup in grup_or:
+            mask = np.ones(len(idx), dtype=bool)
+            for kunci, fungsi in grup:
+                # Klausa identik di aturan lain (misal "rsi < 30") cukup dihitung sekali per evaluasi
+                if kunci not in memo: memo[kunci] = np.asarray(fungsi(tabel, idx), dtype=bool)
+                mask &= memo[kunci]
+                if not mask.any(): break
+            hasil |= mask
+        return hasil
+    return evaluasi, [k for grup in grup_or for k, _ in grup]
+
+def baris_cakupan(aturan, tabel):
+    """Index baris untuk aturan yang dibatasi ke ticker tertentu (None = semua)."""
+    if not aturan['tickers']: return None
+    return np.array([tabel['index'][k] for k in aturan['tickers'] if k in tabel['index']], dtype=np.intp)
+
+def evaluasi_alert(idx_berubah):
+    """Evaluasi semua aturan hanya untuk baris yang berubah; event baru masuk ANTRIAN_ALERT."""
+    if len(idx_berubah) == 0: return 0
+    t0 = time.perf_counter(); jumlah = 0
+    with ALERT_LOCK:
+        tabel = TABEL_INDIKATOR
+        kolom = tabel['kolom']
+        memo = {}
+        for aturan in list(ATURAN_ALERT.values()):
+            cakupan = baris_cakupan(aturan, tabel)
+            if cakupan is None:
+                idx = idx_berubah
+                mask = aturan['fungsi'](tabel, idx, memo)
+            else:
+                idx = idx_berubah[np.isin(idx_berubah, cakupan)]
+                if not len(idx): continue
+                mask = aturan['fungsi'](tabel, idx)
+            # Edge-trigger vektor: event hanya untuk baris yang barusan berubah salah -> benar
+            aktif = STATUS_ALERT[aturan['id']]
+            baru = idx[mask & ~aktif[idx]]
+            aktif[idx] = mask
+            for i in baru:
+                ALERT_SEQ['event'] += 1; jumlah += 1
+                ANTRIAN_ALERT.append({
+                    "seq": ALERT_SEQ['event'], "rule_id": aturan['id'], "rule": aturan['rule'], "ticker": tabel['tickers'][i],
+                    "price": None if np.isnan(kolom['last_price'][i]) else float(kolom['last_price'][i]),
+                    "verdict": kolom['verdict'][i], "score": None if np.isnan(kolom['score'][i]) else int(kolom['score'][i]),
+                    "fired_at": int(time.time())
+                })
+        ALERT_SEQ['last_eval_ms'] = round((time.perf_counter() - t0) * 1000, 3)
+        ALERT_SEQ['last_eval_rows'] = len(idx_berubah)
+    if jumlah: print(f"🔔 {jumlah} alert baru ({len(ATURAN_ALERT)} aturan x {len(idx_berubah)} ticker, {ALERT_SEQ['last_eval_ms']} ms)")
+    return jumlah
+
+def proses_alert(hasil):
+    """Dipanggil setiap refresh analisa harian (scan maupun refresh SWR di latar)."""
+    try: return evaluasi_alert(perbarui_tabel_indikator(hasil))
+    except Exception as e:
+        print(f"⚠️ Alert Gagal: {e}")
+        return 0
+
+def cocok_sekarang(id_aturan):
+    aktif = STATUS_ALERT.get(id_aturan)
+    if aktif is None: return []
+    return sorted(TABEL_INDIKATOR['tickers'][i] for i in np.flatnonzero(aktif))
+
+@app.route('/api/alerts/rules', methods=['GET', 'POST'])
+def kelola_aturan_alert():
+    if request.method == 'GET':
+        with ALERT_LOCK:
+            rules = [{"id": a['id'], "rule": a['rule'], "clauses": a['clauses'], "created": a['created'],
+                      "tickers": sorted(a['tickers']) if a['tickers'] else None,
+                      "matching_now": cocok_sekarang(a['id'])} for a in ATURAN_ALERT.values()]
+        return jsonify({"rules": rules, "count": len(rules)})
+    body = request.get_json(silent=True) or {}
+    teks = body.get('rule') or request.args.get('rule', '')
+    tickers = body.get('tickers') or [t for t in request.args.get('tickers', '').split(',') if t]
+    if len(ATURAN_ALERT) >= ALERT_MAKS_ATURAN: return jsonify({"error": f"Maksimal {ALERT_MAKS_ATURAN} aturan"}), 429
+    try: fungsi, klausa = kompilasi_aturan(teks)
+    except AturanTidakValid as e: return jsonify({"error": str(e)}), 400
+
+    with ALERT_LOCK:
+        ALERT_SEQ['aturan'] += 1
+        aturan = {"id": ALERT_SEQ['aturan'], "rule": teks.strip(), "clauses": klausa,
+                  "tickers": {t.upper().replace(".JK", "") for t in tickers} or None,
+                  "created": int(time.time()), "fungsi": fungsi}
+        ATURAN_ALERT[aturan['id']] = aturan
+        # Kondisi yang SUDAH benar saat aturan dibuat tidak dianggap event baru
+        tabel = TABEL_INDIKATOR
+        aktif = STATUS_ALERT[aturan['id']] = np.zeros(len(tabel['tickers']), dtype=bool)
+        idx = np.arange(len(tabel['tickers'])) if aturan['tickers'] is None else baris_cakupan(aturan, tabel)
+        if len(idx): aktif[idx] = fungsi(tabel, idx)
+    return jsonify({"message": "Success", "id": aturan['id'], "clauses": klausa,
+                    "matching_now": cocok_sekarang(aturan['id'])}), 201
+
+@app.route('/api/alerts/rules/<int:id_aturan>', methods=['DELETE'])
+def hapus_aturan_alert(id_aturan):
+    with ALERT_LOCK:
+        if ATURAN_ALERT.pop(id_aturan, None) is None: return jsonify({"error": "Aturan tidak ditemukan"}), 404
+        STATUS_ALERT.pop(id_aturan, None)
+    return jsonify({"message": "Success"})
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """Polling event: /api/alerts?since=<seq>&limit=100 (seq terakhir yang sudah diterima klien)."""
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    with ALERT_LOCK:
+        events = [e for e in ANTRIAN_ALERT if e['seq'] > since][:limit]
+        return jsonify({
+            "events": events, "last_seq": ALERT_SEQ['event'],
+            "rules": len(ATURAN_ALERT), "tickers_tracked": len(TABEL_INDIKATOR['tickers']),
+            "last_eval_ms": ALERT_SEQ['last_eval_ms'], "last_eval_rows": ALERT_SEQ['last_eval_rows']
+        })
+
+# ==========================================
+# 13. SCREENER AD-HOC (QUERY DI ATAS TABEL_INDIKATOR)
+# ==========================================
+# /api/screen?q=rsi<35,rvol>1.5,sector=BANK&sort=-cmf&limit=20
+# Filter dipisah koma (= AND) atau pakai and/or; kompilator sama dengan mesin alert.
+# Tidak ada panggilan Yahoo / hitung ulang: murni operasi numpy di tabel kolom.
+KOLOM_SCREEN_DEFAULT = ["score", "verdict", "type", "last_price", "change_pct", "rsi", "rvol", "adx", "cmf", "sector"]
+CACHE_QUERY_SCREEN = {} # teks query ter-normalisasi -> fungsi terkompilasi
+SCREEN_MAKS_CACHE = 256
+
+def normalisasi_filter(teks):
+    """'rsi<35,sector=BANK' -> 'rsi < 35 and sector == BANK' (format klausa kompilasi_aturan)."""
+    bagian = []
+    for f in teks.split(","):
+        f = re.sub(r"\s*(<=|>=|!=|==|<|>|=)\s*", lambda m: f" {'==' if m.group(1) == '=' else m.group(1)} ", f.strip())
+        if f: bagian.append(f)
+    return " and ".join(bagian)
+
+def kompilasi_screen(teks):
+    kunci = normalisasi_filter(teks)
+    fungsi = CACHE_QUERY_SCREEN.get(kunci)
+    if fungsi is None:
+        fungsi, _ = kompilasi_aturan(kunci)
+        if len(CACHE_QUERY_SCREEN) >= SCREEN_MAKS_CACHE: CACHE_QUERY_SCREEN.clear()
+        CACHE_QUERY_SCREEN[kunci] = fungsi
+    return kunci, fungsi
+
+def nilai_json(nilai):
+    if isinstance(nilai, (float, np.floating)): return None if np.isnan(nilai) else round(float(nilai), 4)
+    return nilai
+
+@app.route('/api/screen', methods=['GET'])
+def get_screen():
+    t0 = time.perf_counter()
+    q = request.args.get('q', '')
+    urut = request.args.get('sort', '-score')
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or KOLOM_SCREEN_DEFAULT
+
+    kolom_urut = nama_kolom(urut.lstrip('-+'))
+    if kolom_urut not in KOLOM_ANGKA: return jsonify({"error": f"Kolom sort '{urut}' tidak dikenal. Tersedia: {', '.join(KOLOM_ANGKA)}"}), 400
+    fields = [nama_kolom(f) or f for f in fields]
+    asing = [f for f in fields if f not in KOLOM_ANGKA and f not in KOLOM_TEKS]
+    if asing: return jsonify({"error": f"Field tidak dikenal: {', '.join(asing)}"}), 400
+
+    with ALERT_LOCK:
+        tabel = TABEL_INDIKATOR
+        idx = np.flatnonzero(~np.isnan(tabel['kolom']['last_price']))
+        query = ""
+        if q.strip():
+            try: query, fungsi = kompilasi_screen(q)
+            except AturanTidakValid as e: return jsonify({"error": str(e)}), 400
+            idx = idx[fungsi(tabel, idx)]
+        nilai = tabel['kolom'][kolom_urut][idx]
+        # NaN selalu di belakang, apapun arah sort-nya
+        urutan = np.lexsort(((-nilai if urut.startswith('-') else nilai), np.isnan(nilai)))
+        pilih = idx[urutan[:limit]]
+        baris = [{"ticker": tabel['tickers'][i], **{f: nilai_json(tabel['kolom'][f][i]) for f in fields}} for i in pilih]
+        total_universe = len(tabel['tickers'])
+
+    return jsonify({
+        "query": query, "sort": urut, "matched": int(len(idx)), "universe": total_universe,
+        "results": baris, "took_ms": round((time.perf_counter() - t0) * 1000, 3)
+    })
+
+# ==========================================
+# 14. INDEKS LEVEL SUPPORT / RESISTANCE (SORTED ARRAY + SEARCHSORTED)
+# ==========================================
+# Level per ticker (fibo, fractal, pivot, MA, BB bawah, VWAP, support chandelier) dihitung
+# sekali saat scoring lalu disimpan. Semua (ticker, level) diratakan ke array yang diurutkan
+# berdasarkan jarak ke harga terakhir (% dan kelipatan ATR). "Saham mana yang sedang dalam
+# X% / N ATR dari support" = 2x searchsorted, bukan scan ulang universe.
+# Jarak positif = level di BAWAH harga (support), negatif = di ATAS harga (resistance).
+LEVEL_SAHAM = {}  # kode -> {"price", "atr", "levels": {nama: harga}, "as_of"}
+INDEKS_LEVEL = {"dirty": True, "pct": np.empty(0), "urut_pct": np.empty(0, dtype=np.intp),
+                "atr": np.empty(0), "urut_atr": np.empty(0, dtype=np.intp),
+                "kode": np.empty(0, dtype=object), "nama": np.empty(0, dtype=object), "harga": np.empty(0)}
+LEVEL_LOCK = threading.Lock()
+
+def perbarui_level_saham(hasil):
+    with LEVEL_LOCK:
+        for ticker, data in hasil.items():
+            if not data or not data.get('levels') or not data.get('last_price'): continue
+            levels = dict(data['levels'])
+            if data.get('support'): levels['support_scan'] = float(data['support'])
+            LEVEL_SAHAM[ticker.replace(".JK", "")] = {
+                "price": float(data['last_price']), "atr": (data.get('indicators') or {}).get('atr'),
+                "levels": levels, "as_of": data.get('as_of')
+            }
+        INDEKS_LEVEL['dirty'] = True
+
+def bangun_indeks_level():
+    """Ratakan LEVEL_SAHAM ke array lalu urutkan (dipanggil lazy saat query kalau ada perubahan)."""
+    kode = []; nama = []; harga = []; price = []; atr = []
+    for k, item in list(LEVEL_SAHAM.items()):
+        for n, h in item['levels'].items():
+            kode.append(k); nama.append(n); harga.append(h); price.append(item['price']); atr.append(item['atr'] or np.nan)
+    harga = np.array(harga, dtype=np.float64); price = np.array(price, dtype=np.float64); atr = np.array(atr, dtype=np.float64)
+    pct = (price - harga) / price * 100
+    jarak_atr = (price - harga) / np.where(atr > 0, atr, np.nan)
+    INDEKS_LEVEL.update({
+        "kode": np.array(kode, dtype=object), "nama": np.array(nama, dtype=object), "harga": harga,
+        "pct": pct, "urut_pct": np.argsort(pct, kind="stable"),
+        "atr": jarak_atr, "urut_atr": np.argsort(jarak_atr, kind="stable"), # NaN di ujung
+        "dirty": False
+    })
+
+def cari_level_dekat(sisi="support", pct=None, atr=None):
+    """Return index entri yang jaraknya dalam rentang [0, X] (support) atau [-X, 0] (resistance)."""
+    with LEVEL_LOCK:
+        if INDEKS_LEVEL['dirty']: bangun_indeks_level()
+        idx = INDEKS_LEVEL
+        kunci, batas = ("atr", atr) if atr is not None else ("pct", pct)
+        nilai = idx[kunci]; urut = idx[f"urut_{kunci}"]
+        terurut = nilai[urut]
+        bawah, atas = (0.0, batas) if sisi == "support" else (-batas, 0.0)
+        a = np.searchsorted(terurut, bawah, side="left")
+        b = np.searchsorted(terurut, atas, side="right")
+        return urut[a:b], dict(idx)
+
+@app.route('/api/levels', methods=['GET'])
+def get_levels():
+    """Semua level S/R satu ticker: /api/levels?ticker=BBRI (urut dari harga tertinggi)."""
+    kode = request.args.get('ticker', '').upper().replace(".JK", "")
+    item = LEVEL_SAHAM.get(kode)
+    if not item: return jsonify({"error": f"Level {kode} belum ada, scan/analisa dulu"}), 404
+    price = item['price']
+    return jsonify({
+        "ticker": kode, "price": price, "atr": item['atr'], "as_of": item['as_of'],
+        "levels": [{"name": n, "price": h, "side": "support" if h < price else "resistance",
+                    "distance_pct": round((price - h) / price * 100, 2)}
+                   for n, h in sorted(item['levels'].items(), key=lambda x: -x[1])]
+    })
+
+@app.route('/api/levels/near', methods=['GET'])
+def get_levels_near():
+    """
+    /api/levels/near?side=support&pct=2            -> level dalam 2% di bawah harga
+    /api/levels/near?side=resistance&atr=1&level=fibo -> level dalam 1 ATR di atas harga, nama diawali 'fibo'
+    Opsional: &sector=BANK&limit=50. Satu ticker tampil sekali (level terdekat) + daftar level lain yang kena.
+    """
+    sisi = request.args.get('side', 'support').lower()
+    if sisi not in ("support", "resistance"): return jsonify({"error": "side harus support atau resistance"}), 400
+    pct = request.args.get('pct', type=float); atr = request.args.get('atr', type=float)
+    if pct is None and atr is None: pct = 2.0
+    filter_level = request.args.get('level', '').lower()
+    sektor = request.args.get('sector', '').upper()
+    limit = request.args.get('limit', 50, type=int)
+
+    posisi, idx = cari_level_dekat(sisi, pct=pct, atr=atr)
+    jarak = idx['atr'] if atr is not None else idx['pct']
+    per_ticker = {}
+    for i in posisi[np.argsort(np.abs(jarak[posisi]), kind="stable")]:
+        kode = idx['kode'][i]; nama = idx['nama'][i]
+        if filter_level and not nama.startswith(filter_level): continue
+        if sektor and sektor_ticker(kode) != sektor: continue
+        entri = {"name": nama, "price": float(idx['harga'][i]), "distance_pct": round(float(idx['pct'][i]), 2),
+                 "distance_atr": None if np.isnan(idx['atr'][i]) else round(float(idx['atr'][i]), 2)}
+        if kode not in per_ticker:
+            item = LEVEL_SAHAM.get(kode, {})
+            per_ticker[kode] = {"ticker": kode, "price": item.get('price'), "sector": sektor_ticker(kode), "nearest": entri, "levels": []}
+        per_ticker[kode]['levels'].append(entri)
+
+    hasil = list(per_ticker.values())[:limit]
+    return jsonify({"side": sisi, "within": {"pct": pct} if atr is None else {"atr": atr},
+                    "matched": len(per_ticker), "tickers_indexed": len(LEVEL_SAHAM), "results": hasil})
+
+# ==========================================
+# 15. PRODUKSI: WARM-UP CACHE & HEALTH CHECK
+# ==========================================
+# Dipanggil sekali per worker (gunicorn post_worker_init / __main__) di thread latar:
+# request pertama tidak menanggung cold start (~60 ticker Yahoo + scoring batch).
+WARMUP_AKTIF = os.getenv("WARMUP", "1") == "1"
+WARMUP_STRATEGI = [s.strip().upper() for s in os.getenv("WARMUP_STRATEGY", "ALL,SYARIAH,LQ45").split(",") if s.strip()]
+STATUS_WARMUP = {"state": "IDLE", "started_at": 0, "finished_at": 0, "duration": None, "strategies": {}, "error": None}
+WARMUP_LOCK = threading.Lock()
+
+def hangatkan_cache():
+    """Isi cache market, analisa & snapshot scan untuk strategi populer. Aman dipanggil berulang (sekali jalan)."""
+    with WARMUP_LOCK:
+        if STATUS_WARMUP['state'] in ("RUNNING", "DONE"): return STATUS_WARMUP
+        STATUS_WARMUP['state'] = "RUNNING"
+        STATUS_WARMUP['started_at'] = time.time()
+    mulai = time.perf_counter()
+    try:
+        cek_kondisi_market()
+        for strategi in WARMUP_STRATEGI:
+            t0 = time.perf_counter()
+            snap = hitung_snapshot_scan(strategi)
+            STATUS_WARMUP['strategies'][strategi] = {"rows": len(snap['results']), "version": snap['versi'],
+                                                     "seconds": round(time.perf_counter() - t0, 2)}
+        if INTRADAY_MODE: mulai_intraday()
+        jadwalkan_tulis_snapshot(paksa=True)
+        STATUS_WARMUP['state'] = "DONE"
+        print(f"🔥 Warm-up selesai dalam {time.perf_counter() - mulai:.1f} detik ({', '.join(WARMUP_STRATEGI)})")
+    except Exception as e:
+        STATUS_WARMUP['state'] = "FAILED"
+        STATUS_WARMUP['error'] = str(e)
+        print(f"⚠️ Warm-up Gagal: {e}")
+    STATUS_WARMUP['finished_at'] = time.time()
+    STATUS_WARMUP['duration'] = round(time.perf_counter() - mulai, 2)
+    return STATUS_WARMUP
+
+def mulai_warmup():
+    # Migrasi index riwayat di startup worker (bukan saat import: kalibrasi_skor / uji_beban
+    # yang mengimpor server tidak boleh menulis ke database)
+    siapkan_index_riwayat()
+    # Snapshot disk dulu (milidetik): scan & screen langsung terlayani sebelum warm-up Yahoo selesai
+    muat_snapshot_indikator()
+    if not WARMUP_AKTIF: return
+    threading.Thread(target=hangatkan_cache, name="cache-warmup", daemon=True).start()
+
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    """Readiness untuk load balancer / uji beban: 200 setelah warm-up selesai, 503 selama masih memanaskan cache."""
+    siap = not WARMUP_AKTIF or STATUS_WARMUP['state'] in ("DONE", "FAILED")
+    return jsonify({
+        "status": "ready" if siap else "warming",
+        "pid": os.getpid(),
+        "warmup": STATUS_WARMUP,
+        "cache": {"analysis": len(CACHE_DATA), "fundamental": len(CACHE_FUNDA), "snapshots": len(SNAPSHOT_SCAN)},
+        "yahoo": status_limiter(),
+        "detail_coalescing": {**STATUS_COALESCE, "in_flight": len(DETAIL_TERBANG)},
+        "ai": dict(STATUS_AI),
+        "jobs": ringkas_antrean_job()
+    }), 200 if siap else 503
+
+# ==========================================
+# 16. PERBANDINGAN MULTI-TICKER (/api/compare)
+# ==========================================
+# N ticker = satu putaran: cache segar dipakai langsung, sisanya SATU yf.download batch
+# (paralel dengan fundamental dari cache SWR), scoring bersama lewat skor_batch, plan
+# dari bar yang sama (tanpa request fibo per ticker), dan opsional SATU panggilan AI
+# yang meranking seluruh grup (bukan N analisa lengkap).
+COMPARE_MAX = int(os.getenv("COMPARE_MAX", 10))
+COMPARE_BUDGET = float(os.getenv("COMPARE_BUDGET", 20))
+KOLOM_COMPARE = ('rsi', 'rvol', 'adx', 'cmf', 'stoch_k', 'macd_hist', 'atr', 'bb_bandwidth', 'sma_20', 'sma_50', 'sma_200', 'vwap')
+
+def analisa_banding(tickers):
+    """Return dict ticker -> {data, bars, funda, source}; bar & skor diambil sekali untuk seluruh grup."""
+    now = time.time()
+    hasil = {}; perlu = []
+    for t in tickers:
+        item = CACHE_DATA.get(t)
+        if status_cache(item, now) == "SEGAR" and item.get('bars') is not None:
+            hasil[t] = {"data": item['data'], "bars": item['bars'], "source": "cache"}
+        else: perlu.append(t)
+
+    # Download batch & fundamental (cache SWR) jalan bersamaan, keduanya dalam tenggat request
+    f_bar = kirim_tahap(ambil_data_batch, perlu) if perlu else None
+    f_funda = {t: kirim_tahap(ambil_data_fundamental, t) for t in tickers}
+    funda = {t: tunggu_tahap("fundamental", dict(FUNDA_KOSONG), f) for t, f in f_funda.items()}
+    frames = tunggu_tahap("bars", {}, f_bar) if f_bar else {}
+
+    for t, (df, dfw, _) in list(frames.items()):
+        frames[t] = (df, dfw, {"trailingPE": funda[t].get('per') or None, "priceToBook": funda[t].get('pbv') or None})
+    if frames:
+        for t, data in skor_dan_simpan(frames, now).items():
+            hasil[t] = {"data": data, "bars": frames[t][0], "source": "batch"}
+    for t in perlu:
+        if t not in hasil: hasil[t] = {"data": {**HASIL_ERROR, "reason": "Data Yahoo kosong"}, "bars": None, "source": "batch"}
+    for t in tickers: hasil[t]['funda'] = funda[t]
+    return hasil
+
+def baris_banding(ticker, item):
+    kode = ticker.replace(".JK", "")
+    data = item['data']; funda = item['funda']
+    if data.get('last_price', 0) <= 0:
+        return {"ticker": kode, "error": data.get('reason', 'Not Found'), "source": item['source']}
+    entry, sl, tp = hitung_plan_sakti(data, df_fibo=item['bars']) if item['bars'] is not None else hitung_plan_sakti(data)
+    indikator = data.get('indicators') or {}
+    return {
+        "ticker": kode, "name": funda.get('nama') or info_saham(kode)['name'], "sector": sektor_ticker(kode),
+        "badges": badge_saham(kode),
+        "price": data['last_price'], "change_pct": round(float(data.get('change_pct', 0)), 2),
+        "score": int(data['score']), "verdict": data['verdict'], "type": data['type'],
+        "reason": data.get('reason'), "note": (data.get('hist_data') or {}).get('note', 'Valid'),
+        "plan": {"entry": entry, "stop_loss": sl, "take_profit": tp},
+        "indicators": {k: indikator.get(k) for k in KOLOM_COMPARE},
+        "fundamental": {"per": funda.get('per'), "pbv": funda.get('pbv'), "roe": funda.get('roe'), "market_cap": funda.get('market_cap')},
+        "as_of": data.get('as_of'), "source": item['source']
+    }
+
+def ranking_ai_banding(rows):
+    """SATU panggilan AI (JSON) untuk meranking seluruh grup dari tabel ringkas."""
+    baris = []
+    for r in rows:
+        ind = r['indicators']
+        baris.append(f"{r['ticker']} ({r['sector']}): harga {r['price']} ({r['change_pct']:+.2f}%), skor {r['score']} {r['verdict']} {r['type']}, "
+                     f"RSI {ind.get('rsi')}, RVOL {ind.get('rvol')}, ADX {ind.get('adx')}, CMF {ind.get('cmf')}, "
+                     f"PER {r['fundamental']['per']}, PBV {r['fundamental']['pbv']}, entry {r['plan']['entry']}, SL {r['plan']['stop_loss']}")
+    prompt = f"""Kamu fund manager saham IDX. Bandingkan kandidat berikut untuk trading 1-10 hari ke depan:
+{chr(10).join(baris)}
+
+Balas HANYA JSON dengan format:
+{{"ranking": [{{"ticker": "KODE", "rank": 1, "alasan": "maks 20 kata"}}], "kesimpulan": "maks 40 kata"}}
+Semua ticker di atas harus masuk ranking, rank 1 = paling menarik."""
+    jawaban = panggil_ai_failover(prompt, json_mode=True)
+    if not jawaban: return None
+    try:
+        teks = jawaban.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+        isi = json.loads(teks)
+    except Exception as e:
+        print(f"⚠️ JSON Ranking Tidak Valid: {e}")
+        return None
+    dikenal = {r['ticker'] for r in rows}
+    ranking = []
+    for h in isi.get('ranking', []):
+        kode = str(h.get('ticker', '')).upper().replace(".JK", "")
+        if kode not in dikenal or any(x['ticker'] == kode for x in ranking): continue
+        ranking.append({"ticker": kode, "reason": str(h.get('alasan', ''))[:200]})
+    for i, x in enumerate(ranking): x['rank'] = i + 1
+    return {"ranking": ranking, "summary": str(isi.get('kesimpulan', ''))[:400]}
+
+@app.route('/api/compare', methods=['GET'])
+def get_compare():
+    """
+    Contoh: /api/compare?tickers=BBRI,BMRI,BBNI,BBCA&ai=1
+    Tabel berdampingan (skor, plan, indikator, fundamental) + opsional ranking AI satu panggilan.
+    """
+    kodes = []
+    for k in request.args.get('tickers', '').split(','):
+        k = k.strip().upper().replace(".JK", "")
+        if k and k not in kodes: kodes.append(k)
+    if len(kodes) < 2: return jsonify({"error": "Minimal 2 ticker, contoh ?tickers=BBRI,BMRI"}), 400
+    if len(kodes) > COMPARE_MAX: return jsonify({"error": f"Maksimal {COMPARE_MAX} ticker per perbandingan"}), 400
+
+    mulai = time.perf_counter()
+    with prioritas_yahoo(PRIORITAS_DETAIL), tenggat(COMPARE_BUDGET) as degraded:
+        hasil = analisa_banding([k + ".JK" for k in kodes])
+        rows = [baris_banding(k + ".JK", hasil[k + ".JK"]) for k in kodes]
+        valid = [r for r in rows if 'error' not in r]
+        valid.sort(key=lambda r: (-r['score'], r['ticker']))
+        ranking = None
+        if request.args.get('ai') == '1' and len(valid) >= 2:
+            ranking = jalankan_tahap("ranking", None, ranking_ai_banding, valid)
+            if ranking is None: tandai_degraded("ranking")
+        return jsonify({
+            "tickers": kodes, "count": len(valid),
+            "results": valid + [r for r in rows if 'error' in r],
+            "ai": ranking,
+            "fetched": {"cache": sum(1 for r in rows if r['source'] == "cache"), "batch": sum(1 for r in rows if r['source'] == "batch")},
+            "degraded": list(degraded),
+            "elapsed_ms": round((time.perf_counter() - mulai) * 1000, 1)
+        })
+
+# ==========================================
+# 17. SNAPSHOT INDIKATOR (MEMORY-MAPPED, BERVERSI)
+# ==========================================
+# Hasil scoring seluruh universe ditulis berkala ke SNAPSHOT_DIR/<versi>/ sebagai satu file
+# .npy per kolom (kolom angka float64, teks unicode lebar tetap, level S/R format panjang).
+# File CURRENT menunjuk versi terbaru dan diganti atomik (os.replace), jadi pembaca tidak
+# pernah melihat snapshot setengah jadi. Worker baru (restart / worker gunicorn lain)
+# me-mmap kolom angka (copy-on-write, tanpa salin & tanpa parsing) langsung jadi
+# TABEL_INDIKATOR untuk screener, lalu CACHE_DATA diisi sebagai entri BASI: scan langsung
+# tersaji dan refresh Yahoo berjalan di belakang.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshot_indikator")
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", 120)) # Detik minimal antar penulisan
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", 12 * 3600)) # Lebih tua dari ini -> tidak dipakai
+SNAPSHOT_SIMPAN = 3 # Versi lama yang disimpan (pembaca yang masih me-mmap versi lama tetap aman)
+KOLOM_HIST = ["max_1y", "min_1y", "avg_volume"]
+KOLOM_SNAPSHOT_ANGKA = KOLOM_ANGKA + KOLOM_HIST
+KOLOM_SNAPSHOT_TEKS = KOLOM_TEKS + ["reason", "note"]
+KOLOM_UTAMA = ["score", "last_price", "change_pct", "support", "stop_loss", "target_price", "as_of"]
+STATUS_SNAPSHOT = {"written_at": 0, "written_version": None, "loaded_version": None, "loaded_rows": 0,
+                   "load_ms": None, "writing": False, "error": None}
+SNAPSHOT_DISK_LOCK = threading.Lock()
+
+def versi_snapshot_aktif():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, "CURRENT")) as f: return f.read().strip() or None
+    except FileNotFoundError: return None
+
+def tulis_snapshot_indikator():
+    """Tulis CACHE_DATA (ticker valid) sebagai snapshot kolom baru lalu pindahkan CURRENT."""
+    items = [(t.replace(".JK", ""), item['data']) for t, item in list(CACHE_DATA.items())
+             if item['data'].get('last_price', 0) > 0 and item['data'].get('verdict') not in ("ERROR", "SKIP")]
+    if not items: return None
+
+    angka = {k: np.full(len(items), np.nan) for k in KOLOM_SNAPSHOT_ANGKA}
+    teks = {k: [] for k in KOLOM_SNAPSHOT_TEKS}
+    lvl_baris = []; lvl_nama = []; lvl_harga = []
+    for i, (kode, data) in enumerate(items):
+        baris = nilai_baris_alert(kode, data)
+        hist = data.get('hist_data') or {}
+        baris.update({k: hist.get(k) for k in KOLOM_HIST})
+        for k in KOLOM_SNAPSHOT_ANGKA:
+            if baris.get(k) is not None: angka[k][i] = float(baris[k])
+        baris.update({"reason": data.get('reason', ''), "note": hist.get('note', 'Valid')})
+        for k in KOLOM_SNAPSHOT_TEKS: teks[k].append(str(baris.get(k) or ''))
+        for nama, harga in (data.get('levels') or {}).items():
+            lvl_baris.append(i); lvl_nama.append(nama); lvl_harga.append(harga)
+
+    versi = f"v{time.time_ns()}_{os.getpid()}"
+    tmp = os.path.join(SNAPSHOT_DIR, "." + versi)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "tickers.npy"), np.array([k for k, _ in items]))
+    for k, arr in angka.items(): np.save(os.path.join(tmp, f"angka_{k}.npy"), arr)
+    for k, isi in teks.items(): np.save(os.path.join(tmp, f"teks_{k}.npy"), np.array(isi, dtype=str))
+    np.save(os.path.join(tmp, "level_baris.npy"), np.array(lvl_baris, dtype=np.int32))
+    np.save(os.path.join(tmp, "level_nama.npy"), np.array(lvl_nama, dtype=str))
+    np.save(os.path.join(tmp, "level_harga.npy"), np.array(lvl_harga, dtype=np.float64))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": versi, "created_at": time.time(), "rows": len(items), "market": MARKET_STATUS.get('condition'),
+                   "kolom_angka": KOLOM_SNAPSHOT_ANGKA, "kolom_teks": KOLOM_SNAPSHOT_TEKS}, f)
+    os.rename(tmp, os.path.join(SNAPSHOT_DIR, versi))
+
+    pointer = os.path.join(SNAPSHOT_DIR, f".CURRENT.{os.getpid()}")
+    with open(pointer, "w") as f: f.write(versi)
+    os.replace(pointer, os.path.join(SNAPSHOT_DIR, "CURRENT"))
+
+    lama = sorted(d for d in os.listdir(SNAPSHOT_DIR) if d.startswith("v"))[:-SNAPSHOT_SIMPAN]
+    for d in lama: shutil.rmtree(os.path.join(SNAPSHOT_DIR, d), ignore_errors=True)
+    STATUS_SNAPSHOT.update({"written_at": time.time(), "written_version": versi})
+    return versi
+
+def tulis_snapshot_latar():
+    try:
+        versi = tulis_snapshot_indikator()
+        if versi: print(f"💾 Snapshot indikator {versi} ({len(CACHE_DATA)} ticker)")
+    except Exception as e:
+        STATUS_SNAPSHOT['error'] = str(e)
+        print(f"⚠️ Tulis Snapshot Gagal: {e}")
+    finally:
+        STATUS_SNAPSHOT['writing'] = False
+
+def jadwalkan_tulis_snapshot(paksa=False):
+    """Dipanggil tiap selesai refresh; menulis paling sering sekali per SNAPSHOT_INTERVAL (di thread latar)."""
+    with SNAPSHOT_DISK_LOCK:
+        if STATUS_SNAPSHOT['writing']: return False
+        if not paksa and time.time() - STATUS_SNAPSHOT['written_at'] < SNAPSHOT_INTERVAL: return False
+        STATUS_SNAPSHOT['writing'] = True
+    threading.Thread(target=tulis_snapshot_latar, name="snapshot-writer", daemon=True).start()
+    return True
+
+def muat_snapshot_indikator():
+    """Map snapshot CURRENT ke TABEL_INDIKATOR + CACHE_DATA (hanya untuk proses yang cache-nya masih kosong)."""
+    versi = versi_snapshot_aktif()
+    if not versi or CACHE_DATA: return 0
+    mulai = time.perf_counter()
+    folder = os.path.join(SNAPSHOT_DIR, versi)
+    try:
+        with open(os.path.join(folder, "meta.json")) as f: meta = json.load(f)
+        if time.time() - meta['created_at'] > SNAPSHOT_MAX_AGE: return 0
+        baca = lambda nama, mode="r": np.load(os.path.join(folder, nama + ".npy"), mmap_mode=mode)
+        kodes = [str(k) for k in baca("tickers")]
+        # Copy-on-write: halaman file dibagi antar worker; yang ditulis mesin alert jadi salinan privat
+        angka = {k: baca(f"angka_{k}", "c") for k in meta['kolom_angka']}
+        teks = {k: baca(f"teks_{k}") for k in meta['kolom_teks']}
+        lvl_baris = baca("level_baris"); lvl_nama = baca("level_nama"); lvl_harga = baca("level_harga")
+    except Exception as e:
+        print(f"⚠️ Snapshot {versi} Tidak Terbaca: {e}")
+        return 0
+
+    n = len(kodes)
+    with ALERT_LOCK:
+        tabel = TABEL_INDIKATOR
+        if not tabel['tickers']:
+            tabel['tickers'] = list(kodes); tabel['index'] = {k: i for i, k in enumerate(kodes)}
+            for k in KOLOM_ANGKA:
+                tabel['kolom'][k] = angka[k]
+                tabel['prev'][k] = baca(f"angka_{k}", "c")
+            for k in KOLOM_TEKS:
+                tabel['kolom'][k] = teks[k].astype(object)
+                tabel['prev'][k] = teks[k].astype(object)
+            for id_aturan in STATUS_ALERT: STATUS_ALERT[id_aturan] = np.zeros(n, dtype=bool)
+            tabel['versi'] += 1
+
+    kolom_ind = [k for k in KOLOM_ANGKA if k not in KOLOM_UTAMA]
+    levels = [{} for _ in range(n)]
+    for i, nama, harga in zip(lvl_baris.tolist(), lvl_nama.tolist(), lvl_harga.tolist()): levels[i][nama] = harga
+    kolom = {k: angka[k].tolist() for k in meta['kolom_angka']}
+    kolom.update({k: teks[k].tolist() for k in meta['kolom_teks']})
+    bersih = lambda v: None if v != v else v # NaN -> None
+    hasil = {}
+    for i, kode in enumerate(kodes):
+        as_of = kolom['as_of'][i]
+        data = {
+            "score": int(kolom['score'][i]), "verdict": kolom['verdict'][i], "type": kolom['type'][i], "reason": kolom['reason'][i],
+            "last_price": kolom['last_price'][i], "change_pct": bersih(kolom['change_pct'][i]) or 0,
+            "support": bersih(kolom['support'][i]) or 0, "stop_loss": bersih(kolom['stop_loss'][i]) or 0,
+            "target_price": bersih(kolom['target_price'][i]) or 0,
+            "indicators": {k: bersih(kolom[k][i]) for k in kolom_ind}, "levels": levels[i],
+            "hist_data": {**{k: bersih(kolom[k][i]) for k in KOLOM_HIST}, "note": kolom['note'][i]},
+            "as_of": int(as_of) if as_of == as_of else int(meta['created_at'])
+        }
+        hasil[kode + ".JK"] = data
+        CACHE_DATA.setdefault(kode + ".JK", {'data': data, 'timestamp': data['as_of'], 'bars': None, 'snapshot': True})
+    perbarui_level_saham(hasil)
+    if meta.get('market') and MARKET_STATUS['last_check'] == 0:
+        # last_check = waktu snapshot ditulis: regime lama (bisa sampai SNAPSHOT_MAX_AGE) tidak dianggap
+        # baru dicek, jadi cek_kondisi_market langsung menyegarkannya kalau sudah lewat masa berlaku
+        MARKET_STATUS.update({"condition": meta['market'], "source": "SNAPSHOT", "last_check": meta['created_at']})
+
+    STATUS_SNAPSHOT.update({"loaded_version": versi, "loaded_rows": n, "load_ms": round((time.perf_counter() - mulai) * 1000, 2)})
+    print(f"⚡ Snapshot {versi}: {n} ticker dimuat dalam {STATUS_SNAPSHOT['load_ms']} ms")
+    return n
+
+@app.route('/api/snapshot', methods=['GET'])
+def get_snapshot_status():
+    return jsonify({**STATUS_SNAPSHOT, "current": versi_snapshot_aktif(), "dir": os.path.abspath(SNAPSHOT_DIR)})
+
+# ==========================================
+# 18. ANTREAN JOB ANALISA AI (ASYNC + PRIORITAS)
+# ==========================================
+# Analisa detail penuh bisa puluhan detik (AI). Mode job: klien kirim ticker, langsung
+# dapat job id (202), lalu polling /api/jobs/<id> (boleh ?wait=<detik> long-poll singkat).
+# Pekerja job (JOB_WORKER thread) mengambil dari PriorityQueue: interaktif (user menunggu)
+# selalu sebelum background (prefetch / refresh). Pipeline yang dipakai sama dengan
+# /api/stock-detail (coalescing + tenggat), dan panggilan AI tetap dibatasi SLOT_AI.
+# Catatan: state job ada di memori proses; dengan WEB_CONCURRENCY > 1 polling harus sticky.
+PRIORITAS_JOB = {"interactive": 0, "background": 1}
+JOB_WORKER = int(os.getenv("JOB_WORKER", 4))
+JOB_BUDGET = float(os.getenv("JOB_BUDGET", 90)) # Job tidak terikat timeout router, budget boleh lebih longgar
+JOB_MAKS_ANTRE = int(os.getenv("JOB_MAKS_ANTRE", 200))
+JOB_TTL = int(os.getenv("JOB_TTL", 900)) # Hasil job selesai disimpan selama ini (detik)
+JOB_WAIT_MAX = 25 # Batas long-poll ?wait= supaya thread web tidak tertahan lama
+ANTREAN_JOB = queue.PriorityQueue()
+JOBS = {} # id -> {"id", "ticker", "priority", "status", "created", "started", "finished", "result", "error", "selesai": Event}
+JOB_AKTIF = {} # (kode, priority) -> id job yang masih queued/running (dedup)
+JOB_SEQ = {"n": 0}
+JOB_LOCK = threading.Lock()
+PEKERJA_JOB = {"threads": []}
+
+def mulai_pekerja_job():
+    with JOB_LOCK:
+        if PEKERJA_JOB['threads']: return
+        for i in range(JOB_WORKER):
+            t = threading.Thread(target=loop_pekerja_job, name=f"job-worker-{i}", daemon=True)
+            t.start(); PEKERJA_JOB['threads'].append(t)
+    print(f"🧵 Pekerja job aktif: {JOB_WORKER} thread, slot AI {AI_KONKURENSI}")
+
+def buang_job_lama(now):
+    for id_job in [i for i, j in JOBS.items() if j['finished'] and now - j['finished'] > JOB_TTL]: del JOBS[id_job]
+
+def kirim_job(kode, prioritas="interactive"):
+    """Masukkan job analisa detail. Return (job, baru); job identik yang masih antre/jalan dipakai ulang."""
+    if prioritas not in PRIORITAS_JOB: raise ValueError(f"priority harus salah satu dari {list(PRIORITAS_JOB)}")
+    mulai_pekerja_job()
+    now = time.time()
+    with JOB_LOCK:
+        buang_job_lama(now)
+        id_lama = JOB_AKTIF.get((kode, prioritas))
+        if id_lama in JOBS: return JOBS[id_lama], False
+        if ANTREAN_JOB.qsize() >= JOB_MAKS_ANTRE: return None, False
+        JOB_SEQ['n'] += 1
+        job = {"id": uuid.uuid4().hex[:12], "ticker": kode, "priority": prioritas, "status": "queued",
+               "created": now, "started": None, "finished": None, "result": None, "error": None,
+               "selesai": threading.Event()}
+        JOBS[job['id']] = job
+        JOB_AKTIF[(kode, prioritas)] = job['id']
+        # Urutan: prioritas dulu, lalu FIFO (seq) di dalam prioritas yang sama
+        ANTREAN_JOB.put((PRIORITAS_JOB[prioritas], JOB_SEQ['n'], job['id']))
+    return job, True
+
+def loop_pekerja_job():
+    while True:
+        _, _, id_job = ANTREAN_JOB.get()
+        job = JOBS.get(id_job)
+        if job is None: continue
+        job['status'] = "running"; job['started'] = time.time()
+        prioritas_yf = PRIORITAS_DETAIL if job['priority'] == "interactive" else PRIORITAS_SCAN
+        try:
+            with prioritas_yahoo(prioritas_yf), tenggat(JOB_BUDGET):
+                data, peran = detail_terkoalesi(job['ticker'])
+            job['result'] = {**data, "coalesced": peran}
+            job['status'] = "failed" if 'error' in data else "done"
+            if 'error' in data: job['error'] = data['error']
+        except Exception as e:
+            print(f"⚠️ Job {id_job} ({job['ticker']}) Gagal: {e}")
+            job['status'] = "failed"; job['error'] = str(e)
+        finally:
+            job['finished'] = time.time()
+            with JOB_LOCK:
+                if JOB_AKTIF.get((job['ticker'], job['priority'])) == id_job: del JOB_AKTIF[(job['ticker'], job['priority'])]
+            job['selesai'].set()
+
+def posisi_antrean(job):
+    """Perkiraan posisi: job queued di depannya (prioritas lebih tinggi atau lebih dulu masuk)."""
+    if job['status'] != "queued": return 0
+    kunci = (PRIORITAS_JOB[job['priority']], job['created'])
+    return sum(1 for j in list(JOBS.values()) if j['status'] == "queued" and (PRIORITAS_JOB[j['priority']], j['created']) < kunci)
+
+def info_job(job, dengan_hasil=True):
+    info = {k: job[k] for k in ("id", "ticker", "priority", "status", "created", "started", "finished", "error")}
+    info['position'] = posisi_antrean(job)
+    info['poll'] = f"/api/jobs/{job['id']}"
+    if dengan_hasil and job['status'] in ("done", "failed"): info['result'] = job['result']
+    return info
+
+def ringkas_antrean_job():
+    status = [j['status'] for j in list(JOBS.values())]
+    return {"workers": len(PEKERJA_JOB['threads']), "queued": status.count("queued"), "running": status.count("running"),
+            "done": status.count("done"), "failed": status.count("failed"), "queue_size": ANTREAN_JOB.qsize()}
+
+def respon_job_baru(kode, prioritas):
+    try: job, baru = kirim_job(kode, prioritas)
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    if job is None: return jsonify({"error": "Antrean job penuh, coba lagi sebentar"}), 503
+    resp = jsonify({**info_job(job, dengan_hasil=False), "deduplicated": not baru})
+    resp.status_code = 202
+    resp.headers["Location"] = f"/api/jobs/{job['id']}"
+    return resp
+
+@app.route('/api/jobs', methods=['POST'])
+def post_job():
+    """Body JSON / query: ticker=BBRI, priority=interactive|background -> 202 + job id."""
+    isi = request.get_json(silent=True) or {}
+    ticker = isi.get('ticker') or request.args.get('ticker')
+    if not ticker: return jsonify({"error": "No Ticker"}), 400
+    prioritas = isi.get('priority') or request.args.get('priority', 'interactive')
+    return respon_job_baru(str(ticker).strip().upper().replace(".JK", ""), prioritas)
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    return jsonify({**ringkas_antrean_job(), "ai": dict(STATUS_AI),
+                    "jobs": [info_job(j, dengan_hasil=False) for j in sorted(list(JOBS.values()), key=lambda j: -j['created'])[:50]]})
+
+@app.route('/api/jobs/<id_job>', methods=['GET'])
+def get_job(id_job):
+    """Polling status job; ?wait=<detik> (maks 25) menunggu sampai selesai atau waktu habis."""
+    job = JOBS.get(id_job)
+    if job is None: return jsonify({"error": "Job tidak ditemukan / sudah kedaluwarsa"}), 404
+    try: tunggu = min(JOB_WAIT_MAX, max(0.0, float(request.args.get('wait', 0))))
+    except ValueError: return jsonify({"error": "wait harus angka (detik)"}), 400
+    if tunggu and job['status'] in ("queued", "running"): job['selesai'].wait(tunggu)
+    return jsonify(info_job(job))
+
 # HALAMAN DEPAN
 @app.route('/', methods=['GET'])
 def index():
@@ -833,4 +3018,7 @@ def index():
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 7860))
     print(f"🚀 Alpha Hunter V17 Server berjalan di Port: {port}")
-    app.run(host='0.0.0.0', port=port)
+    # Server dev Flask; produksi: gunicorn -c gunicorn.conf.py server:app (lihat Procfile)
+    mulai_warmup()
+    if not WARMUP_AKTIF and INTRADAY_MODE: mulai_intraday()
+    app.run(host='0.0.0.0', port=port, threaded=True)
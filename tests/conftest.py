@@ -0,0 +1,53 @@
+import os
+import sys
+import copy
+import tempfile
+from collections import deque
+
+import numpy as np
+import pytest
+
+# Server diimport tanpa menyentuh ihsg_hunter.db / snapshot_indikator milik repo
+_TMP = tempfile.mkdtemp(prefix="alpha_hunter_test_")
+os.environ.setdefault("DB_PATH", os.path.join(_TMP, "test.db"))
+os.environ.setdefault("SNAPSHOT_DIR", os.path.join(_TMP, "snapshot"))
+os.environ.setdefault("WARMUP", "0")
+os.environ.setdefault("INTRADAY_MODE", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def server_bersih(monkeypatch, tmp_path):
+    """Modul server dengan cache, tabel alert, indeks level & direktori snapshot yang kosong."""
+    import server
+    monkeypatch.setattr(server, "CACHE_DATA", {})
+    monkeypatch.setattr(server, "TABEL_INDIKATOR", {
+        "tickers": [], "index": {},
+        "kolom": {k: np.empty(0) for k in server.KOLOM_ANGKA + server.KOLOM_TEKS},
+        "prev": {k: np.empty(0) for k in server.KOLOM_ANGKA + server.KOLOM_TEKS},
+        "versi": 0
+    })
+    monkeypatch.setattr(server, "ATURAN_ALERT", {})
+    monkeypatch.setattr(server, "STATUS_ALERT", {})
+    monkeypatch.setattr(server, "ANTRIAN_ALERT", deque(maxlen=server.ALERT_MAKS_EVENT))
+    monkeypatch.setattr(server, "ALERT_SEQ", {"aturan": 0, "event": 0, "last_eval_ms": 0.0, "last_eval_rows": 0})
+    monkeypatch.setattr(server, "LEVEL_SAHAM", {})
+    monkeypatch.setattr(server, "INDEKS_LEVEL", copy.deepcopy(server.INDEKS_LEVEL) | {"dirty": True})
+    monkeypatch.setattr(server, "MARKET_STATUS", {"condition": "NORMAL", "last_check": 0})
+    monkeypatch.setattr(server, "STATUS_SNAPSHOT", dict(server.STATUS_SNAPSHOT, written_at=0))
+    monkeypatch.setattr(server, "SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    # Tulis snapshot latar tidak ikut jalan saat test memanggil skor_dan_simpan / proses_alert
+    monkeypatch.setattr(server, "jadwalkan_tulis_snapshot", lambda paksa=False: False)
+    return server
+
+
+def data_saham(score=70, harga=1000.0, verdict="BUY", tipe="SWING", as_of=1_700_000_000, levels=None, **indikator):
+    """Satu hasil scoring minimal seperti yang disimpan di CACHE_DATA[ticker]['data']."""
+    return {
+        "score": score, "last_price": harga, "change_pct": 0.5, "verdict": verdict, "type": tipe,
+        "reason": "uji", "support": harga * 0.95, "stop_loss": harga * 0.9, "target_price": harga * 1.1,
+        "indicators": {"rsi": 50.0, "rvol": 1.0, "atr": harga * 0.02, **indikator},
+        "levels": levels or {}, "hist_data": {"max_1y": harga * 1.5, "min_1y": harga * 0.5, "avg_volume": 1e6, "note": "Valid"},
+        "as_of": as_of
+    }
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from conftest import data_saham
+
+
+def tabel_uji(kolom, prev=None):
+    """Tabel kolom minimal untuk kompilasi_aturan: angka float, teks object."""
+    def ubah(isi):
+        return {k: np.array(v, dtype=object if isinstance(v[0], str) else float) for k, v in isi.items()}
+    return {"kolom": ubah(kolom), "prev": ubah(prev if prev is not None else kolom)}
+
+
+def evaluasi(server, aturan, tabel):
+    fungsi, _ = server.kompilasi_aturan(aturan)
+    return fungsi(tabel, np.arange(len(next(iter(tabel['kolom'].values()))))).tolist()
+
+
+# --- KOMPILER ATURAN ---
+def test_and_or_dengan_prioritas_and(server_bersih):
+    t = tabel_uji({"rsi": [25, 25, 50, 50], "rvol": [3, 1, 3, 1], "score": [0, 0, 90, 0]})
+    assert evaluasi(server_bersih, "rsi < 30 and rvol > 2", t) == [True, False, False, False]
+    # "and" lebih kuat dari "or": rsi<30 and rvol>2  OR  score>=80
+    assert evaluasi(server_bersih, "rsi < 30 AND rvol > 2 or score >= 80", t) == [True, False, True, False]
+
+
+def test_alias_dan_kolom_vs_kolom(server_bersih):
+    t = tabel_uji({"last_price": [110, 90], "sma_50": [100, 100]})
+    assert evaluasi(server_bersih, "price > ma50", t) == [True, False]
+
+
+def test_crosses_pakai_nilai_sebelumnya(server_bersih):
+    t = tabel_uji({"last_price": [105, 95, 105, 105]}, prev={"last_price": [95, 105, 105, np.nan]})
+    assert evaluasi(server_bersih, "price crosses_above 100", t) == [True, False, False, False]
+    assert evaluasi(server_bersih, "price crosses_below 100", t) == [False, True, False, False]
+    # Baris tanpa nilai sebelumnya (NaN) tidak dihitung menyilang
+    assert evaluasi(server_bersih, "price crosses 100", t) == [True, True, False, False]
+
+
+def test_verdict_becomes_dan_awalan(server_bersih):
+    t = tabel_uji({"verdict": ["STRONG BUY 🔥", "STRONG BUY 🔥", "BUY"]},
+                  prev={"verdict": ["BUY", "STRONG BUY 🔥", "WAIT"]})
+    assert evaluasi(server_bersih, "verdict becomes STRONG BUY", t) == [True, False, False]
+    # "BUY" tidak ikut cocok dengan "STRONG BUY"
+    assert evaluasi(server_bersih, "verdict == BUY", t) == [False, False, True]
+    assert evaluasi(server_bersih, "verdict != BUY", t) == [True, True, False]
+
+
+@pytest.mark.parametrize("aturan", ["", "rsi <", "harga_aneh > 3", "rsi >> 30", "rsi < abc", "sector > BANK"])
+def test_aturan_tidak_valid(server_bersih, aturan):
+    with pytest.raises(server_bersih.AturanTidakValid):
+        server_bersih.kompilasi_aturan(aturan)
+
+
+def test_klausa_ter_normalisasi(server_bersih):
+    _, klausa = server_bersih.kompilasi_aturan("RSI  <  30 and rvol > 2")
+    assert klausa == ["rsi < 30", "rvol > 2"]
+
+
+# --- EDGE TRIGGER ---
+def tambah_aturan(server, aturan, tickers=None):
+    with server.app.test_client() as c:
+        r = c.post("/api/alerts/rules", json={"rule": aturan, "tickers": tickers})
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()
+
+
+def refresh(server, **rsi_per_ticker):
+    return server.proses_alert({f"{k}.JK": data_saham(rsi=v) for k, v in rsi_per_ticker.items()})
+
+
+def test_event_hanya_saat_salah_ke_benar(server_bersih):
+    s = server_bersih
+    refresh(s, BBRI=40, BBCA=20)
+    # BBCA sudah memenuhi saat aturan dibuat -> bukan event baru
+    assert tambah_aturan(s, "rsi < 30")['matching_now'] == ["BBCA"]
+
+    assert refresh(s, BBRI=25) == 1
+    assert refresh(s, BBRI=20) == 0  # Masih benar: tidak ada event ulang
+    assert refresh(s, BBRI=35) == 0  # Benar -> salah
+    assert refresh(s, BBRI=28) == 1  # Salah -> benar lagi
+    assert [e['ticker'] for e in s.ANTRIAN_ALERT] == ["BBRI", "BBRI"]
+    assert [e['seq'] for e in s.ANTRIAN_ALERT] == [1, 2]
+
+
+def test_aturan_dibatasi_ticker(server_bersih):
+    s = server_bersih
+    refresh(s, BBRI=40, BBCA=40)
+    tambah_aturan(s, "rsi < 30", tickers=["BBCA.JK"])
+    assert refresh(s, BBRI=20, BBCA=20) == 1
+    assert [e['ticker'] for e in s.ANTRIAN_ALERT] == ["BBCA"]
+
+
+def test_ticker_baru_setelah_aturan_dibuat(server_bersih):
+    s = server_bersih
+    refresh(s, BBRI=40)
+    tambah_aturan(s, "rsi < 30")
+    assert refresh(s, TLKM=20) == 1
+
+
+def test_as_of_saja_tidak_dianggap_berubah(server_bersih):
+    s = server_bersih
+    s.perbarui_tabel_indikator({"BBRI.JK": data_saham(as_of=1)})
+    assert s.perbarui_tabel_indikator({"BBRI.JK": data_saham(as_of=2)}).tolist() == []
+    assert s.TABEL_INDIKATOR['kolom']['as_of'][0] == 2
+    assert s.perbarui_tabel_indikator({"BBRI.JK": data_saham(as_of=3, rsi=10)}).tolist() == [0]
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def server_detail(server_bersih, monkeypatch):
+    s = server_bersih
+    monkeypatch.setattr(s, "DETAIL_TERBANG", {})
+    monkeypatch.setattr(s, "DETAIL_SELESAI", {})
+    monkeypatch.setattr(s, "STATUS_COALESCE", dict.fromkeys(s.STATUS_COALESCE, 0))
+    return s
+
+
+def jalankan_paralel(server, jumlah, budget=5):
+    hasil = [None] * jumlah
+
+    def satu(i):
+        with server.tenggat(budget):
+            try: hasil[i] = server.detail_terkoalesi("BBRI")
+            except Exception as e: hasil[i] = e
+    threads = [threading.Thread(target=satu, args=(i,)) for i in range(jumlah)]
+    threads[0].start(); time.sleep(0.05) # Thread pertama jadi leader
+    for t in threads[1:]: t.start()
+    for t in threads: t.join()
+    return hasil
+
+
+def test_leader_gagal_follower_tidak_ikut_error(server_detail, monkeypatch):
+    s = server_detail
+    panggilan = []
+
+    def bangun(kode):
+        panggilan.append(kode)
+        if len(panggilan) == 1:
+            time.sleep(0.2)
+            raise RuntimeError("Yahoo down")
+        return {"ticker": kode, "analysis": {"score": 70}}
+    monkeypatch.setattr(s, "bangun_detail_saham", bangun)
+
+    hasil = jalankan_paralel(s, 4)
+    assert isinstance(hasil[0], RuntimeError)
+    assert [peran for _, peran in hasil[1:]] == ["fallback"] * 3
+    assert all(data['ticker'] == "BBRI" for data, _ in hasil[1:])
+    assert s.DETAIL_TERBANG == {}
+
+
+def test_rerun_tanpa_rekursi(server_detail, monkeypatch):
+    s = server_detail
+    putaran = []
+
+    def bangun(kode):
+        putaran.append(s.sisa_waktu())
+        time.sleep(0.2)
+        # Putaran pertama (leader dengan budget ketat) selalu degraded
+        return {"ticker": kode, "degraded": ["analysis"]} if len(putaran) == 1 else {"ticker": kode}
+    monkeypatch.setattr(s, "bangun_detail_saham", bangun)
+
+    hasil = [None, None]
+    def leader():
+        with s.tenggat(3): hasil[0] = s.detail_terkoalesi("BBRI")
+    def follower():
+        with s.tenggat(20): hasil[1] = s.detail_terkoalesi("BBRI")
+    t1 = threading.Thread(target=leader); t1.start(); time.sleep(0.05)
+    t2 = threading.Thread(target=follower); t2.start()
+    t1.join(); t2.join()
+    assert hasil[0][1] == "leader" and hasil[0][0]['degraded']
+    assert hasil[1] == ({"ticker": "BBRI"}, "leader")
+    assert s.STATUS_COALESCE['rerun'] == 1
@@ -0,0 +1,61 @@
+import pytest
+
+
+def baris(ticker, score, verdict="BUY", as_of=1):
+    return {"ticker": ticker, "analysis": {"score": score, "verdict": verdict, "type": "SWING"}, "as_of": as_of}
+
+
+@pytest.fixture
+def server_feed(server_bersih, monkeypatch):
+    s = server_bersih
+    monkeypatch.setattr(s, "SNAPSHOT_SCAN", {})
+    monkeypatch.setattr(s, "RIWAYAT_SNAPSHOT", {})
+    monkeypatch.setattr(s, "VERSI_SCAN", {})
+    isi = {"results": []}
+    # Scan diganti: setiap panggilan menerbitkan isi yang sedang diset test
+    monkeypatch.setattr(s, "hitung_snapshot_scan", lambda strategy, dengan_sentimen=False: s.terbitkan_snapshot(strategy, isi['results']))
+    return s, isi
+
+
+def test_versi_delta_naik_ketat(server_feed):
+    s, isi = server_feed
+    A = [baris("BBRI", 80), baris("TLKM", 60)]
+    B = [baris("BBRI", 85, "STRONG BUY"), baris("TLKM", 60)]
+    versi = []; since = 0
+    with s.app.test_client() as c:
+        for results in (A, B, A, [baris("BBRI", 85)]):
+            isi['results'] = results
+            body = c.get(f"/api/scan-results/delta?strategy=ALL&since={since}").get_json()
+            versi.append(body['version']); since = body['version']
+        # Isi tidak berubah -> versi tetap, delta kosong
+        body = c.get(f"/api/scan-results/delta?strategy=ALL&since={since}").get_json()
+    assert all(a < b for a, b in zip(versi, versi[1:]))
+    assert body['version'] == since and body['added'] == body['changed'] == body['removed'] == []
+
+
+def test_delta_dari_versi_lama(server_feed):
+    s, isi = server_feed
+    with s.app.test_client() as c:
+        isi['results'] = [baris("BBRI", 80), baris("TLKM", 60)]
+        v1 = c.get("/api/scan-results/delta?since=0").get_json()['version']
+        isi['results'] = [baris("BBRI", 90), baris("ASII", 70)]
+        body = c.get(f"/api/scan-results/delta?since={v1}").get_json()
+    assert body['full'] is False
+    assert [r['ticker'] for r in body['added']] == ["ASII"]
+    assert [r['ticker'] for r in body['changed']] == ["BBRI"]
+    assert body['removed'] == ["TLKM"]
+
+
+def test_etag_dari_isi_bukan_versi(server_feed):
+    s, isi = server_feed
+    A = [baris("BBRI", 80)]
+    with s.app.test_client() as c:
+        isi['results'] = A
+        r1 = c.get("/api/scan-results")
+        isi['results'] = [baris("BBRI", 81)]
+        c.get("/api/scan-results")
+        isi['results'] = A
+        r3 = c.get("/api/scan-results")
+    # A -> B -> A: versi baru, ETag sama (isi sama di worker mana pun)
+    assert int(r3.headers['X-Scan-Version']) > int(r1.headers['X-Scan-Version'])
+    assert r3.headers['ETag'] == r1.headers['ETag']
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rumus_saham import graf_indikator, nilai_node
+
+# Rumus lama (sebelum graf indikator), disalin apa adanya sebagai acuan: node graf harus
+# menghasilkan angka yang sama persis dengan helper hitung_* yang digantikannya.
+def ref_rsi(series, period=14):
+    delta = series.diff(1)
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def ref_bollinger(series, window=20):
+    sma = series.rolling(window=window).mean()
+    std = series.rolling(window=window).std()
+    return sma + (std * 2), sma - (std * 2)
+
+def ref_macd(series, fast=12, slow=26, signal=9):
+    exp1 = series.ewm(span=fast, adjust=False).mean()
+    exp2 = series.ewm(span=slow, adjust=False).mean()
+    macd = exp1 - exp2
+    return macd, macd.ewm(span=signal, adjust=False).mean()
+
+def ref_smart_money_flow(df, period=20):
+    close = df['Close']; high = df['High']; low = df['Low']; vol = df['Volume']
+    range_hl = (high - low).replace(0, 0.001)
+    return (((2 * close - high - low) / range_hl) * vol).rolling(window=period).sum()
+
+def ref_stochastic(high, low, close, k_window=14, d_window=3):
+    low_min = low.rolling(window=k_window).min()
+    high_max = high.rolling(window=k_window).max()
+    denom = (high_max - low_min).replace(0, 0.001)
+    k_percent = 100 * ((close - low_min) / denom)
+    return k_percent, k_percent.rolling(window=d_window).mean()
+
+def ref_vwap(df):
+    v = df['Volume']
+    tp = (df['High'] + df['Low'] + df['Close']) / 3
+    return (tp * v).cumsum() / v.cumsum()
+
+def ref_adx(high, low, close, period=14):
+    plus_dm = high.diff(); minus_dm = low.diff()
+    plus_dm[plus_dm < 0] = 0; minus_dm[minus_dm > 0] = 0
+    tr1 = pd.DataFrame(high - low); tr2 = pd.DataFrame(abs(high - close.shift(1)))
+    tr3 = pd.DataFrame(abs(low - close.shift(1)))
+    tr = pd.concat([tr1, tr2, tr3], axis=1, join='inner').max(axis=1)
+    atr = tr.rolling(period).mean()
+    plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
+    minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
+    dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
+    return dx.rolling(period).mean()
+
+def ref_cmf(high, low, close, volume, period=20):
+    mfv = ((close - low) - (high - close)) / (high - low).replace(0, 0.001)
+    mfv = mfv * volume
+    return mfv.rolling(period).sum() / volume.rolling(period).sum()
+
+def ref_atr(high, low, close, period=14):
+    tr = pd.concat([high - low, abs(high - close.shift(1)), abs(low - close.shift(1))], axis=1).max(axis=1)
+    return tr.rolling(period).mean()
+
+def ref_force_index(df, period=13):
+    return (df['Close'].diff(1) * df['Volume']).ewm(span=period, adjust=False).mean()
+
+def bar_sintetis(seed, n=260):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    open_ = close * (1 + rng.normal(0, 0.01, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n))
+    # Bar suspensi (high == low == close) menguji cabang replace(0, 0.001)
+    datar = rng.random(n) < 0.05
+    open_[datar] = high[datar] = low[datar] = close[datar]
+    volume = rng.integers(0, 5_000_000, n).astype(float)
+    idx = pd.date_range("2024-01-01", periods=n, freq="B")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=idx)
+
+@pytest.mark.parametrize("seed", range(25))
+def test_node_sama_dengan_rumus_lama(seed):
+    df = bar_sintetis(seed)
+    g = graf_indikator(df)
+    h, l, c, v = df['High'], df['Low'], df['Close'], df['Volume']
+    upper, lower = ref_bollinger(c)
+    macd, signal = ref_macd(c)
+    k, d = ref_stochastic(h, l, c)
+    sma20 = c.rolling(window=20).mean()
+    acuan = {
+        "rsi_14": ref_rsi(c),
+        "bb_upper": upper, "bb_lower": lower,
+        "bb_bandwidth": ((upper - lower) / sma20) * 100,
+        "macd": macd, "macd_signal": signal, "macd_hist": macd - signal,
+        "rvol": v / v.rolling(window=20).mean(),
+        "smf_20": ref_smart_money_flow(df),
+        "stoch_k": k, "stoch_d": d,
+        "vwap": ref_vwap(df),
+        "adx_14": ref_adx(h.copy(), l.copy(), c),
+        "cmf_20": ref_cmf(h, l, c, v),
+        "atr_14": ref_atr(h, l, c),
+        "obv": (np.sign(c.diff()) * v).fillna(0).cumsum(),
+        "force_13": ref_force_index(df),
+    }
+    for nama, harapan in acuan.items():
+        pd.testing.assert_series_equal(nilai_node(g, nama), harapan, check_names=False, rtol=1e-9, obj=nama)
+
+def test_node_tidak_mengubah_bar():
+    df = bar_sintetis(0)
+    asli = df.copy()
+    g = graf_indikator(df)
+    for nama in ("adx_14", "atr_14", "cmf_20", "stoch_d", "vwap"): nilai_node(g, nama)
+    pd.testing.assert_frame_equal(df, asli)
+
+def test_perantara_dihitung_sekali():
+    g = graf_indikator(bar_sintetis(1))
+    tr = nilai_node(g, "tr")
+    nilai_node(g, "atr_14"); nilai_node(g, "adx_14")
+    assert nilai_node(g, "tr") is tr
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def isi_buffer(server, ticker="BBRI.JK"):
+    # Dua hari bursa bar 5m: close kemarin 1000, harga terakhir hari ini 1100
+    idx = pd.date_range("2026-10-15 09:00", periods=60, freq="5min", tz="Asia/Jakarta").append(
+        pd.date_range("2026-10-16 09:00", periods=60, freq="5min", tz="Asia/Jakarta"))
+    close = np.linspace(1000, 1100, 120)
+    close[59] = 1000.0
+    df = pd.DataFrame({"Open": close, "High": close + 5, "Low": close - 5, "Close": close,
+                       "Volume": np.full(120, 1e5)}, index=idx)
+    server.gabung_bar_intraday(ticker, df)
+
+
+@pytest.fixture
+def server_intraday(server_bersih, monkeypatch):
+    monkeypatch.setattr(server_bersih, "BUFFER_INTRADAY", {})
+    return server_bersih
+
+
+def test_change_pct_vs_close_kemarin_di_buffer(server_intraday):
+    s = server_intraday
+    isi_buffer(s)
+    data = s.skor_intraday("BBRI.JK")
+    assert data['change_pct'] == pytest.approx(10.0)
+    # Perubahan per bar tetap tersedia terpisah
+    assert data['bar_change_pct'] != data['change_pct']
+
+
+def test_change_pct_utamakan_bar_harian(server_intraday):
+    s = server_intraday
+    isi_buffer(s)
+    harian = pd.DataFrame({"Close": [950.0, 980.0, 1050.0]}, index=pd.to_datetime(["2026-10-14", "2026-10-15", "2026-10-16"]))
+    s.CACHE_DATA["BBRI.JK"] = {"data": {}, "timestamp": 0, "bars": harian}
+    assert s.skor_intraday("BBRI.JK")['change_pct'] == pytest.approx(12.24)
@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import data_saham
+
+
+def isi_level(server, harga=1000.0, atr=20.0, **levels):
+    data = data_saham(harga=harga, levels=levels, atr=atr)
+    data['support'] = 0 # Tanpa support_scan: hanya level yang diberikan test
+    server.perbarui_level_saham({"BBRI.JK": data})
+
+
+def nama_dekat(server, sisi, **batas):
+    posisi, idx = server.cari_level_dekat(sisi, **batas)
+    return sorted(idx['nama'][i] for i in posisi)
+
+
+def test_batas_persen_inklusif(server_bersih):
+    s = server_bersih
+    isi_level(s, fibo_618=980.0, sma_20=979.9, pivot_r1=1020.0, r2=1020.1, pas=1000.0)
+    # 2% di bawah 1000 = 980 tepat masuk, 979.9 (2.01%) tidak
+    assert nama_dekat(s, "support", pct=2) == ["fibo_618", "pas"]
+    assert nama_dekat(s, "resistance", pct=2) == ["pas", "pivot_r1"]
+
+
+def test_batas_atr(server_bersih):
+    s = server_bersih
+    isi_level(s, atr=20.0, s1=980.0, s2=959.0, r1=1040.0, r2=1041.0)
+    assert nama_dekat(s, "support", atr=1) == ["s1"]
+    assert nama_dekat(s, "resistance", atr=2) == ["r1"]
+
+
+def test_atr_kosong_tidak_ikut_pencarian_atr(server_bersih):
+    s = server_bersih
+    isi_level(s, atr=None, s1=990.0)
+    assert nama_dekat(s, "support", atr=5) == []
+    assert nama_dekat(s, "support", pct=5) == ["s1"]
+
+
+def test_indeks_dibangun_ulang_setelah_update(server_bersih):
+    s = server_bersih
+    isi_level(s, s1=990.0)
+    assert nama_dekat(s, "support", pct=2) == ["s1"]
+    isi_level(s, harga=1100.0, s1=990.0) # Harga naik -> s1 sekarang 10% di bawah
+    assert nama_dekat(s, "support", pct=2) == []
+
+
+def test_endpoint_near_satu_baris_per_ticker(server_bersih):
+    s = server_bersih
+    isi_level(s, fibo_618=990.0, sma_20=985.0, r1=1010.0)
+    with s.app.test_client() as c:
+        body = c.get("/api/levels/near?side=support&pct=2").get_json()
+    assert body['matched'] == 1
+    hasil = body['results'][0]
+    assert hasil['ticker'] == "BBRI"
+    assert hasil['nearest']['name'] == "fibo_618"
+    assert [l['name'] for l in hasil['levels']] == ["fibo_618", "sma_20"]
+    assert hasil['nearest']['distance_pct'] == pytest.approx(1.0)
@@ -0,0 +1,52 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def server_db(server_bersih, monkeypatch, tmp_path):
+    import bikin_database
+    db = str(tmp_path / "riwayat.db")
+    monkeypatch.setattr(bikin_database, "DB_NAME", db)
+    monkeypatch.setattr(server_bersih, "DB_NAME", db)
+    bikin_database.create_database()
+    conn = sqlite3.connect(db)
+    with conn: conn.execute("DELETE FROM scan_results")
+    conn.close()
+    return server_bersih
+
+
+def isi(server, baris):
+    conn = sqlite3.connect(server.DB_NAME)
+    with conn:
+        conn.executemany("INSERT INTO scan_results (scan_date, ticker, scanner_type, accuracy_score) VALUES (?, ?, ?, ?)", baris)
+    conn.close()
+
+
+def test_summary_tidak_terpotong_limit(server_db):
+    s = server_db
+    # 3 sesi x 4 scan BBRI, 1 scan TLKM di sesi terakhir
+    isi(s, [(f"2026-10-1{h} 0{j}:00:00", "BBRI.JK", "SWING", 85) for h in range(3) for j in range(4)])
+    isi(s, [("2026-10-12 09:30:00", "TLKM.JK", "SWING", 90)])
+    with s.app.test_client() as c:
+        body = c.get("/api/scan-history?strategy=SWING&min_score=80&sessions=2&limit=3").get_json()
+    assert len(body['history']) == 3 and body['truncated'] is True
+    ringkasan = {r['ticker']: r for r in body['summary']}
+    assert ringkasan['BBRI'] == {"ticker": "BBRI", "hits": 8, "sessions": 2, "max_score": 85}
+    assert ringkasan['TLKM']['hits'] == 1
+
+
+def test_sesi_memakai_index_ekspresi(server_db):
+    conn = sqlite3.connect(server_db.DB_NAME)
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT DISTINCT substr(scan_date, 1, 10) AS d FROM scan_results ORDER BY d DESC LIMIT 10").fetchall()
+    conn.close()
+    assert "idx_scan_hari" in str(plan)
+
+
+def test_default_scan_date_wib(server_db):
+    conn = sqlite3.connect(server_db.DB_NAME)
+    with conn: conn.execute("INSERT INTO scan_results (ticker) VALUES ('BBRI.JK')")
+    tersimpan = datetime.strptime(conn.execute("SELECT scan_date FROM scan_results").fetchone()[0], "%Y-%m-%d %H:%M:%S")
+    conn.close()
+    assert abs(tersimpan - (datetime.utcnow() + timedelta(hours=7))) < timedelta(minutes=1)
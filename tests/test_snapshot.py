@@ -0,0 +1,113 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from conftest import data_saham
+
+
+def isi_cache(server):
+    server.CACHE_DATA["BBRI.JK"] = {"data": data_saham(score=82, harga=4500.0, verdict="STRONG BUY 🔥", rsi=61.5,
+                                                       levels={"fibo_618": 4400.0, "s1": 4420.5}),
+                                    "timestamp": 0, "bars": None}
+    server.CACHE_DATA["TLKM.JK"] = {"data": data_saham(score=55, harga=3100.0, verdict="WAIT", tipe="INVEST", rsi=48.0),
+                                    "timestamp": 0, "bars": None}
+    # Ticker gagal tidak ikut ditulis
+    server.CACHE_DATA["XXXX.JK"] = {"data": {**data_saham(), "last_price": 0, "verdict": "ERROR"}, "timestamp": 0, "bars": None}
+
+
+def kosongkan(server):
+    server.CACHE_DATA.clear()
+    server.LEVEL_SAHAM.clear()
+    tabel = server.TABEL_INDIKATOR
+    tabel['tickers'] = []; tabel['index'] = {}
+
+
+def test_tulis_lalu_muat_sama(server_bersih):
+    s = server_bersih
+    isi_cache(s)
+    versi = s.tulis_snapshot_indikator()
+    assert versi and s.versi_snapshot_aktif() == versi
+    asli = {t: dict(item['data']) for t, item in s.CACHE_DATA.items() if item['data']['last_price'] > 0}
+
+    kosongkan(s)
+    assert s.muat_snapshot_indikator() == 2
+    assert sorted(s.CACHE_DATA) == ["BBRI.JK", "TLKM.JK"]
+    for ticker, data in asli.items():
+        dimuat = s.CACHE_DATA[ticker]
+        assert dimuat['snapshot'] is True and dimuat['bars'] is None
+        d = dimuat['data']
+        for k in ("score", "verdict", "type", "reason", "last_price", "change_pct", "support", "stop_loss", "target_price", "as_of"):
+            assert d[k] == pytest.approx(data[k]) if isinstance(data[k], float) else d[k] == data[k], k
+        assert d['indicators']['rsi'] == pytest.approx(data['indicators']['rsi'])
+        assert d['levels'] == pytest.approx(data['levels'])
+        assert d['hist_data']['note'] == "Valid"
+
+    # Tabel screener di-mmap langsung dari kolom .npy
+    i = s.TABEL_INDIKATOR['index']['BBRI']
+    assert s.TABEL_INDIKATOR['kolom']['score'][i] == 82
+    assert s.TABEL_INDIKATOR['kolom']['verdict'][i] == "STRONG BUY 🔥"
+    assert isinstance(s.TABEL_INDIKATOR['kolom']['rsi'], np.memmap)
+    # Indeks level ikut terisi dari snapshot
+    assert s.LEVEL_SAHAM['BBRI']['levels']['fibo_618'] == 4400.0
+
+
+def test_mmap_copy_on_write_tidak_mengubah_file(server_bersih):
+    s = server_bersih
+    isi_cache(s)
+    versi = s.tulis_snapshot_indikator()
+    kosongkan(s)
+    s.muat_snapshot_indikator()
+    # Refresh berikutnya menulis ke tabel (mesin alert) -> file snapshot tetap utuh
+    s.perbarui_tabel_indikator({"BBRI.JK": data_saham(score=10, harga=4500.0, rsi=5.0)})
+    arr = np.load(os.path.join(s.SNAPSHOT_DIR, versi, "angka_score.npy"))
+    assert sorted(arr.tolist()) == [55.0, 82.0]
+
+
+def test_tidak_menimpa_cache_yang_sudah_ada(server_bersih):
+    s = server_bersih
+    isi_cache(s)
+    s.tulis_snapshot_indikator()
+    assert s.muat_snapshot_indikator() == 0
+
+
+def test_snapshot_kedaluwarsa_diabaikan(server_bersih, monkeypatch):
+    s = server_bersih
+    isi_cache(s)
+    s.tulis_snapshot_indikator()
+    kosongkan(s)
+    monkeypatch.setattr(s, "SNAPSHOT_MAX_AGE", -1)
+    assert s.muat_snapshot_indikator() == 0
+    assert s.CACHE_DATA == {}
+
+
+def test_versi_lama_dibersihkan(server_bersih):
+    s = server_bersih
+    isi_cache(s)
+    versi = [s.tulis_snapshot_indikator() for _ in range(s.SNAPSHOT_SIMPAN + 2)]
+    tersisa = sorted(d for d in os.listdir(s.SNAPSHOT_DIR) if d.startswith("v"))
+    assert tersisa == sorted(versi)[-s.SNAPSHOT_SIMPAN:]
+    assert s.versi_snapshot_aktif() == versi[-1]
+
+
+def test_regime_snapshot_tidak_dianggap_segar(server_bersih, monkeypatch):
+    s = server_bersih
+    isi_cache(s)
+    s.MARKET_STATUS['condition'] = "CRASH"
+    versi = s.tulis_snapshot_indikator()
+    # Snapshot ditulis 2 jam lalu (masih di bawah SNAPSHOT_MAX_AGE)
+    path = os.path.join(s.SNAPSHOT_DIR, versi, "meta.json")
+    with open(path) as f: meta = json.load(f)
+    meta['created_at'] -= 7200
+    with open(path, "w") as f: json.dump(meta, f)
+
+    kosongkan(s)
+    s.MARKET_STATUS.update({"condition": "NORMAL", "last_check": 0})
+    s.muat_snapshot_indikator()
+    assert s.MARKET_STATUS == {"condition": "CRASH", "source": "SNAPSHOT", "last_check": meta['created_at']}
+
+    # Cek berikutnya menyegarkan regime (fallback IHSG) alih-alih memakai regime snapshot
+    monkeypatch.setattr(s, "hitung_breadth_universe", lambda: None)
+    monkeypatch.setattr(s, "panggil_yahoo", lambda *a, **k: s.pd.DataFrame({"Close": [100.0, 100.5]}))
+    assert s.cek_kondisi_market() == "NORMAL"
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+# ==========================================
+# UJI BEBAN (REPLAY TRAFIK SCAN + DETAIL, UPSTREAM PALSU)
+# ==========================================
+# Yahoo, pencarian berita & rantai AI diganti stand-in lokal dengan latensi acak
+# (lognormal, seed tetap) supaya hasil bisa diulang dan tidak membakar kuota API.
+# Yang diukur: server kita sendiri (cache, snapshot/ETag, limiter, pool thread).
+#
+# Mode 1 (default): server dijalankan di proses ini (werkzeug threaded)
+#   python uji_beban.py --durasi 60 --vu 32 --rasio-detail 0.2
+# Mode 2: menembak server produksi lokal yang dijalankan dengan stub yang sama
+#   DB_PATH=/tmp/uji.db gunicorn -c gunicorn_uji.conf.py server:app
+#   python uji_beban.py --url http://127.0.0.1:7860 --durasi 60 --vu 32
+
+LATENSI_DEFAULT = {"yahoo": 0.08, "berita": 0.4, "ai": 2.0} # Median detik per panggilan upstream
+SEBARAN_LATENSI = 0.5 # sigma lognormal: p99 ~ 3.2x median
+STRATEGI_SCAN = {"ALL": 0.6, "SYARIAH": 0.25, "LQ45": 0.15}
+BAR_HARIAN = 1250 # ~5 tahun; period yang lebih pendek = potongan ekor
+PERIOD_BAR = {"1d": 1, "2d": 2, "5d": 5, "1mo": 22, "3mo": 66, "6mo": 126, "1y": 250, "2y": 500, "5y": 1250, "max": 1250}
+
+# --- STAND-IN UPSTREAM ---
+class LatensiPalsu:
+    """Jeda lognormal per jenis upstream; RNG per thread supaya deterministik tanpa lock."""
+    def __init__(self, seed, median):
+        self.seed = seed
+        self.median = dict(median)
+        self.lokal = threading.local()
+
+    def rng(self):
+        r = getattr(self.lokal, "rng", None)
+        if r is None:
+            r = self.lokal.rng = random.Random(self.seed * 1000003 + threading.get_ident())
+        return r
+
+    def tidur(self, jenis):
+        median = self.median.get(jenis, 0)
+        if median > 0: time.sleep(self.rng().lognormvariate(math.log(median), SEBARAN_LATENSI))
+
+def bar_palsu(simbol, seed):
+    """Random walk OHLCV harian yang sama untuk simbol + seed yang sama."""
+    rng = np.random.default_rng(zlib.crc32(simbol.encode()) ^ seed)
+    idx = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=BAR_HARIAN)
+    harga_awal = float(rng.choice([150, 500, 1200, 3000, 6000, 9000]))
+    close = harga_awal * np.exp(np.cumsum(rng.normal(0.0003, 0.02, BAR_HARIAN)))
+    open_ = close * (1 + rng.normal(0, 0.008, BAR_HARIAN))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, BAR_HARIAN)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, BAR_HARIAN)))
+    volume = rng.lognormal(16, 0.6, BAR_HARIAN).astype(np.int64)
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=idx)
+
+class TickerPalsu:
+    def __init__(self, yahoo, simbol):
+        self.yahoo = yahoo
+        self.simbol = simbol
+
+    def history(self, period="1mo", interval="1d", **kwargs):
+        self.yahoo.latensi.tidur("yahoo")
+        df = self.yahoo.bar(self.simbol)
+        if interval == "1wk":
+            df = df.resample("W-FRI").agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}).dropna()
+            return df.tail(max(1, PERIOD_BAR.get(period, 250) // 5)).copy()
+        return df.tail(PERIOD_BAR.get(period, 250)).copy()
+
+    @property
+    def info(self):
+        self.yahoo.latensi.tidur("yahoo")
+        df = self.yahoo.bar(self.simbol)
+        terakhir = df.iloc[-1]
+        rng = random.Random(zlib.crc32(self.simbol.encode()))
+        return {
+            "longName": f"PT {self.simbol.replace('.JK', '')} Tbk", "sector": "Financial Services",
+            "trailingPE": rng.uniform(4, 40), "priceToBook": rng.uniform(0.5, 6), "returnOnEquity": rng.uniform(0.02, 0.3),
+            "marketCap": int(terakhir['Close'] * rng.uniform(1e9, 1e11)),
+            "open": float(terakhir['Open']), "dayHigh": float(terakhir['High']), "dayLow": float(terakhir['Low']),
+            "currentPrice": float(terakhir['Close']), "volume": int(terakhir['Volume'])
+        }
+
+    @property
+    def news(self):
+        self.yahoo.latensi.tidur("yahoo")
+        kode = self.simbol.replace(".JK", "")
+        return [{"title": f"{kode} catat kinerja kuartal {i}", "publisher": "Stand-in", "link": "http://localhost/",
+                 "providerPublishTime": int(time.time()) - i * 3600} for i in range(1, 4)]
+
+class YahooPalsu:
+    """Pengganti modul yfinance (Ticker + download) untuk server & rumus_saham."""
+    def __init__(self, latensi, seed):
+        self.latensi = latensi
+        self.seed = seed
+        self.frames = {}
+        self.lock = threading.Lock()
+
+    def bar(self, simbol):
+        df = self.frames.get(simbol)
+        if df is None:
+            df = bar_palsu(simbol, self.seed)
+            with self.lock: self.frames.setdefault(simbol, df)
+        return df
+
+    def Ticker(self, simbol):
+        return TickerPalsu(self, simbol)
+
+    def download(self, tickers, period="1y", interval="1d", group_by="ticker", **kwargs):
+        self.latensi.tidur("yahoo")
+        daftar = tickers.split() if isinstance(tickers, str) else list(tickers)
+        return pd.concat({t: self.bar(t).tail(PERIOD_BAR.get(period, 250)) for t in daftar}, axis=1)
+
+def pasang_stub(seed=42, latensi=None):
+    """Ganti semua titik keluar ke internet di server & rumus_saham dengan stand-in lokal."""
+    import server
+    import rumus_saham
+    jeda = LatensiPalsu(seed, latensi or LATENSI_DEFAULT)
+    yahoo = YahooPalsu(jeda, seed)
+    server.yf = yahoo
+    rumus_saham.yf = yahoo
+
+    def berita_palsu(ticker, sektor, berita_yahoo_backup, nama_perusahaan=""):
+        jeda.tidur("berita")
+        judul = "\n".join(f"- {b['title']}" for b in berita_yahoo_backup[:3])
+        return f"📰 Berita {ticker} ({sektor}):\n{judul or '- Tidak ada berita'}"
+
+    def ai_palsu(prompt, json_mode=False):
+        jeda.tidur("ai")
+        if json_mode: return "{}"
+        return f"Stand-in AI: prompt {len(prompt)} karakter. Rekomendasi: WAIT & SEE."
+
+    server.agen_pencari_berita_robust = berita_palsu
+    # Yang diganti rantai provider-nya saja: antre SLOT_AI & tenggat di panggil_ai_failover tetap diuji
+    server.panggil_ai_berantai = ai_palsu
+    print(f"🧪 Stub upstream terpasang (seed={seed}, latensi median={jeda.median})")
+    return yahoo
+
+def pasang_stub_dari_env():
+    """Dipanggil dari gunicorn_uji.conf.py (seed & latensi lewat env)."""
+    latensi = {k: float(os.getenv(f"UJI_LATENSI_{k.upper()}", v)) for k, v in LATENSI_DEFAULT.items()}
+    return pasang_stub(int(os.getenv("UJI_SEED", 42)), latensi)
+
+def siapkan_database(path):
+    import bikin_database
+    bikin_database.DB_NAME = path
+    bikin_database.create_database()
+
+def jalankan_server_lokal(port, seed, latensi):
+    """Server + stub di proses ini. DB_PATH harus diset sebelum server diimport."""
+    os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="uji_beban_"), "uji.db"))
+    siapkan_database(os.environ["DB_PATH"])
+    pasang_stub(seed, latensi)
+    import server
+    from werkzeug.serving import make_server
+
+    # Warm-up dijalankan di depan (bukan thread latar) supaya durasinya terukur terpisah
+    t0 = time.perf_counter()
+    status = server.hangatkan_cache()
+    print(f"🔥 Warm-up: {status['state']} {time.perf_counter() - t0:.1f} detik {status['strategies']}")
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING) # Access log per request = noise + overhead
+    httpd = make_server("127.0.0.1", port, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, name="uji-beban-server", daemon=True).start()
+    return httpd, f"http://127.0.0.1:{port}"
+
+def tunggu_siap(url, batas=300):
+    mulai = time.time()
+    while time.time() - mulai < batas:
+        try:
+            if requests.get(f"{url}/api/health", timeout=5).status_code == 200: return True
+        except requests.RequestException: pass
+        time.sleep(1)
+    return False
+
+# --- GENERATOR TRAFIK ---
+def pilih_berbobot(rng, bobot):
+    return rng.choices(list(bobot), weights=list(bobot.values()))[0]
+
+def virtual_user(no, url, args, tickers, bobot_ticker, batas_waktu, catatan):
+    """
+    Satu klien aplikasi: sebagian besar polling scan (dengan If-None-Match seperti app asli),
+    sesekali membuka detail saham (ticker populer lebih sering, distribusi Zipf).
+    """
+    rng = random.Random(args.seed * 7919 + no)
+    sesi = requests.Session()
+    etag = {}
+    pakai_etag = rng.random() < args.rasio_etag
+    while time.time() < batas_waktu:
+        if rng.random() < args.rasio_detail:
+            label = "stock-detail"
+            path, params, headers = "/api/stock-detail", {"ticker": rng.choices(tickers, weights=bobot_ticker)[0]}, {}
+        else:
+            label = "scan-results"
+            strategi = pilih_berbobot(rng, STRATEGI_SCAN)
+            path, params = "/api/scan-results", {"strategy": strategi}
+            headers = {"If-None-Match": etag[strategi]} if pakai_etag and strategi in etag else {}
+        t0 = time.perf_counter()
+        try:
+            r = sesi.get(url + path, params=params, headers=headers, timeout=args.timeout)
+            status = r.status_code
+            if label == "scan-results" and r.headers.get("ETag"): etag[strategi] = r.headers["ETag"]
+        except requests.RequestException:
+            status = 0
+        catatan.append((label, status, time.perf_counter() - t0, time.time()))
+        if args.jeda > 0: time.sleep(rng.expovariate(1 / args.jeda))
+
+def persentil(nilai, p):
+    return round(float(np.percentile(nilai, p)) * 1000, 1) if len(nilai) else None
+
+def ringkas_hasil(catatan, durasi):
+    laporan = {}
+    for label in sorted({c[0] for c in catatan}) + ["TOTAL"]:
+        baris = [c for c in catatan if label == "TOTAL" or c[0] == label]
+        lat = np.array([c[2] for c in baris])
+        gagal = sum(1 for c in baris if c[1] == 0 or c[1] >= 500)
+        laporan[label] = {
+            "requests": len(baris), "errors": gagal, "not_modified": sum(1 for c in baris if c[1] == 304),
+            "rps": round(len(baris) / durasi, 2),
+            "p50_ms": persentil(lat, 50), "p90_ms": persentil(lat, 90), "p99_ms": persentil(lat, 99),
+            "max_ms": round(float(lat.max()) * 1000, 1) if len(lat) else None
+        }
+    return laporan
+
+def cetak_laporan(laporan, args, durasi):
+    print(f"\n📊 Uji beban {durasi:.0f} detik | {args.vu} VU | detail {args.rasio_detail:.0%} | seed {args.seed}")
+    print(f"{'endpoint':<14}{'req':>8}{'err':>6}{'304':>7}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, r in laporan.items():
+        print(f"{label:<14}{r['requests']:>8}{r['errors']:>6}{r['not_modified']:>7}{r['rps']:>9}"
+              f"{str(r['p50_ms']):>10}{str(r['p90_ms']):>10}{str(r['p99_ms']):>10}{str(r['max_ms']):>10}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Uji beban /api/scan-results + /api/stock-detail dengan upstream palsu")
+    ap.add_argument("--url", help="Server target (default: jalankan server + stub di proses ini)")
+    ap.add_argument("--port", type=int, default=7961)
+    ap.add_argument("--durasi", type=float, default=30, help="Detik pengukuran")
+    ap.add_argument("--vu", type=int, default=16, help="Jumlah klien paralel (virtual user)")
+    ap.add_argument("--rasio-detail", type=float, default=0.2, help="Porsi request /api/stock-detail")
+    ap.add_argument("--rasio-etag", type=float, default=0.5, help="Porsi klien yang polling dengan If-None-Match")
+    ap.add_argument("--jeda", type=float, default=0.0, help="Rata-rata think time klien (detik, eksponensial)")
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--latensi-yahoo", type=float, default=LATENSI_DEFAULT['yahoo'])
+    ap.add_argument("--latensi-berita", type=float, default=LATENSI_DEFAULT['berita'])
+    ap.add_argument("--latensi-ai", type=float, default=LATENSI_DEFAULT['ai'])
+    ap.add_argument("--output", help="Simpan laporan JSON ke file ini")
+    args = ap.parse_args()
+
+    httpd = None
+    if args.url: url = args.url.rstrip("/")
+    else:
+        latensi = {"yahoo": args.latensi_yahoo, "berita": args.latensi_berita, "ai": args.latensi_ai}
+        httpd, url = jalankan_server_lokal(args.port, args.seed, latensi)
+    if not tunggu_siap(url):
+        print(f"❌ Server {url} tidak siap (cek /api/health)")
+        sys.exit(1)
+
+    # Ticker detail dari universe LQ45 server; bobot Zipf (ticker ke-k dibuka ~1/k kali)
+    tickers = [t['ticker'] for t in requests.get(f"{url}/api/master", params={"lq45": 1}, timeout=30).json()['tickers']]
+    bobot_ticker = [1 / (k + 1) for k in range(len(tickers))]
+
+    catatan = [] # list.append atomic di CPython; tidak perlu lock
+    mulai = time.time()
+    batas_waktu = mulai + args.durasi
+    with ThreadPoolExecutor(max_workers=args.vu) as executor:
+        for no in range(args.vu):
+            executor.submit(virtual_user, no, url, args, tickers, bobot_ticker, batas_waktu, catatan)
+    durasi = time.time() - mulai
+
+    laporan = ringkas_hasil(catatan, durasi)
+    cetak_laporan(laporan, args, durasi)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "duration": round(durasi, 2), "endpoints": laporan}, f, indent=2)
+        print(f"💾 Laporan disimpan ke {args.output}")
+    if httpd: httpd.shutdown()
+
+if __name__ == "__main__":
+    main()